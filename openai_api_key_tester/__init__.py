@@ -1,13 +1,14 @@
 """OpenAI API Key Tester package."""
-from .api_key_tester import main as cli_main
-from .gui import main as gui_main
 
 __version__ = "0.1.0"
 
 def main():
     """Entry point for CLI interface."""
+    # Imported on use so the CLI does not pay for loading the GUI toolkit
+    from .api_key_tester import main as cli_main
     cli_main()
 
 def gui():
     """Entry point for GUI interface."""
+    from .gui import main as gui_main
     gui_main()
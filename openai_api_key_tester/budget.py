@@ -0,0 +1,279 @@
+"""
+Token and cost budget for probe runs.
+
+Every model probe spends a little: chat probes send a short prompt with
+max_tokens=1, embedding probes embed one word and image probes are billed
+a whole image. Before a probe is sent its cost is estimated from a price
+table and checked against the budget; afterwards the usage reported in the
+response is charged. Budgets are per run, or per calendar month with the
+spend of earlier runs kept in a small ledger file.
+"""
+import json
+import os
+import argparse
+from datetime import datetime, timezone
+from typing import Any, Dict, List, NamedTuple, Optional, Tuple
+from .defaults import DEFAULT_LEDGER_PATH
+from .errors import BudgetExceeded
+from .planner import probe_kind
+
+# US dollars per million input and output tokens, matched by longest model id prefix
+TOKEN_PRICES: Dict[str, Tuple[float, float]] = {
+    "gpt-4": (30.00, 60.00),
+    "gpt-4-32k": (60.00, 120.00),
+    "gpt-4-turbo": (10.00, 30.00),
+    "gpt-4-1106": (10.00, 30.00),
+    "gpt-4-0125": (10.00, 30.00),
+    "gpt-4-vision": (10.00, 30.00),
+    "gpt-4o": (2.50, 10.00),
+    "gpt-4o-mini": (0.15, 0.60),
+    "gpt-3.5-turbo": (0.50, 1.50),
+    "gpt-3.5-turbo-16k": (3.00, 4.00),
+    "text-embedding-ada-002": (0.10, 0.0),
+    "text-embedding-3-small": (0.02, 0.0),
+    "text-embedding-3-large": (0.13, 0.0),
+}
+
+# Price of models without a table entry; deliberately on the expensive side
+DEFAULT_TOKEN_PRICE = TOKEN_PRICES["gpt-4"]
+
+# US dollars per generated image at the probe's size (1024x1024, standard quality)
+IMAGE_PRICES: Dict[str, float] = {
+    "dall-e-2": 0.020,
+    "dall-e-3": 0.040,
+}
+DEFAULT_IMAGE_PRICE = IMAGE_PRICES["dall-e-3"]
+
+# Estimated input and output tokens of one probe, by probe kind
+ESTIMATED_TOKENS: Dict[str, Tuple[int, int]] = {
+    "chat": (8, 1),
+    "vision": (100, 1),
+    "embedding": (1, 0),
+    "image": (0, 0),
+}
+
+
+class ProbeCost(NamedTuple):
+    tokens: int
+    dollars: float
+    images: int = 0
+
+
+def _price(table: Dict[str, Any], model: str, default: Any) -> Any:
+    matches = [prefix for prefix in table if model.startswith(prefix)]
+    return table[max(matches, key=len)] if matches else default
+
+
+def token_cost(model: str, input_tokens: int, output_tokens: int) -> ProbeCost:
+    """
+    Return the cost of a request with the given token counts.
+    """
+    input_price, output_price = _price(TOKEN_PRICES, model, DEFAULT_TOKEN_PRICE)
+    dollars = (input_tokens * input_price + output_tokens * output_price) / 1_000_000
+    return ProbeCost(input_tokens + output_tokens, dollars)
+
+
+def estimate_probe_cost(model: str) -> ProbeCost:
+    """
+    Estimate the cost of the probe for a model before it is sent.
+    """
+    kind = probe_kind(model)
+    if kind == "image":
+        return ProbeCost(0, _price(IMAGE_PRICES, model, DEFAULT_IMAGE_PRICE), 1)
+    return token_cost(model, *ESTIMATED_TOKENS[kind])
+
+
+def response_cost(model: str, response: Any) -> ProbeCost:
+    """
+    Return the cost of a probe from the usage reported in its response.
+    Falls back to the estimate when the response carries no usage, as
+    with the first chunk of a streamed probe.
+    """
+    kind = probe_kind(model)
+    if kind == "image":
+        images = len(getattr(response, "data", None) or []) or 1
+        return ProbeCost(0, _price(IMAGE_PRICES, model, DEFAULT_IMAGE_PRICE) * images, images)
+    usage = getattr(response, "usage", None)
+    if usage is None:
+        return estimate_probe_cost(model)
+    input_tokens = getattr(usage, "prompt_tokens", 0) or 0
+    output_tokens = getattr(usage, "completion_tokens", 0) or 0
+    return token_cost(model, input_tokens, output_tokens)
+
+
+def parse_budget(value: str) -> Tuple[float, str]:
+    """
+    Parse a budget such as '5000', '5000tokens', '$0.50' or '0.50usd'.
+    Returns the limit and its unit, 'tokens' or 'usd'.
+    """
+    text = value.strip().lower().replace(" ", "")
+    unit = "tokens"
+    if text.startswith("$"):
+        text, unit = text[1:], "usd"
+    elif text.endswith("usd"):
+        text, unit = text[:-3], "usd"
+    elif text.endswith("tokens"):
+        text = text[:-6]
+    try:
+        limit = float(text)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"expected a budget such as 5000tokens or $0.50, got '{value}'")
+    if limit < 0:
+        raise argparse.ArgumentTypeError(f"budget must not be negative, got '{value}'")
+    return limit, unit
+
+
+class Budget:
+    """
+    Spending limit of a run in tokens or US dollars.
+    Image probes are billed per image rather than per token, so a token
+    budget never admits them; use a dollar budget to include them.
+    """
+
+    def __init__(self, limit: float, unit: str = "tokens", already_spent: Optional[ProbeCost] = None):
+        self.limit = limit
+        self.unit = unit
+        self.already_spent = already_spent or ProbeCost(0, 0.0)
+        self.spent = ProbeCost(0, 0.0)
+        self.dropped: List[str] = []
+
+    def _amount(self, cost: ProbeCost) -> float:
+        return cost.tokens if self.unit == "tokens" else cost.dollars
+
+    def format_amount(self, amount: float) -> str:
+        return f"{amount:.0f} tokens" if self.unit == "tokens" else f"${amount:.4f}"
+
+    @property
+    def remaining(self) -> float:
+        return self.limit - self._amount(self.already_spent) - self._amount(self.spent)
+
+    def allows(self, cost: ProbeCost) -> bool:
+        """
+        Return True if a probe of this cost still fits in the budget.
+        """
+        if self.unit == "tokens" and cost.images:
+            return False
+        return self._amount(cost) <= self.remaining
+
+    def check(self, model: str):
+        """
+        Raise BudgetExceeded if the probe for a model would not fit.
+        """
+        estimate = estimate_probe_cost(model)
+        if self.unit == "tokens" and estimate.images:
+            self.dropped.append(model)
+            raise BudgetExceeded("billed per image, not covered by a token budget")
+        if not self.allows(estimate):
+            self.dropped.append(model)
+            raise BudgetExceeded(
+                f"budget exhausted (needs about {self.format_amount(self._amount(estimate))}, "
+                f"{self.format_amount(max(self.remaining, 0))} left)"
+            )
+
+    def charge(self, model: str, response: Any):
+        """
+        Charge the usage reported in a probe's response.
+        """
+        cost = response_cost(model, response)
+        self.spent = ProbeCost(
+            self.spent.tokens + cost.tokens,
+            self.spent.dollars + cost.dollars,
+            self.spent.images + cost.images
+        )
+
+    def summary(self) -> str:
+        """
+        Format spend and remaining budget into a one-line summary.
+        """
+        images = f", {self.spent.images} images" if self.spent.images else ""
+        dropped = f", {len(self.dropped)} probes dropped" if self.dropped else ""
+        return (
+            f"💰 Spent {self.spent.tokens} tokens (${self.spent.dollars:.4f}{images}); "
+            f"{self.format_amount(max(self.remaining, 0))} of {self.format_amount(self.limit)} left{dropped}"
+        )
+
+
+def order_by_cost(families: Dict[str, List[str]]) -> Dict[str, List[str]]:
+    """
+    Reorder model families so the cheapest representatives are probed first
+    and as many models as possible fit in the budget.
+    """
+    return dict(sorted(
+        families.items(),
+        key=lambda item: (estimate_probe_cost(item[1][0]).images, estimate_probe_cost(item[1][0]).dollars)
+    ))
+
+
+def format_cost_estimate(models: List[str], budget: Budget) -> str:
+    """
+    Format the estimated cost of the pending probes against the budget.
+    """
+    tokens = 0
+    dollars = 0.0
+    images = 0
+    for model in models:
+        cost = estimate_probe_cost(model)
+        tokens, dollars, images = tokens + cost.tokens, dollars + cost.dollars, images + cost.images
+    estimate = ProbeCost(tokens, dollars, images)
+    line = (
+        f"💰 Estimated cost of {len(models)} probes: {tokens} tokens, ${dollars:.4f}"
+        f"{f' ({images} images)' if images else ''}; budget: {budget.format_amount(max(budget.remaining, 0))} left"
+    )
+    if not budget.allows(estimate):
+        line += "\n⚠️ The plan exceeds the budget: probes are reordered cheapest first and the rest dropped"
+    return line
+
+
+class SpendLedger:
+    """
+    Spend per calendar month, kept across runs in a JSON file.
+    """
+
+    def __init__(self, path: str = DEFAULT_LEDGER_PATH):
+        self.path = path
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                self.months: Dict[str, Dict] = json.load(f)
+        except (OSError, ValueError):
+            self.months = {}
+
+    @staticmethod
+    def _month() -> str:
+        return datetime.now(timezone.utc).strftime("%Y-%m")
+
+    def month_total(self) -> ProbeCost:
+        """
+        Return the spend recorded for the current month.
+        """
+        entry = self.months.get(self._month(), {})
+        return ProbeCost(entry.get("tokens", 0), entry.get("dollars", 0.0), entry.get("images", 0))
+
+    def add(self, cost: ProbeCost):
+        """
+        Add a run's spend to the current month and save the ledger atomically.
+        """
+        total = self.month_total()
+        self.months[self._month()] = {
+            "tokens": total.tokens + cost.tokens,
+            "dollars": total.dollars + cost.dollars,
+            "images": total.images + cost.images
+        }
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        tmp_path = self.path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(self.months, f, indent=2, sort_keys=True)
+        os.replace(tmp_path, self.path)
+
+
+def budget_from_args(args) -> Tuple[Optional[Budget], Optional[SpendLedger]]:
+    """
+    Build the Budget of --budget and --budget-period, with the ledger that
+    keeps a monthly budget's spend. Returns (None, None) without --budget.
+    """
+    if args.budget is None:
+        return None, None
+    limit, unit = args.budget
+    if args.budget_period == "month":
+        ledger = SpendLedger()
+        return Budget(limit, unit, ledger.month_total()), ledger
+    return Budget(limit, unit), None
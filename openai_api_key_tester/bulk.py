@@ -0,0 +1,217 @@
+"""
+Bulk validation of many OpenAI API keys.
+
+Keys are normalised and fingerprinted before anything is sent: duplicates
+within a run are dropped and keys already known to be revoked are skipped
+unless a recheck is requested. Each remaining key costs one /v1/models
+request, which proves the key works without spending tokens. Probes can be
+sharded across worker processes, each with its own connection pool, or with
+HTTP/2 run on worker threads that share one multiplexed connection, and
+completed keys can be journaled so an interrupted run resumes where it stopped.
+"""
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from typing import Dict, Iterable, Iterator, List, Optional
+from openai import OpenAI, APIError
+from .errors import TerminalReason, REASON_MESSAGES, classify_error
+from .keyindex import RevokedKeyIndex, normalize_key, key_fingerprint, mask_key
+from .sharding import chunked, ordered_map, sharded_map
+from .journal import Journal
+from .streaming import iter_file_lines, prefetch
+from .transport import TransportStats, make_http_client, _require_h2
+
+# Terminal reasons that mean the key itself will never work again
+REVOKED_REASONS = {TerminalReason.INVALID_KEY, TerminalReason.DEACTIVATED_ORG}
+
+# Connection pool shared by all probes of one worker process
+_http_client = None
+
+
+def iter_key_lines(lines: Iterable[str]) -> Iterator[str]:
+    """
+    Yield candidate keys from lines of text, skipping blanks and comments.
+    """
+    for line in lines:
+        key = normalize_key(line)
+        if key and not key.startswith("#"):
+            yield key
+
+
+def validate_key(key: str, http_client=None) -> Dict:
+    """
+    Check whether a key is accepted by the API.
+    Returns a dictionary with the status and a readable message.
+    """
+    # Imported here to avoid a circular import with api_key_tester
+    from .api_key_tester import validate_key_format
+
+    if not validate_key_format(key):
+        return {"status": "invalid_format", "message": "❌ Invalid API key format"}
+    try:
+        client = OpenAI(api_key=key, max_retries=1, http_client=http_client)
+        models = client.models.list()
+        return {"status": "valid", "message": f"✅ Key is valid ({len(models.data)} models visible)"}
+    except APIError as e:
+        reason = classify_error(e)
+        if reason in REVOKED_REASONS:
+            return {"status": "revoked", "message": REASON_MESSAGES[reason]}
+        if reason is not None:
+            return {"status": reason.value, "message": REASON_MESSAGES[reason]}
+        return {"status": "error", "message": f"⚠️ Could not validate key: {str(e)}"}
+    except Exception as e:
+        return {"status": "error", "message": f"⚠️ Unexpected error: {str(e)}"}
+
+
+def _init_worker():
+    """
+    Create the connection pool for the current worker process.
+    """
+    global _http_client
+    _http_client = make_http_client()
+
+
+def _validate_chunk(items: List[Dict], http_client=None) -> List[Dict]:
+    """
+    Validate the items of a shard that still need a probe.
+    Runs inside a worker process, or a worker thread when http_client is
+    given; returns one result per item, in order.
+    """
+    results = []
+    for item in items:
+        result = item["result"]
+        if result is None:
+            result = validate_key(item["key"], http_client if http_client is not None else _http_client)
+        result["key"] = mask_key(item["key"])
+        result["fingerprint"] = item["fingerprint"]
+        results.append(result)
+    return results
+
+
+class BulkValidator:
+    """
+    Validates a stream of keys once each, consulting and updating the revoked-key index.
+    """
+
+    def __init__(
+        self,
+        index: RevokedKeyIndex,
+        recheck: bool = False,
+        workers: int = 1,
+        journal: Optional[Journal] = None,
+        http2: bool = False
+    ):
+        self.index = index
+        self.recheck = recheck
+        self.workers = workers
+        self.journal = journal
+        self.http2 = http2
+        self.stats = TransportStats() if http2 else None
+        # Exact, so a distinct key is never mistaken for a duplicate and left unprobed
+        self.seen = set()
+        self.counts: Dict[str, int] = {}
+        self.resumed = 0
+
+    def _count(self, status: str):
+        self.counts[status] = self.counts.get(status, 0) + 1
+
+    def triage(self, keys: Iterable[str]) -> Iterator[Dict]:
+        """
+        Drop duplicates and settle known-revoked keys without a probe.
+        Yields work items whose result is None when a probe is still needed.
+        """
+        for key in keys:
+            fingerprint = key_fingerprint(key)
+            if fingerprint in self.seen:
+                self._count("duplicate")
+                continue
+            self.seen.add(fingerprint)
+
+            unit = fingerprint.hex()
+            result = None
+            if self.journal is not None and unit in self.journal:
+                result = dict(self.journal.get(unit), resumed=True)
+            elif not self.recheck and fingerprint in self.index:
+                result = {"status": "known_revoked", "message": "⏭️ Skipped: key is already known to be revoked"}
+            yield {"key": key, "fingerprint": unit, "result": result}
+
+    def _multiplexed(self, items: Iterable[Dict]) -> Iterator[Dict]:
+        """
+        Validate items on worker threads sharing one HTTP/2 client, so
+        concurrent probes travel as streams over a single connection.
+        """
+        workers = max(self.workers, 1)
+        http_client = make_http_client(True, self.stats)
+        try:
+            with ThreadPoolExecutor(max_workers=workers) as executor:
+                probe = partial(_validate_chunk, http_client=http_client)
+                for results in ordered_map(executor, probe, chunked(items, 1), workers * 2):
+                    yield from results
+        finally:
+            http_client.close()
+
+    def run(self, keys: Iterable[str]) -> Iterator[Dict]:
+        """
+        Validate keys, sharding probes across worker processes, or across
+        threads of this process with HTTP/2. Yields result dictionaries in input order.
+        """
+        if self.http2:
+            results = self._multiplexed(self.triage(keys))
+        else:
+            results = sharded_map(_validate_chunk, self.triage(keys), self.workers, initializer=_init_worker)
+        for result in results:
+            if result["status"] == "revoked":
+                self.index.add(bytes.fromhex(result["fingerprint"]))
+            if result.pop("resumed", False):
+                self.resumed += 1
+            elif self.journal is not None:
+                self.journal.append(result["fingerprint"], result)
+            self._count(result["status"])
+            yield result
+
+    def summary(self) -> str:
+        """
+        Format the status counters into a readable summary.
+        """
+        lines = ["📊 Bulk validation summary:"]
+        for status, count in sorted(self.counts.items()):
+            lines.append(f"- {status}: {count}")
+        if self.resumed:
+            lines.append(f"- resumed from journal: {self.resumed}")
+        if self.stats is not None:
+            lines.append(self.stats.summary())
+        return "\n".join(lines)
+
+
+def run_bulk(args) -> None:
+    """
+    Run the bulk subcommand.
+    Reading, probing and output run as stages joined by bounded queues, so
+    memory use does not grow with the size of the key file.
+    """
+    if args.http2:
+        try:
+            _require_h2()
+        except RuntimeError as e:
+            print(f"❌ Error: {str(e)}")
+            return
+    index = RevokedKeyIndex(args.index)
+    journal = Journal(args.resume) if args.resume else None
+    validator = BulkValidator(index, recheck=args.recheck, workers=args.workers, journal=journal, http2=args.http2)
+    try:
+        print(f"ℹ️ Revoked-key index: {len(index)} known keys ({args.index})")
+        if journal is not None:
+            print(f"ℹ️ Journal: {len(journal.completed)} keys already completed ({args.resume})")
+        if args.http2:
+            print(f"ℹ️ Multiplexing probes of {args.workers} worker threads over one HTTP/2 connection")
+        elif args.workers > 1:
+            print(f"ℹ️ Sharding probes across {args.workers} worker processes")
+        print()
+        keys = prefetch(iter_key_lines(iter_file_lines(args.keyfile)), args.queue_size)
+        for result in prefetch(validator.run(keys), args.queue_size):
+            print(f"{result['key']}  {result['message']}")
+    finally:
+        if journal is not None:
+            journal.close()
+        index.save()
+        index.close()
+    print("\n" + validator.summary())
@@ -0,0 +1,134 @@
+"""
+Model catalog grouped into families.
+
+Dated snapshots such as gpt-4-0613 or gpt-4o-2024-08-06 almost always share
+access with the rest of their family. Probing one representative per family
+and fanning out only when its result is ambiguous keeps the number of
+generation probes close to the number of families rather than snapshots.
+"""
+import re
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+import requests
+from openai import OpenAI
+from .planner import ProbeCache
+
+# Model id prefixes the tester knows how to probe
+PROBE_PREFIXES = ("gpt-", "chatgpt-", "o1", "o3", "o4", "text-embedding-", "dall-e-")
+
+# Snapshot suffixes: -2024-08-06 style dates or -0613 style MMDD stamps
+SNAPSHOT_PATTERN = re.compile(r"-(\d{4}-\d{2}-\d{2}|\d{4})(?=-|$)")
+
+
+def model_family(model: str) -> str:
+    """
+    Return the family of a model id by removing snapshot date stamps.
+    e.g. gpt-4-0613 -> gpt-4, gpt-4-1106-preview -> gpt-4-preview
+    """
+    return SNAPSHOT_PATTERN.sub("", model)
+
+
+def _snapshot_order(model: str) -> Tuple[int, int]:
+    """
+    Sort key that puts undated aliases first, then the newest snapshots.
+    """
+    stamps = SNAPSHOT_PATTERN.findall(model)
+    if not stamps:
+        return (0, 0)
+    stamp = stamps[-1]
+    # Full dates rank above MMDD stamps, whose year is not part of the id
+    return (1 if len(stamp) == 10 else 2, -int(stamp.replace("-", "")))
+
+
+def group_families(models: Iterable[str]) -> Dict[str, List[str]]:
+    """
+    Group model ids by family.
+    Members are ordered so the first one is the family representative.
+    """
+    families: Dict[str, List[str]] = {}
+    for model in models:
+        families.setdefault(model_family(model), []).append(model)
+    for members in families.values():
+        members.sort(key=_snapshot_order)
+    return families
+
+
+def discover_openai_models(client: OpenAI, cache: Optional[ProbeCache] = None) -> List[str]:
+    """
+    List the models visible to the API key that the tester can probe.
+    Listing models costs no tokens, so it also serves as a free auth check.
+    """
+    if cache is None:
+        cache = ProbeCache()
+    response = cache.run(("models", "list"), lambda: list(client.models.list()))
+    return sorted(model.id for model in response if model.id.startswith(PROBE_PREFIXES))
+
+
+def discover_ollama_models(base_url: str) -> List[str]:
+    """
+    List the models installed on an Ollama server.
+    """
+    response = requests.get(f"{base_url}/api/tags", timeout=10)
+    response.raise_for_status()
+    return sorted(model.get("name", "") for model in response.json().get("models", []))
+
+
+class SearchIndex:
+    """
+    Prebuilt index over model names for filtering as the user types.
+    Lowercased names are computed once, so each keystroke is a plain scan.
+    """
+
+    def __init__(self, names: Iterable[str]):
+        self.names = list(names)
+        self._keys = [name.lower() for name in self.names]
+
+    def filter(self, query: str) -> List[str]:
+        """
+        Return the names containing every whitespace-separated term of the query.
+        """
+        terms = query.lower().split()
+        if not terms:
+            return list(self.names)
+        return [name for name, key in zip(self.names, self._keys) if all(term in key for term in terms)]
+
+
+def format_catalog_summary(families: Dict[str, List[str]], exhaustive: bool = False) -> str:
+    """
+    Format a family catalog into a one-line summary.
+    """
+    models = sum(len(members) for members in families.values())
+    mode = "exhaustive" if exhaustive else "one representative per family"
+    return f"ℹ️ Catalog: {models} models in {len(families)} families ({mode})"
+
+
+def sample_families(
+    client: OpenAI,
+    families: Dict[str, List[str]],
+    cache: ProbeCache,
+    exhaustive: bool = False
+) -> Iterator[Tuple[str, bool, str]]:
+    """
+    Probe each family's representative and infer the result for the rest.
+    Members are probed individually in exhaustive mode or when the
+    representative's result is ambiguous (a non-terminal failure).
+    Yields (model, success, message) in catalog order.
+    """
+    # Imported here to avoid a circular import with api_key_tester
+    from .api_key_tester import test_model
+
+    for members in families.values():
+        representative = members[0]
+        success, message = test_model(client, representative, cache)
+        yield representative, success, message
+
+        others = [model for model in members if model != representative]
+        if exhaustive or (not success and not cache.fail_fast.cancelled):
+            for model in others:
+                success, message = test_model(client, model, cache)
+                yield model, success, message
+        elif success:
+            for model in others:
+                yield model, True, f"✅ Model {model} is accessible (inferred from {representative})"
+        else:
+            for model in others:
+                yield model, False, f"⏭️ Skipped {model}: {cache.fail_fast.describe()}"
@@ -0,0 +1,166 @@
+"""
+Live latency dashboard for the GUI.
+
+Probe measurements go into a fixed-size ring buffer, so memory and drawing
+cost stay bounded however many runs are made. Redraws are capped at a fixed
+frame rate: measurements arriving faster than that only mark the panel dirty
+and a single trailing redraw picks them up.
+"""
+import time
+import tkinter as tk
+from collections import deque
+from tkinter import ttk
+from typing import Dict, List, NamedTuple, Optional
+
+# Measurements kept across runs
+RING_SIZE = 512
+
+# Latencies drawn per model sparkline
+SPARKLINE_POINTS = 30
+
+MAX_FPS = 10
+
+
+class Measurement(NamedTuple):
+    provider: str
+    model: str
+    latency_ms: float
+    success: bool
+
+
+class MeasurementRing:
+    """
+    Fixed-size ring buffer of probe measurements.
+    """
+
+    def __init__(self, size: int = RING_SIZE):
+        self.items = deque(maxlen=size)
+
+    def add(self, measurement: Measurement):
+        self.items.append(measurement)
+
+    def by_model(self) -> Dict[str, List[Measurement]]:
+        """
+        Group buffered measurements by provider and model, in arrival order.
+        """
+        groups: Dict[str, List[Measurement]] = {}
+        for item in self.items:
+            groups.setdefault(f"{item.provider}: {item.model}", []).append(item)
+        return groups
+
+    def mean_latency(self, model: Optional[str] = None) -> Optional[float]:
+        """
+        Return the mean latency of buffered probes, optionally for one model.
+        """
+        latencies = [item.latency_ms for item in self.items if model is None or item.model == model]
+        if not latencies:
+            return None
+        return sum(latencies) / len(latencies)
+
+
+class DashboardPanel(ttk.Frame):
+    """
+    Dashboard tab with a sparkline, success rate and last latency per model,
+    and an ETA for the remaining probes of the current run.
+    """
+
+    ROW_HEIGHT = 28
+
+    def __init__(self, parent, **kwargs):
+        super().__init__(parent, **kwargs)
+        self.ring = MeasurementRing()
+        self.remaining: List[str] = []
+        self._last_draw = 0.0
+        self._scheduled = None
+
+        self.eta_var = tk.StringVar(value="ETA: -")
+        ttk.Label(self, textvariable=self.eta_var, style="Heading.TLabel").pack(anchor=tk.W, pady=(0, 5))
+        self.canvas = tk.Canvas(self, height=260, bg="#ffffff", highlightthickness=0)
+        self.canvas.pack(fill=tk.BOTH, expand=True)
+
+    def set_remaining(self, models: List[str]):
+        """
+        Set the models still to be probed in the current run, for the ETA.
+        """
+        self.remaining = list(models)
+        self.request_redraw()
+
+    def add(self, provider: str, model: str, latency_ms: float, success: bool):
+        """
+        Record a finished probe and schedule a redraw.
+        """
+        self.ring.add(Measurement(provider, model, latency_ms, success))
+        if model in self.remaining:
+            self.remaining.remove(model)
+        self.request_redraw()
+
+    def done(self, model: str):
+        """
+        Mark a model as settled without a probe of its own, e.g. inferred.
+        """
+        if model in self.remaining:
+            self.remaining.remove(model)
+            self.request_redraw()
+
+    def request_redraw(self):
+        """
+        Redraw now if the frame budget allows, otherwise once it does.
+        Drawing happens synchronously so it also shows while a run blocks
+        the event loop; the trailing redraw catches the last updates.
+        """
+        now = time.monotonic()
+        wait = self._last_draw + 1.0 / MAX_FPS - now
+        if wait <= 0:
+            self.redraw()
+        elif self._scheduled is None:
+            self._scheduled = self.after(int(wait * 1000) + 1, self.redraw)
+
+    def _eta(self) -> str:
+        if not self.remaining:
+            return "ETA: -"
+        fallback = self.ring.mean_latency()
+        if fallback is None:
+            return f"ETA: {len(self.remaining)} probes remaining"
+        seconds = sum((self.ring.mean_latency(model) or fallback) for model in self.remaining) / 1000
+        return f"ETA: {seconds:.1f} s for {len(self.remaining)} probes"
+
+    def redraw(self):
+        """
+        Draw one row per model: name, sparkline, success rate and last latency.
+        """
+        if self._scheduled is not None:
+            self.after_cancel(self._scheduled)
+            self._scheduled = None
+        self._last_draw = time.monotonic()
+        self.eta_var.set(self._eta())
+
+        canvas = self.canvas
+        canvas.delete("all")
+        width = max(canvas.winfo_width(), 400)
+        name_width, stats_width = 220, 150
+        spark_left, spark_right = name_width, width - stats_width - 10
+
+        for row, (name, items) in enumerate(sorted(self.ring.by_model().items())):
+            top = row * self.ROW_HEIGHT + 4
+            bottom = top + self.ROW_HEIGHT - 8
+            canvas.create_text(4, (top + bottom) / 2, text=name, anchor=tk.W, font=("Segoe UI", 9))
+
+            latencies = [item.latency_ms for item in items[-SPARKLINE_POINTS:]]
+            peak = max(latencies) or 1.0
+            step = (spark_right - spark_left) / max(SPARKLINE_POINTS - 1, 1)
+            points = []
+            for i, latency in enumerate(latencies):
+                points.extend([spark_left + i * step, bottom - (bottom - top) * latency / peak])
+            if len(points) >= 4:
+                canvas.create_line(*points, fill="#0078D4", width=2)
+            else:
+                canvas.create_oval(points[0] - 2, points[1] - 2, points[0] + 2, points[1] + 2, fill="#0078D4")
+
+            rate = sum(item.success for item in items) / len(items)
+            color = "#107C10" if rate == 1 else "#D83B01" if rate < 0.5 else "#CA5010"
+            canvas.create_text(
+                width - stats_width, (top + bottom) / 2, anchor=tk.W, fill=color,
+                text=f"{rate:.0%} ok  {items[-1].latency_ms:.0f} ms", font=("Consolas", 9)
+            )
+        canvas.configure(scrollregion=canvas.bbox("all") or (0, 0, 0, 0))
+        self.update_idletasks()
@@ -0,0 +1,221 @@
+"""
+Embedding throughput benchmark for OpenAI and Ollama.
+
+Sends batches of inputs of configurable size to /v1/embeddings or Ollama's
+/api/embed and reports latency and vectors per second for each batch size.
+Every returned batch is checked as a whole with NumPy: vector count,
+consistent dimensions, finite values and non-zero norms.
+"""
+import os
+import time
+from typing import Callable, Dict, List, Sequence
+import requests
+from openai import OpenAI
+from .errors import FailFast, ProbeCancelled
+
+DEFAULT_OPENAI_EMBEDDING_MODEL = "text-embedding-ada-002"
+DEFAULT_OLLAMA_EMBEDDING_MODEL = "nomic-embed-text"
+DEFAULT_BATCH_SIZES = [1, 8, 32, 128]
+
+
+def _require_numpy():
+    """
+    Import NumPy, which is only needed by the benchmarks.
+    """
+    try:
+        import numpy
+    except ImportError:
+        raise RuntimeError(
+            "The embedding benchmark requires NumPy. "
+            "Install it with: pip install 'openai-api-key-tester[bench]'"
+        )
+    return numpy
+
+
+def make_batch(batch_size: int, batch_index: int) -> List[str]:
+    """
+    Build a batch of distinct inputs so no server-side cache can short-circuit it.
+    """
+    return [
+        f"Benchmark input {batch_index}-{i}: the quick brown fox jumps over the lazy dog."
+        for i in range(batch_size)
+    ]
+
+
+def check_vectors(vectors: Sequence[Sequence[float]], expected: int) -> Dict:
+    """
+    Check a whole batch of embedding vectors at once.
+    Returns a dictionary with the dimensions, norm range and any problem found.
+    """
+    np = _require_numpy()
+    try:
+        matrix = np.asarray(vectors, dtype=np.float32)
+    except ValueError:
+        return {"ok": False, "problem": "vectors have inconsistent dimensions"}
+
+    if matrix.ndim != 2 or matrix.shape[0] != expected:
+        return {"ok": False, "problem": f"expected {expected} vectors, got shape {matrix.shape}"}
+    if not np.isfinite(matrix).all():
+        return {"ok": False, "problem": "vectors contain NaN or infinite values"}
+
+    norms = np.linalg.norm(matrix, axis=1)
+    if (norms == 0).any():
+        return {"ok": False, "problem": f"{int((norms == 0).sum())} zero vectors"}
+    return {
+        "ok": True,
+        "problem": None,
+        "dimensions": int(matrix.shape[1]),
+        "norm_min": float(norms.min()),
+        "norm_max": float(norms.max())
+    }
+
+
+def _run_benchmark(
+    embed: Callable[[List[str]], List[List[float]]],
+    batch_sizes: Sequence[int],
+    batches: int
+) -> List[Dict]:
+    """
+    Run every batch size through an embed function and collect statistics.
+    Stops early when a terminal error (bad key, unreachable host) shows up.
+    """
+    np = _require_numpy()
+    fail_fast = FailFast()
+    results = []
+    for batch_size in batch_sizes:
+        latencies = []
+        problems = []
+        dimensions = set()
+        norm_min, norm_max = float("inf"), 0.0
+        for batch_index in range(batches):
+            try:
+                fail_fast.check()
+                inputs = make_batch(batch_size, batch_index)
+                start = time.perf_counter()
+                vectors = embed(inputs)
+                latencies.append(time.perf_counter() - start)
+            except ProbeCancelled as e:
+                problems.append(str(e))
+                break
+            except Exception as e:
+                fail_fast.record(e)
+                problems.append(str(e))
+                continue
+
+            check = check_vectors(vectors, batch_size)
+            if check["ok"]:
+                dimensions.add(check["dimensions"])
+                norm_min = min(norm_min, check["norm_min"])
+                norm_max = max(norm_max, check["norm_max"])
+            else:
+                problems.append(check["problem"])
+
+        timings = np.asarray(latencies) * 1000
+        results.append({
+            "batch_size": batch_size,
+            "batches": len(latencies),
+            "vectors_per_sec": (batch_size * len(latencies) / (timings.sum() / 1000)) if latencies else 0.0,
+            "latency_mean_ms": float(timings.mean()) if latencies else None,
+            "latency_p50_ms": float(np.percentile(timings, 50)) if latencies else None,
+            "latency_p95_ms": float(np.percentile(timings, 95)) if latencies else None,
+            "dimensions": sorted(dimensions),
+            "norm_min": norm_min if dimensions else None,
+            "norm_max": norm_max if dimensions else None,
+            "problems": problems
+        })
+        if fail_fast.cancelled:
+            break
+    return results
+
+
+def benchmark_openai_embeddings(
+    client: OpenAI,
+    model: str = DEFAULT_OPENAI_EMBEDDING_MODEL,
+    batch_sizes: Sequence[int] = DEFAULT_BATCH_SIZES,
+    batches: int = 5
+) -> List[Dict]:
+    """
+    Benchmark an OpenAI embedding model through /v1/embeddings.
+    Returns one result dictionary per batch size.
+    """
+    def embed(inputs: List[str]) -> List[List[float]]:
+        response = client.embeddings.create(model=model, input=inputs, encoding_format="float")
+        return [item.embedding for item in sorted(response.data, key=lambda item: item.index)]
+
+    print(f"📊 Benchmarking OpenAI embeddings with {model}...")
+    return _run_benchmark(embed, batch_sizes, batches)
+
+
+def benchmark_ollama_embeddings(
+    base_url: str,
+    model: str = DEFAULT_OLLAMA_EMBEDDING_MODEL,
+    batch_sizes: Sequence[int] = DEFAULT_BATCH_SIZES,
+    batches: int = 5
+) -> List[Dict]:
+    """
+    Benchmark an Ollama embedding model through /api/embed.
+    Returns one result dictionary per batch size.
+    """
+    session = requests.Session()
+
+    def embed(inputs: List[str]) -> List[List[float]]:
+        response = session.post(f"{base_url}/api/embed", json={"model": model, "input": inputs})
+        response.raise_for_status()
+        return response.json().get("embeddings", [])
+
+    print(f"📊 Benchmarking Ollama embeddings with {model}...")
+    return _run_benchmark(embed, batch_sizes, batches)
+
+
+def format_embedding_report(results: List[Dict]) -> str:
+    """
+    Format benchmark results into a readable table.
+    """
+    lines = [
+        f"{'Batch':>6} {'Runs':>5} {'Vectors/s':>10} {'Mean ms':>9} {'p50 ms':>9} {'p95 ms':>9} {'Dims':>6} {'Norms':>15}",
+        "-" * 76
+    ]
+    for result in results:
+        if result["batches"]:
+            dims = ",".join(str(d) for d in result["dimensions"]) or "-"
+            norms = f"{result['norm_min']:.3f}-{result['norm_max']:.3f}" if result["norm_min"] is not None else "-"
+            lines.append(
+                f"{result['batch_size']:>6} {result['batches']:>5} {result['vectors_per_sec']:>10.1f} "
+                f"{result['latency_mean_ms']:>9.1f} {result['latency_p50_ms']:>9.1f} "
+                f"{result['latency_p95_ms']:>9.1f} {dims:>6} {norms:>15}"
+            )
+        else:
+            lines.append(f"{result['batch_size']:>6} {0:>5} {'-':>10}")
+        for problem in sorted(set(result["problems"])):
+            lines.append(f"       ⚠️ {problem}")
+    return "\n".join(lines)
+
+
+def run_embedding_benchmark(args) -> None:
+    """
+    Run the embed-bench subcommand.
+    """
+    try:
+        _require_numpy()
+    except RuntimeError as e:
+        print(f"❌ Error: {str(e)}")
+        return
+    if args.provider == "openai":
+        api_key = os.getenv("OPENAI_API_KEY")
+        if not api_key:
+            print("❌ Error: OPENAI_API_KEY is not set")
+            return
+        results = benchmark_openai_embeddings(
+            OpenAI(api_key=api_key),
+            args.model or DEFAULT_OPENAI_EMBEDDING_MODEL,
+            args.batch_sizes,
+            args.batches
+        )
+    else:
+        results = benchmark_ollama_embeddings(
+            os.getenv("OLLAMA_API_URL", "http://localhost:11434"),
+            args.model or DEFAULT_OLLAMA_EMBEDDING_MODEL,
+            args.batch_sizes,
+            args.batches
+        )
+    print("\n" + format_embedding_report(results))
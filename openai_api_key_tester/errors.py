@@ -0,0 +1,150 @@
+"""
+Classification of terminal probe errors and fail-fast cancellation.
+
+Some errors say nothing about the model being probed and everything about
+the key or endpoint: a revoked key, a deactivated organisation, exhausted
+quota or a host that does not resolve. Once one of these is seen, every
+other probe for the same key or endpoint would fail the same way, so the
+remaining probes are cancelled instead of sent.
+"""
+import socket
+import threading
+from enum import Enum
+from typing import Optional
+
+
+class TerminalReason(Enum):
+    """Errors that make every further probe for a key or endpoint pointless."""
+    INVALID_KEY = "invalid_key"
+    DEACTIVATED_ORG = "deactivated_org"
+    QUOTA_EXHAUSTED = "quota_exhausted"
+    DNS_FAILURE = "dns_failure"
+    CONNECTION_REFUSED = "connection_refused"
+
+
+REASON_MESSAGES = {
+    TerminalReason.INVALID_KEY: "❌ API key is invalid or revoked",
+    TerminalReason.DEACTIVATED_ORG: "❌ Organization or account is deactivated",
+    TerminalReason.QUOTA_EXHAUSTED: "❌ API quota exceeded",
+    TerminalReason.DNS_FAILURE: "❌ API host could not be resolved",
+    TerminalReason.CONNECTION_REFUSED: "❌ API endpoint refused the connection",
+}
+
+# Error codes returned by the OpenAI API for terminal conditions
+DEACTIVATED_CODES = {"account_deactivated", "organization_deactivated", "deactivated_workspace"}
+QUOTA_CODES = {"insufficient_quota", "billing_hard_limit_reached"}
+
+# Substrings of resolver errors across platforms and HTTP libraries
+DNS_MARKERS = (
+    "name or service not known",
+    "nodename nor servname provided",
+    "getaddrinfo failed",
+    "temporary failure in name resolution",
+    "failed to resolve",
+    "no address associated with hostname",
+)
+
+
+class BudgetExceeded(Exception):
+    """Raised instead of sending a probe that would exceed the budget."""
+
+
+class ProbeCancelled(Exception):
+    """Raised instead of sending a probe once its key or endpoint has failed terminally."""
+
+    def __init__(self, reason: TerminalReason, error: Optional[BaseException] = None):
+        super().__init__(REASON_MESSAGES[reason])
+        self.reason = reason
+        self.error = error
+
+
+def _error_chain(error: BaseException):
+    """
+    Yield an error and every error it was raised from.
+    """
+    seen = set()
+    while error is not None and id(error) not in seen:
+        seen.add(id(error))
+        yield error
+        error = error.__cause__ or error.__context__
+
+
+def classify_error(error: BaseException) -> Optional[TerminalReason]:
+    """
+    Classify an SDK or HTTP error.
+    Returns the terminal reason, or None if the error only concerns one probe.
+    """
+    if isinstance(error, ProbeCancelled):
+        return error.reason
+
+    status = getattr(error, "status_code", None)
+    if status is None:
+        response = getattr(error, "response", None)
+        status = getattr(response, "status_code", None)
+    code = str(getattr(error, "code", "") or "")
+    message = str(error).lower()
+
+    if code in DEACTIVATED_CODES or (status in (401, 403) and "deactivated" in message):
+        return TerminalReason.DEACTIVATED_ORG
+    if status == 401:
+        return TerminalReason.INVALID_KEY
+    if code in QUOTA_CODES or "exceeded your current quota" in message:
+        return TerminalReason.QUOTA_EXHAUSTED
+
+    for cause in _error_chain(error):
+        if isinstance(cause, socket.gaierror):
+            return TerminalReason.DNS_FAILURE
+        if isinstance(cause, ConnectionRefusedError):
+            return TerminalReason.CONNECTION_REFUSED
+        cause_message = str(cause).lower()
+        if any(marker in cause_message for marker in DNS_MARKERS):
+            return TerminalReason.DNS_FAILURE
+        if "connection refused" in cause_message:
+            return TerminalReason.CONNECTION_REFUSED
+    return None
+
+
+class FailFast:
+    """
+    Cancellation scope shared by all probes for one key or endpoint.
+    Thread-safe, so concurrent probes can share a single scope.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._cancelled = threading.Event()
+        self.reason: Optional[TerminalReason] = None
+        self.error: Optional[BaseException] = None
+
+    @property
+    def cancelled(self) -> bool:
+        return self._cancelled.is_set()
+
+    def record(self, error: BaseException) -> Optional[TerminalReason]:
+        """
+        Record a probe error and cancel the scope if it is terminal.
+        Returns the terminal reason, if any.
+        """
+        reason = classify_error(error)
+        if reason is not None:
+            with self._lock:
+                if not self._cancelled.is_set():
+                    self.reason = reason
+                    self.error = error
+                    self._cancelled.set()
+        return reason
+
+    def check(self):
+        """
+        Raise ProbeCancelled if the scope has been cancelled.
+        """
+        if self._cancelled.is_set():
+            raise ProbeCancelled(self.reason, self.error)
+
+    def describe(self) -> str:
+        """
+        Return a readable message for the cancellation reason.
+        """
+        if self.reason is None:
+            return ""
+        return REASON_MESSAGES[self.reason]
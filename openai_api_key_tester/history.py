@@ -0,0 +1,214 @@
+"""
+Columnar history of probe results.
+
+Every run is written as one Parquet file under a directory partitioned by
+day (date=YYYY-MM-DD), so questions such as "p95 latency of gpt-4 per day"
+or "when did this key lose dall-e-3" only read the partitions and columns
+they need instead of parsing a whole text log.
+"""
+import os
+import uuid
+from datetime import datetime, timedelta, timezone
+from typing import Dict, List, Optional
+from .defaults import DEFAULT_HISTORY_DIR
+
+COLUMNS = [
+    "checked_at", "run_id", "provider", "target", "key_fingerprint",
+    "model", "success", "status", "latency_ms", "message"
+]
+
+
+def _require_pyarrow():
+    """
+    Import PyArrow, which is only needed by the history store.
+    """
+    try:
+        import pyarrow
+        import pyarrow.dataset
+        import pyarrow.parquet
+    except ImportError:
+        raise RuntimeError(
+            "The result history requires PyArrow. "
+            "Install it with: pip install 'openai-api-key-tester[history]'"
+        )
+    return pyarrow
+
+
+def history_available() -> bool:
+    """
+    Return True if PyArrow is installed and runs can be recorded.
+    """
+    try:
+        _require_pyarrow()
+        return True
+    except RuntimeError:
+        return False
+
+
+def _schema():
+    pa = _require_pyarrow()
+    return pa.schema([
+        ("checked_at", pa.timestamp("ms", tz="UTC")),
+        ("run_id", pa.string()),
+        ("provider", pa.string()),
+        ("target", pa.string()),
+        ("key_fingerprint", pa.string()),
+        ("model", pa.string()),
+        ("success", pa.bool_()),
+        ("status", pa.string()),
+        ("latency_ms", pa.float64()),
+        ("message", pa.string()),
+    ])
+
+
+class HistoryRecorder:
+    """
+    Collects the results of one run and appends them to the history store.
+    """
+
+    def __init__(self, history_dir: str = DEFAULT_HISTORY_DIR):
+        self.history_dir = history_dir
+        self.run_id = uuid.uuid4().hex[:12]
+        self.rows: List[Dict] = []
+
+    def record(
+        self,
+        provider: str,
+        target: str,
+        model: str,
+        success: bool,
+        status: str,
+        message: str,
+        latency_ms: Optional[float] = None,
+        key_fingerprint: Optional[str] = None
+    ):
+        """
+        Add one probe result to the run.
+        """
+        self.rows.append({
+            "checked_at": datetime.now(timezone.utc),
+            "run_id": self.run_id,
+            "provider": provider,
+            "target": target,
+            "key_fingerprint": key_fingerprint,
+            "model": model,
+            "success": success,
+            "status": status,
+            "latency_ms": latency_ms,
+            "message": message
+        })
+
+    def flush(self) -> Optional[str]:
+        """
+        Write the run's results as a Parquet file in today's partition.
+        Returns the path written, or None if there was nothing to write.
+        """
+        if not self.rows:
+            return None
+        pa = _require_pyarrow()
+        day = self.rows[0]["checked_at"].strftime("%Y-%m-%d")
+        partition = os.path.join(self.history_dir, f"date={day}")
+        os.makedirs(partition, exist_ok=True)
+
+        table = pa.Table.from_pylist(self.rows, schema=_schema())
+        path = os.path.join(partition, f"run-{self.run_id}.parquet")
+        tmp_path = path + ".tmp"
+        pa.parquet.write_table(table, tmp_path, compression="zstd")
+        os.replace(tmp_path, path)
+        self.rows = []
+        return path
+
+
+def _dataset(history_dir: str):
+    pa = _require_pyarrow()
+    return pa.dataset.dataset(
+        history_dir,
+        format="parquet",
+        partitioning=pa.dataset.partitioning(pa.schema([("date", pa.string())]), flavor="hive"),
+        exclude_invalid_files=True
+    )
+
+
+def query_latency(history_dir: str, model: str, days: int = 90, percentile: float = 95) -> List[Dict]:
+    """
+    Return the latency percentile of a model per day over the last days.
+    Only the date partitions in range and the model and latency columns are read.
+    """
+    pa = _require_pyarrow()
+    import pyarrow.compute as pc
+
+    since = (datetime.now(timezone.utc) - timedelta(days=days)).strftime("%Y-%m-%d")
+    field = pa.dataset.field
+    table = _dataset(history_dir).to_table(
+        columns=["date", "latency_ms", "success"],
+        filter=(field("date") >= since) & (field("model") == model) & field("latency_ms").is_valid()
+    )
+    if table.num_rows == 0:
+        return []
+    grouped = table.group_by("date").aggregate([
+        ("latency_ms", "tdigest", pc.TDigestOptions(q=percentile / 100)),
+        ("latency_ms", "count"),
+        ("success", "mean"),
+    ]).sort_by("date")
+    return [
+        {
+            "date": row["date"],
+            "latency_ms": row["latency_ms_tdigest"][0],
+            "probes": row["latency_ms_count"],
+            "success_rate": row["success_mean"]
+        }
+        for row in grouped.to_pylist()
+    ]
+
+
+def query_changes(history_dir: str, key_fingerprint: str, model: str) -> List[Dict]:
+    """
+    Return the points in time where a key gained or lost access to a model.
+    """
+    pa = _require_pyarrow()
+    field = pa.dataset.field
+    table = _dataset(history_dir).to_table(
+        columns=["checked_at", "success", "status"],
+        filter=(field("key_fingerprint") == key_fingerprint) & (field("model") == model)
+        & (field("status") != "skipped")
+    ).sort_by("checked_at")
+
+    changes = []
+    previous = None
+    for row in table.to_pylist():
+        if row["success"] != previous:
+            changes.append(row)
+            previous = row["success"]
+    return changes
+
+
+def run_history(args) -> None:
+    """
+    Run the history subcommand.
+    """
+    if not os.path.isdir(args.history_dir):
+        print(f"ℹ️ No recorded history in {args.history_dir}")
+        return
+    if args.query == "latency":
+        rows = query_latency(args.history_dir, args.model, args.days, args.percentile)
+        if not rows:
+            print(f"ℹ️ No recorded latencies for {args.model} in the last {args.days} days")
+            return
+        print(f"📊 p{args.percentile:g} latency of {args.model} per day:")
+        print(f"{'Date':<12} {'Latency ms':>11} {'Probes':>7} {'Success':>8}")
+        for row in rows:
+            print(f"{row['date']:<12} {row['latency_ms']:>11.1f} {row['probes']:>7} {row['success_rate']:>8.0%}")
+    else:
+        # Imported here so the history module stays free of key handling
+        from .keyindex import key_fingerprint, normalize_key, mask_key
+        key = normalize_key(args.key)
+        changes = query_changes(args.history_dir, key_fingerprint(key).hex(), args.model)
+        if not changes:
+            print(f"ℹ️ No recorded probes of {args.model} with key {mask_key(key)}")
+            return
+        print(f"📊 Access changes of {mask_key(key)} to {args.model}:")
+        for row in changes:
+            state = "✅ gained access" if row["success"] else "❌ lost access"
+            if row is changes[0]:
+                state = "✅ first seen with access" if row["success"] else "❌ first seen without access"
+            print(f"- {row['checked_at'].strftime('%Y-%m-%d %H:%M:%S UTC')}: {state}")
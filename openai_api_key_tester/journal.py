@@ -0,0 +1,92 @@
+"""
+Append-only journal of completed work units for resumable bulk runs.
+
+Each completed unit is written as one JSON line. Lines are flushed to the
+OS as they are written, so a crashed process loses nothing, and fsynced in
+batches, so a power loss loses at most the last batch. A torn last line
+left by a crash is ignored and cut off before new entries are appended.
+"""
+import json
+import os
+import time
+from typing import Dict, Optional
+
+
+class Journal:
+    """
+    Journal of completed units keyed by a unit id such as a key fingerprint.
+    Opening an existing journal loads its completed units for resuming.
+    """
+
+    def __init__(self, path: str, sync_every: int = 64, sync_interval: float = 1.0):
+        self.path = path
+        self.sync_every = sync_every
+        self.sync_interval = sync_interval
+        self.completed: Dict[str, Dict] = {}
+        self._unsynced = 0
+        self._last_sync = time.monotonic()
+
+        valid_size = self._load()
+        self._file = open(path, "ab")
+        if self._file.tell() > valid_size:
+            # Drop a torn line so the next entry starts on a fresh line
+            self._file.truncate(valid_size)
+            self._file.seek(valid_size)
+
+    def _load(self) -> int:
+        """
+        Read completed units from an existing journal.
+        Returns the size in bytes of the intact part of the file.
+        """
+        if not os.path.exists(self.path):
+            return 0
+        valid_size = 0
+        with open(self.path, "rb") as f:
+            for line in f:
+                if not line.endswith(b"\n"):
+                    break
+                try:
+                    entry = json.loads(line)
+                    self.completed[entry["unit"]] = entry["result"]
+                except (ValueError, KeyError, TypeError):
+                    break
+                valid_size += len(line)
+        return valid_size
+
+    def __contains__(self, unit: str) -> bool:
+        return unit in self.completed
+
+    def get(self, unit: str) -> Optional[Dict]:
+        """
+        Return the recorded result of a completed unit, if any.
+        """
+        return self.completed.get(unit)
+
+    def append(self, unit: str, result: Dict):
+        """
+        Record a completed unit.
+        """
+        line = json.dumps({"unit": unit, "result": result}, ensure_ascii=False) + "\n"
+        self._file.write(line.encode("utf-8"))
+        self._file.flush()
+        self.completed[unit] = result
+        self._unsynced += 1
+        if self._unsynced >= self.sync_every or time.monotonic() - self._last_sync >= self.sync_interval:
+            self.sync()
+
+    def sync(self):
+        """
+        Force journaled entries to stable storage.
+        """
+        if self._unsynced:
+            os.fsync(self._file.fileno())
+            self._unsynced = 0
+        self._last_sync = time.monotonic()
+
+    def close(self):
+        """
+        Sync and close the journal file.
+        """
+        if not self._file.closed:
+            self.sync()
+            self._file.close()
@@ -0,0 +1,423 @@
+"""
+Key × model access matrix.
+
+Checks which of many keys can use which models. Every (key, model) cell is
+one probe, and cells are scheduled concurrently on a shared pool of
+workers. Each key has its own lane with its own concurrency limit and
+backoff state. A key that is rate limited halves its limit and waits. A key
+that fails terminally cancels the rest of its row. Neither slows down the
+other keys. Cells are reported as they finish and each row is printed as
+soon as it is complete, so the matrix fills in while the audit runs. With a
+budget, each key probes the cheapest models first, and a cell whose probe
+would not fit is skipped; the estimates of probes still in flight count
+against the budget until their usage is charged.
+"""
+import json
+import queue
+import random
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Deque, Dict, Iterable, Iterator, List, Optional, Tuple
+from openai import OpenAI, APIError
+from .budget import Budget, ProbeCost, budget_from_args, estimate_probe_cost, format_cost_estimate, order_by_cost
+from .errors import BudgetExceeded, FailFast, REASON_MESSAGES
+from .keyindex import key_fingerprint, mask_key
+from .transport import TransportStats, make_http_client
+
+# Backoff after a rate limit response without a usable Retry-After header
+BASE_BACKOFF = 1.0
+MAX_BACKOFF = 60.0
+
+# One character per cell in the printed matrix
+CELL_SYMBOLS = {
+    "ok": "Y",
+    "unavailable": "N",
+    "failed": "!",
+    "rate_limited": "R",
+    "skipped": "-",
+}
+
+
+def format_matrix_header(models: List[str], label_width: int) -> str:
+    """
+    Format the legend and column numbers of an access matrix.
+    """
+    lines = ["📊 Access matrix (Y accessible, N not available, ! failed, R rate limited, - skipped):"]
+    lines.extend(f"  {index:>2}  {model}" for index, model in enumerate(models, 1))
+    lines.append(" " * (label_width + 2) + " ".join(f"{index:>2}" for index in range(1, len(models) + 1)))
+    return "\n".join(lines)
+
+
+def format_matrix_row(label: str, cells: Dict[str, Dict], models: List[str], label_width: int) -> str:
+    """
+    Format one key's row of an access matrix; unfinished cells show as '.'.
+    """
+    symbols = [CELL_SYMBOLS[cells[model]["status"]] if model in cells else "." for model in models]
+    return f"{label:<{label_width}}  " + " ".join(f"{symbol:>2}" for symbol in symbols)
+
+
+def _retry_after(error: BaseException) -> Optional[float]:
+    """
+    Return the delay a rate limit response asks for, in seconds, if it gives one.
+    """
+    response = getattr(error, "response", None)
+    headers = getattr(response, "headers", None) or {}
+    try:
+        if headers.get("retry-after-ms"):
+            return float(headers["retry-after-ms"]) / 1000
+        if headers.get("retry-after"):
+            return float(headers["retry-after"])
+    except ValueError:
+        pass
+    return None
+
+
+class KeyLane:
+    """
+    Per-key scheduling state: the models left to probe, the concurrency
+    limit and the backoff after rate limiting.
+    """
+
+    def __init__(self, key: str, fingerprint: str, models: Iterable[str], limit: int, http_client=None):
+        self.key = key
+        self.fingerprint = fingerprint
+        self.masked = mask_key(key)
+        self.pending: Deque[str] = deque(models)
+        self.max_limit = limit
+        self.limit = limit
+        self.running = 0
+        self.ready_at = 0.0
+        self.backoff = 0.0
+        self.attempts: Dict[str, int] = {}
+        self.rate_limited = 0
+        self.fail_fast = FailFast()
+        self.cells: Dict[str, Dict] = {}
+        # Retries are scheduled by the lane, not by the SDK
+        self.client = OpenAI(api_key=key, max_retries=0, http_client=http_client)
+
+    def can_start(self, now: float) -> bool:
+        return bool(self.pending) and self.running < self.limit and now >= self.ready_at
+
+    def on_rate_limit(self, retry_after: Optional[float]):
+        """
+        Halve the concurrency limit and hold the lane back.
+        """
+        self.rate_limited += 1
+        self.limit = max(1, self.limit // 2)
+        self.backoff = min(MAX_BACKOFF, max(BASE_BACKOFF, self.backoff * 2))
+        # Jitter keeps lanes limited at the same moment from retrying in step
+        delay = retry_after if retry_after is not None else self.backoff * random.uniform(0.5, 1.0)
+        self.ready_at = max(self.ready_at, time.monotonic() + delay)
+
+    def on_success(self):
+        """
+        Grow the concurrency limit back one step at a time.
+        """
+        self.backoff = 0.0
+        if self.limit < self.max_limit:
+            self.limit += 1
+
+
+class MatrixScheduler:
+    """
+    Probes every (key, model) cell with a per-key concurrency limit.
+    """
+
+    def __init__(
+        self,
+        keys: Iterable[str],
+        models: List[str],
+        workers: int = 16,
+        per_key: int = 2,
+        max_attempts: int = 4,
+        http2: bool = False,
+        stream: bool = False,
+        budget: Optional[Budget] = None
+    ):
+        # A model named twice is one column, so every row can complete
+        self.models = list(dict.fromkeys(models))
+        self.workers = workers
+        self.max_attempts = max_attempts
+        self.stream = stream
+        self.budget = budget
+        # Estimated cost of the probes in flight, not charged to the budget yet
+        self.held = ProbeCost(0, 0.0)
+        self.http2 = http2
+        self.stats = TransportStats()
+        # One connection pool for all keys; credentials are per request
+        self.http_client = make_http_client(http2, self.stats)
+        self.lanes: List[KeyLane] = []
+        self.duplicates = 0
+        # Cheapest first, so a tight budget covers as many cells as possible
+        order = list(order_by_cost({model: [model] for model in self.models})) if budget is not None else self.models
+        seen = set()
+        for key in keys:
+            fingerprint = key_fingerprint(key).hex()
+            if fingerprint in seen:
+                self.duplicates += 1
+                continue
+            seen.add(fingerprint)
+            self.lanes.append(KeyLane(key, fingerprint, order, per_key, self.http_client))
+        self.sent = 0
+        self.elapsed = 0.0
+        self._results = queue.Queue()
+        self._next_lane = 0
+        self._budget_wait = False
+
+    def _probe(self, lane: KeyLane, model: str):
+        """
+        Send one probe. Runs in a worker thread; the outcome goes to the result queue.
+        """
+        # Imported here to avoid a circular import with api_key_tester
+        from .api_key_tester import send_probe
+        start = time.perf_counter()
+        try:
+            response = send_probe(lane.client, model, self.stream)
+            error = None
+        except Exception as e:
+            response, error = None, e
+        self._results.put((lane, model, response, error, (time.perf_counter() - start) * 1000))
+
+    def _admit(self, model: str) -> Tuple[Optional[bool], str]:
+        """
+        Check a cell against the budget before it is sent. Returns True to
+        send it, None to wait for probes in flight to be charged, or False
+        with the reason if it does not fit at all.
+        """
+        if self.budget is None:
+            return True, ""
+        try:
+            self.budget.check(model)
+        except BudgetExceeded as e:
+            return False, str(e)
+        estimate = estimate_probe_cost(model)
+        with_held = ProbeCost(self.held.tokens + estimate.tokens, self.held.dollars + estimate.dollars, estimate.images)
+        if not self.budget.allows(with_held):
+            return None, ""
+        self.held = with_held
+        return True, ""
+
+    def _release(self, model: str, response):
+        """
+        Replace the estimate held for a finished probe by the usage it reports.
+        Failed probes are not billed.
+        """
+        if self.budget is None:
+            return
+        estimate = estimate_probe_cost(model)
+        self.held = ProbeCost(self.held.tokens - estimate.tokens, self.held.dollars - estimate.dollars)
+        if response is not None:
+            self.budget.charge(model, response)
+
+    def _dispatch(self, executor: ThreadPoolExecutor, running: int) -> Tuple[int, List[Tuple[KeyLane, str, str]]]:
+        """
+        Start cells round-robin across the lanes that may start one.
+        Returns the number of probes now running and the cells that do not
+        fit the budget, with the reason.
+        """
+        now = time.monotonic()
+        skipped: List[Tuple[KeyLane, str, str]] = []
+        if not running:
+            # Nothing in flight, so nothing is held; drop rounding left over from releases
+            self.held = ProbeCost(0, 0.0)
+        self._budget_wait = False
+        started = True
+        while started and running < self.workers and not self._budget_wait:
+            started = False
+            for offset in range(len(self.lanes)):
+                if running >= self.workers:
+                    break
+                index = (self._next_lane + offset) % len(self.lanes)
+                lane = self.lanes[index]
+                if not lane.can_start(now):
+                    continue
+                model = lane.pending.popleft()
+                admitted, reason = self._admit(model)
+                if admitted is None:
+                    # Retried once the probes in flight have been charged
+                    lane.pending.appendleft(model)
+                    self._budget_wait = True
+                    break
+                if not admitted:
+                    skipped.append((lane, model, reason))
+                    started = True
+                    continue
+                lane.running += 1
+                lane.attempts[model] = lane.attempts.get(model, 0) + 1
+                running += 1
+                self.sent += 1
+                executor.submit(self._probe, lane, model)
+                self._next_lane = index + 1
+                started = True
+        return running, skipped
+
+    def _cell(self, lane: KeyLane, model: str, status: str, message: str, latency_ms: Optional[float] = None) -> Dict:
+        cell = {
+            "key": lane.masked,
+            "fingerprint": lane.fingerprint,
+            "model": model,
+            "status": status,
+            "message": message,
+            "latency_ms": round(latency_ms, 1) if latency_ms is not None else None,
+            "attempts": lane.attempts.get(model, 0),
+        }
+        lane.cells[model] = cell
+        return cell
+
+    def _settle(self, lane: KeyLane, model: str, error: Optional[BaseException], latency_ms: float) -> List[Dict]:
+        """
+        Turn a probe outcome into finished cells, or requeue it after a rate limit.
+        """
+        if error is None:
+            lane.on_success()
+            return [self._cell(lane, model, "ok", f"✅ Model {model} is accessible", latency_ms)]
+
+        reason = lane.fail_fast.record(error)
+        if reason is not None:
+            cells = [self._cell(lane, model, "failed", REASON_MESSAGES[reason], latency_ms)]
+            # Every other probe for this key would fail the same way
+            cells.extend(
+                self._cell(lane, pending, "skipped", f"⏭️ Skipped {pending}: {lane.fail_fast.describe()}")
+                for pending in lane.pending
+            )
+            lane.pending.clear()
+            return cells
+
+        status = getattr(error, "status_code", None)
+        if status == 429:
+            if lane.attempts[model] < self.max_attempts:
+                lane.on_rate_limit(_retry_after(error))
+                lane.pending.appendleft(model)
+                return []
+            return [self._cell(lane, model, "rate_limited", f"⚠️ Rate limited on {model} after {lane.attempts[model]} attempts", latency_ms)]
+        if isinstance(error, APIError) and (status in (403, 404) or "model not found" in str(error).lower()):
+            return [self._cell(lane, model, "unavailable", f"❌ Model {model} is not available with this API key", latency_ms)]
+        return [self._cell(lane, model, "failed", f"❌ Error testing {model}: {str(error)}", latency_ms)]
+
+    def run(self) -> Iterator[Tuple[KeyLane, Dict]]:
+        """
+        Probe all cells, yielding (lane, cell) pairs as cells finish.
+        """
+        # Imported here to avoid a circular import with api_key_tester
+        from .api_key_tester import validate_key_format
+
+        start = time.perf_counter()
+        for lane in self.lanes:
+            if not validate_key_format(lane.key):
+                for model in lane.pending:
+                    yield lane, self._cell(lane, model, "failed", "❌ Invalid API key format")
+                lane.pending.clear()
+
+        running = 0
+        with ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="matrix") as executor:
+            while True:
+                running, skipped = self._dispatch(executor, running)
+                for lane, model, reason in skipped:
+                    yield lane, self._cell(lane, model, "skipped", f"⏭️ Skipped {model}: {reason}")
+                if not running and not any(lane.pending for lane in self.lanes):
+                    break
+                # Sleep until a probe finishes or the earliest backoff ends
+                waiting = [lane.ready_at for lane in self.lanes if lane.pending and lane.running < lane.limit]
+                timeout = None
+                if waiting and running < self.workers and not self._budget_wait:
+                    timeout = max(min(waiting) - time.monotonic(), 0.0)
+                try:
+                    lane, model, response, error, latency_ms = self._results.get(timeout=timeout)
+                except queue.Empty:
+                    continue
+                running -= 1
+                lane.running -= 1
+                self._release(model, response)
+                for cell in self._settle(lane, model, error, latency_ms):
+                    yield lane, cell
+        self.elapsed = time.perf_counter() - start
+
+    def _label_width(self) -> int:
+        return max((len(lane.masked) for lane in self.lanes), default=0)
+
+    def format_header(self) -> str:
+        return format_matrix_header(self.models, self._label_width())
+
+    def format_row(self, lane: KeyLane) -> str:
+        return format_matrix_row(lane.masked, lane.cells, self.models, self._label_width())
+
+    def summary(self) -> str:
+        """
+        Format per-model totals and scheduling counters into a readable summary.
+        """
+        lines = ["📊 Matrix summary:"]
+        for model in self.models:
+            accessible = sum(1 for lane in self.lanes if lane.cells.get(model, {}).get("status") == "ok")
+            lines.append(f"- {model}: {accessible}/{len(self.lanes)} keys")
+        cells = len(self.lanes) * len(self.models)
+        lines.append(f"- {cells} cells, {self.sent} probes sent in {self.elapsed:.1f} s")
+        rate_limited = sum(lane.rate_limited for lane in self.lanes)
+        if rate_limited:
+            lines.append(f"- {rate_limited} rate limit responses retried after backoff")
+        if self.duplicates:
+            lines.append(f"- {self.duplicates} duplicate keys dropped")
+        if self.http2:
+            lines.append(self.stats.summary())
+        return "\n".join(lines)
+
+
+def run_matrix(args) -> None:
+    """
+    Run the matrix subcommand.
+    """
+    # Imported here to avoid a circular import with api_key_tester
+    from .api_key_tester import OPENAI_MODELS
+    from .bulk import iter_key_lines
+    from .history import HistoryRecorder, history_available
+    from .streaming import iter_file_lines
+
+    models = list(dict.fromkeys(args.model or OPENAI_MODELS))
+    budget, ledger = budget_from_args(args)
+    scheduler = MatrixScheduler(
+        iter_key_lines(iter_file_lines(args.keyfile)), models,
+        workers=args.workers, per_key=args.per_key, max_attempts=args.max_attempts,
+        http2=args.http2, stream=args.stream_probes, budget=budget
+    )
+    recorder = None
+    if not args.no_history and history_available():
+        recorder = HistoryRecorder(args.history_dir)
+    output = open(args.jsonl, "a", encoding="utf-8") if args.jsonl else None
+
+    print(f"ℹ️ {len(scheduler.lanes)} keys × {len(models)} models, {args.workers} workers, {args.per_key} per key")
+    if budget is not None:
+        print(format_cost_estimate(models * len(scheduler.lanes), budget))
+    print()
+    print(scheduler.format_header())
+    try:
+        for lane, cell in scheduler.run():
+            if output is not None:
+                output.write(json.dumps(cell, ensure_ascii=False) + "\n")
+                output.flush()
+            if recorder is not None:
+                recorder.record(
+                    "openai", str(lane.client.base_url), cell["model"], cell["status"] == "ok", cell["status"],
+                    cell["message"], cell["latency_ms"], lane.fingerprint
+                )
+            if len(lane.cells) == len(models):
+                # Rows are printed as they complete, fastest keys first
+                print(scheduler.format_row(lane))
+    finally:
+        if output is not None:
+            output.close()
+
+    print("\n" + scheduler.summary())
+    if budget is not None:
+        print(budget.summary())
+    if ledger is not None:
+        try:
+            ledger.add(budget.spent)
+        except OSError as e:
+            print(f"\n⚠️ Could not record spend: {str(e)}")
+    if recorder is not None:
+        try:
+            path = recorder.flush()
+            if path:
+                print(f"\nℹ️ Results recorded in {path}")
+        except OSError as e:
+            print(f"\n⚠️ Could not record results: {str(e)}")
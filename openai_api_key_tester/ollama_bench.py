@@ -0,0 +1,523 @@
+"""
+Load and inference measurements for Ollama models.
+
+Ollama reports how a generation was spent in nanosecond timing fields
+(load_duration, prompt_eval_duration, eval_count, eval_duration) and lists
+the models currently held in memory under /api/ps. The load profile sends
+one request to each model as found, which is cold if the model was not
+resident, followed by a warm request, and reports both next to the
+resident memory of the loaded models.
+
+The speed benchmark runs a fixed prompt set with a fixed seed and token
+budget against each model after a warm-up request, so the load is left out,
+and ranks the models by generation tokens/sec with 95% confidence intervals.
+
+The saturation search ramps up the number of concurrent generations step by
+step and stops once more concurrency no longer buys throughput or p95
+latency has blown up; the last level before that is the knee.
+"""
+import math
+import os
+import statistics
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional, Sequence
+import requests
+
+DEFAULT_OLLAMA_URL = "http://localhost:11434"
+
+LOAD_PROMPT = "Hello"
+
+# Tokens generated per measurement; enough to time decoding, cheap to run
+LOAD_NUM_PREDICT = 16
+
+# Fixed prompt set of the speed benchmark, mixing short and long prompts
+BENCH_PROMPTS = [
+    "Explain in one paragraph what an API key is.",
+    "Write a Python function that checks whether a string is a palindrome.",
+    "Summarise the following text in two sentences: " + " ".join(
+        ["Large language models are trained on large amounts of text and predict the next token."] * 8
+    ),
+    "List five practical tips for keeping secrets out of source code repositories.",
+]
+
+DEFAULT_NUM_PREDICT = 128
+DEFAULT_SEED = 42
+
+# Concurrency levels tried by the saturation search
+DEFAULT_LEVELS = [1, 2, 4, 8, 16, 32]
+
+# A level is past the knee if it adds less throughput than this fraction...
+KNEE_MIN_GAIN = 0.10
+# ...or its p95 latency exceeds the single-request p95 by more than this factor
+KNEE_MAX_LATENCY_FACTOR = 3.0
+
+# Two-sided 95% critical values of Student's t by degrees of freedom
+_T_95 = {
+    1: 12.706, 2: 4.303, 3: 3.182, 4: 2.776, 5: 2.571, 6: 2.447, 7: 2.365, 8: 2.306, 9: 2.262,
+    10: 2.228, 12: 2.179, 15: 2.131, 20: 2.086, 25: 2.060, 30: 2.042
+}
+
+
+def _ms(nanoseconds: Optional[int]) -> Optional[float]:
+    return nanoseconds / 1e6 if nanoseconds is not None else None
+
+
+def list_installed_models(base_url: str) -> List[str]:
+    """
+    Return the names of the models installed on the server.
+    """
+    response = requests.get(f"{base_url}/api/tags", timeout=10)
+    response.raise_for_status()
+    return [model.get("name", "") for model in response.json().get("models", [])]
+
+
+def match_installed(models: List[str], installed: List[str], keep_missing: bool = False) -> List[str]:
+    """
+    Return the installed names of models, matching untagged names such as
+    'llama2' to an installed tag such as 'llama2:latest'.
+    Models that are not installed are dropped, or kept as given with keep_missing=True.
+    """
+    matched = []
+    for model in models:
+        if model in installed:
+            matched.append(model)
+            continue
+        tagged = [name for name in installed if name.partition(":")[0] == model]
+        if tagged:
+            # Prefer the default tag when several are installed
+            matched.append(f"{model}:latest" if f"{model}:latest" in tagged else tagged[0])
+        elif keep_missing:
+            matched.append(model)
+    return matched
+
+
+def get_resident_models(base_url: str) -> Dict[str, Dict]:
+    """
+    Return the models currently loaded in memory, by name, with their
+    total size and the part of it held in VRAM, in bytes.
+    """
+    response = requests.get(f"{base_url}/api/ps", timeout=10)
+    response.raise_for_status()
+    return {
+        model.get("name", ""): {
+            "size": model.get("size", 0),
+            "size_vram": model.get("size_vram", 0),
+            "expires_at": model.get("expires_at")
+        }
+        for model in response.json().get("models", [])
+    }
+
+
+def unload_model(base_url: str, model: str):
+    """
+    Ask the server to evict a model from memory, so the next request loads it cold.
+    """
+    response = requests.post(
+        f"{base_url}/api/generate",
+        json={"model": model, "keep_alive": 0},
+        timeout=60
+    )
+    response.raise_for_status()
+
+
+def timed_generate(base_url: str, model: str, prompt: str = LOAD_PROMPT, options: Optional[Dict] = None) -> Dict:
+    """
+    Run one non-streamed generation and return Ollama's timing fields in
+    milliseconds, plus the decoding rate in tokens per second.
+    """
+    response = requests.post(
+        f"{base_url}/api/generate",
+        json={
+            "model": model,
+            "prompt": prompt,
+            "stream": False,
+            "options": dict({"num_predict": LOAD_NUM_PREDICT}, **(options or {}))
+        },
+        timeout=600
+    )
+    response.raise_for_status()
+    data = response.json()
+    eval_count = data.get("eval_count")
+    eval_duration = data.get("eval_duration")
+    return {
+        "total_ms": _ms(data.get("total_duration")),
+        "load_ms": _ms(data.get("load_duration")),
+        "prompt_eval_count": data.get("prompt_eval_count"),
+        "prompt_eval_ms": _ms(data.get("prompt_eval_duration")),
+        "eval_count": eval_count,
+        "eval_ms": _ms(eval_duration),
+        "tokens_per_sec": eval_count / (eval_duration / 1e9) if eval_count and eval_duration else None
+    }
+
+
+def measure_load(base_url: str, model: str, force_cold: bool = False) -> Dict:
+    """
+    Measure a model's first and warm generation.
+    With force_cold=True the model is unloaded first, so the first request
+    always includes the load from disk.
+    Returns a dictionary with the status and the measurements.
+    """
+    try:
+        if force_cold:
+            unload_model(base_url, model)
+        was_resident = model in get_resident_models(base_url)
+        first = timed_generate(base_url, model)
+        warm = timed_generate(base_url, model)
+        return {
+            "status": "success",
+            "model": model,
+            "was_resident": was_resident,
+            "first": first,
+            "warm": warm
+        }
+    except requests.exceptions.RequestException as e:
+        return {"status": "error", "model": model, "error": f"Connection error: {str(e)}"}
+    except Exception as e:
+        return {"status": "error", "model": model, "error": f"Unexpected error: {str(e)}"}
+
+
+def _fmt(value: Optional[float], spec: str = ".0f") -> str:
+    return format(value, spec) if value is not None else "-"
+
+
+def _gib(size: int) -> str:
+    return f"{size / 1024 ** 3:.2f} GiB"
+
+
+def confidence_interval(samples: Sequence[float]) -> Dict:
+    """
+    Return the mean of the samples and the half-width of its 95% confidence interval.
+    """
+    mean = statistics.mean(samples)
+    if len(samples) < 2:
+        return {"mean": mean, "ci": None}
+    df = len(samples) - 1
+    t = _T_95[max(k for k in _T_95 if k <= df)] if df <= 30 else 1.96
+    return {"mean": mean, "ci": t * statistics.stdev(samples) / math.sqrt(len(samples))}
+
+
+def benchmark_model(
+    base_url: str,
+    model: str,
+    prompts: Sequence[str] = BENCH_PROMPTS,
+    num_predict: int = DEFAULT_NUM_PREDICT,
+    seed: int = DEFAULT_SEED,
+    repeats: int = 3
+) -> Dict:
+    """
+    Run the prompt set against a model and compute prompt and generation
+    tokens/sec from the durations reported by the server.
+    Returns a dictionary with the status and the statistics.
+    """
+    options = {"num_predict": num_predict, "seed": seed, "temperature": 0}
+    try:
+        # Warm-up so the load does not count against the first prompt
+        timed_generate(base_url, model, prompts[0], options)
+
+        prompt_rates, generation_rates = [], []
+        for _ in range(repeats):
+            for prompt in prompts:
+                timing = timed_generate(base_url, model, prompt, options)
+                if timing["prompt_eval_count"] and timing["prompt_eval_ms"]:
+                    prompt_rates.append(timing["prompt_eval_count"] / (timing["prompt_eval_ms"] / 1000))
+                if timing["tokens_per_sec"] is not None:
+                    generation_rates.append(timing["tokens_per_sec"])
+        if not generation_rates:
+            return {"status": "error", "model": model, "error": "Server reported no generation timings"}
+        return {
+            "status": "success",
+            "model": model,
+            "runs": len(generation_rates),
+            "generation": confidence_interval(generation_rates),
+            "prompt": confidence_interval(prompt_rates) if prompt_rates else None
+        }
+    except requests.exceptions.RequestException as e:
+        return {"status": "error", "model": model, "error": f"Connection error: {str(e)}"}
+    except Exception as e:
+        return {"status": "error", "model": model, "error": f"Unexpected error: {str(e)}"}
+
+
+def _rate(stats: Optional[Dict]) -> str:
+    if stats is None:
+        return "-"
+    if stats["ci"] is None:
+        return f"{stats['mean']:.1f}"
+    return f"{stats['mean']:.1f} ± {stats['ci']:.1f}"
+
+
+def format_speed_report(results: List[Dict]) -> str:
+    """
+    Format benchmark results into a table ranked by generation tokens/sec.
+    """
+    ranked = sorted(
+        (result for result in results if result["status"] == "success"),
+        key=lambda result: result["generation"]["mean"],
+        reverse=True
+    )
+    lines = [
+        f"{'Rank':>4} {'Model':<28} {'Runs':>5} {'Generation tok/s':>18} {'Prompt tok/s':>18}",
+        "-" * 77
+    ]
+    for rank, result in enumerate(ranked, 1):
+        lines.append(
+            f"{rank:>4} {result['model']:<28} {result['runs']:>5} "
+            f"{_rate(result['generation']):>18} {_rate(result['prompt']):>18}"
+        )
+    for result in results:
+        if result["status"] != "success":
+            lines.append(f"{'-':>4} {result['model']:<28} ❌ {result['error']}")
+    lines.append("\nℹ️ Rates are means with 95% confidence intervals over all prompts and repeats.")
+    return "\n".join(lines)
+
+
+def _percentile(values: Sequence[float], percent: float) -> float:
+    """
+    Nearest-rank percentile of a non-empty sequence.
+    """
+    ordered = sorted(values)
+    rank = max(math.ceil(percent / 100 * len(ordered)), 1)
+    return ordered[rank - 1]
+
+
+def measure_concurrency(base_url: str, model: str, concurrency: int, rounds: int, num_predict: int) -> Dict:
+    """
+    Keep concurrency generations in flight until concurrency * rounds have
+    completed, and return throughput and latency of the level.
+    """
+    options = {"num_predict": num_predict, "seed": DEFAULT_SEED, "temperature": 0}
+
+    def probe(index: int) -> Dict:
+        start = time.perf_counter()
+        try:
+            timing = timed_generate(base_url, model, BENCH_PROMPTS[index % len(BENCH_PROMPTS)], options)
+            return {"ok": True, "latency_ms": (time.perf_counter() - start) * 1000, "tokens": timing["eval_count"] or 0}
+        except (requests.exceptions.RequestException, ValueError) as e:
+            # A saturated server may answer with a truncated or non-JSON body
+            return {"ok": False, "error": str(e)}
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        outcomes = list(executor.map(probe, range(concurrency * rounds)))
+    wall = time.perf_counter() - start
+
+    latencies = [outcome["latency_ms"] for outcome in outcomes if outcome["ok"]]
+    errors = [outcome["error"] for outcome in outcomes if not outcome["ok"]]
+    return {
+        "concurrency": concurrency,
+        "requests": len(outcomes),
+        "errors": len(errors),
+        "last_error": errors[-1] if errors else None,
+        "tokens_per_sec": sum(outcome["tokens"] for outcome in outcomes if outcome["ok"]) / wall,
+        "requests_per_sec": len(latencies) / wall,
+        "latency_p50_ms": _percentile(latencies, 50) if latencies else None,
+        "latency_p95_ms": _percentile(latencies, 95) if latencies else None
+    }
+
+
+def find_saturation(
+    base_url: str,
+    model: str,
+    levels: Sequence[int] = DEFAULT_LEVELS,
+    rounds: int = 3,
+    num_predict: int = 64
+) -> Dict:
+    """
+    Ramp up concurrency until throughput stops growing or latency collapses.
+    Returns the measured levels, the knee point and the best concurrency:
+    the level with the highest throughput whose p95 is still acceptable.
+    """
+    try:
+        # Warm-up so the load does not count against the first level
+        timed_generate(base_url, model)
+    except requests.exceptions.RequestException as e:
+        return {"status": "error", "model": model, "error": f"Connection error: {str(e)}"}
+
+    steps: List[Dict] = []
+    knee = None
+    for concurrency in levels:
+        step = measure_concurrency(base_url, model, concurrency, rounds, num_predict)
+        steps.append(step)
+        if step["latency_p95_ms"] is None:
+            step["verdict"] = "failed"
+            break
+        if len(steps) == 1:
+            step["verdict"] = "baseline"
+            continue
+
+        previous = steps[-2]
+        gain = step["tokens_per_sec"] / previous["tokens_per_sec"] - 1 if previous["tokens_per_sec"] else 0.0
+        latency_factor = step["latency_p95_ms"] / steps[0]["latency_p95_ms"]
+        if step["errors"] or gain < KNEE_MIN_GAIN or latency_factor > KNEE_MAX_LATENCY_FACTOR:
+            step["verdict"] = "saturated"
+            knee = previous["concurrency"]
+            break
+        step["verdict"] = "scales"
+
+    acceptable = [
+        step for step in steps
+        if step["latency_p95_ms"] is not None and not step["errors"]
+        and step["latency_p95_ms"] <= steps[0]["latency_p95_ms"] * KNEE_MAX_LATENCY_FACTOR
+    ]
+    best = max(acceptable, key=lambda step: step["tokens_per_sec"])["concurrency"] if acceptable else None
+    return {"status": "success", "model": model, "steps": steps, "knee": knee, "best": best}
+
+
+def format_saturation_report(results: List[Dict]) -> str:
+    """
+    Format saturation searches into one table per model and a recommendation.
+    """
+    lines = []
+    for result in results:
+        lines.append(f"📊 {result['model']}")
+        if result["status"] != "success":
+            lines.append(f"❌ {result['error']}\n")
+            continue
+        lines.append(f"{'Parallel':>8} {'Requests':>9} {'Errors':>7} {'Tok/s':>9} {'Req/s':>7} {'p50 ms':>9} {'p95 ms':>9}  Verdict")
+        lines.append("-" * 78)
+        for step in result["steps"]:
+            lines.append(
+                f"{step['concurrency']:>8} {step['requests']:>9} {step['errors']:>7} {step['tokens_per_sec']:>9.1f} "
+                f"{step['requests_per_sec']:>7.2f} {_fmt(step['latency_p50_ms']):>9} {_fmt(step['latency_p95_ms']):>9}  {step['verdict']}"
+            )
+            if step["last_error"]:
+                lines.append(f"         ⚠️ {step['last_error']}")
+        if result["knee"] is not None:
+            lines.append(f"Knee point: {result['knee']} concurrent requests")
+        else:
+            lines.append("Knee point: not reached, try higher levels")
+        lines.append(f"Best concurrency: {result['best'] if result['best'] is not None else '-'}\n")
+
+    best = [result["best"] for result in results if result["status"] == "success" and result["best"]]
+    if best:
+        lines.append(
+            f"ℹ️ Suggested OLLAMA_NUM_PARALLEL / gateway limit: {min(best)} "
+            f"(lowest best concurrency of the measured models)"
+        )
+    return "\n".join(lines)
+
+
+def format_load_report(results: List[Dict], resident: Dict[str, Dict]) -> str:
+    """
+    Format load measurements and resident memory into a readable report.
+    """
+    lines = [
+        f"{'Model':<28} {'State':<9} {'Load ms':>9} {'Warm load':>10} {'Prompt ms':>10} {'Tok/s':>7} {'Warm tok/s':>11}",
+        "-" * 90
+    ]
+    for result in results:
+        if result["status"] != "success":
+            lines.append(f"{result['model']:<28} ❌ {result['error']}")
+            continue
+        first, warm = result["first"], result["warm"]
+        lines.append(
+            f"{result['model']:<28} {'warm' if result['was_resident'] else 'cold':<9} "
+            f"{_fmt(first['load_ms']):>9} {_fmt(warm['load_ms']):>10} {_fmt(warm['prompt_eval_ms']):>10} "
+            f"{_fmt(first['tokens_per_sec'], '.1f'):>7} {_fmt(warm['tokens_per_sec'], '.1f'):>11}"
+        )
+
+    lines.append("")
+    if resident:
+        lines.append("📊 Resident models:")
+        for name, info in sorted(resident.items()):
+            vram = f", {_gib(info['size_vram'])} in VRAM" if info["size_vram"] else ""
+            lines.append(f"- {name}: {_gib(info['size'])}{vram}")
+        total = sum(info["size"] for info in resident.values())
+        lines.append(f"- total: {_gib(total)}")
+    else:
+        lines.append("ℹ️ No models are resident")
+    return "\n".join(lines)
+
+
+def run_load_profile(args) -> None:
+    """
+    Run the ollama-load subcommand.
+    """
+    base_url = os.getenv("OLLAMA_API_URL", DEFAULT_OLLAMA_URL)
+    try:
+        installed = list_installed_models(base_url)
+    except requests.exceptions.RequestException as e:
+        print(f"❌ Ollama API Error: {str(e)}")
+        return
+    # /api/ps reports tagged names, so 'llama2' must be resolved to 'llama2:latest'
+    # for a resident model to be recognised as warm
+    models = match_installed(args.model, installed, keep_missing=True) if args.model else installed
+    if not models:
+        print("ℹ️ No models installed on the Ollama server")
+        return
+
+    mode = "unloading each model first" if args.cold else "as currently loaded"
+    print(f"📊 Measuring load and inference of {len(models)} models on {base_url}, {mode}...")
+    results = []
+    for model in models:
+        print(f"Measuring {model}...")
+        results.append(measure_load(base_url, model, args.cold))
+
+    try:
+        resident = get_resident_models(base_url)
+    except requests.exceptions.RequestException:
+        resident = {}
+    print("\n" + format_load_report(results, resident))
+
+
+def run_speed_benchmark(args) -> None:
+    """
+    Run the ollama-bench subcommand.
+    """
+    # Imported here to avoid a circular import with api_key_tester
+    from .api_key_tester import OLLAMA_MODELS
+
+    base_url = os.getenv("OLLAMA_API_URL", DEFAULT_OLLAMA_URL)
+    models = args.model
+    if not models:
+        try:
+            installed = list_installed_models(base_url)
+        except requests.exceptions.RequestException as e:
+            print(f"❌ Ollama API Error: {str(e)}")
+            return
+        models = match_installed(OLLAMA_MODELS, installed)
+        if not models:
+            print("ℹ️ None of the example Ollama models are installed; select models with --model")
+            return
+
+    print(
+        f"📊 Benchmarking {len(models)} models on {base_url}: {len(BENCH_PROMPTS)} prompts x {args.repeats} repeats, "
+        f"num_predict={args.num_predict}, seed={args.seed}..."
+    )
+    results = []
+    for model in models:
+        print(f"Benchmarking {model}...")
+        results.append(benchmark_model(base_url, model, BENCH_PROMPTS, args.num_predict, args.seed, args.repeats))
+    print("\n" + format_speed_report(results))
+
+
+def run_saturation_search(args) -> None:
+    """
+    Run the ollama-saturation subcommand.
+    """
+    # Imported here to avoid a circular import with api_key_tester
+    from .api_key_tester import OLLAMA_MODELS
+
+    base_url = os.getenv("OLLAMA_API_URL", DEFAULT_OLLAMA_URL)
+    models = args.model
+    if not models:
+        try:
+            installed = list_installed_models(base_url)
+        except requests.exceptions.RequestException as e:
+            print(f"❌ Ollama API Error: {str(e)}")
+            return
+        models = match_installed(OLLAMA_MODELS, installed)
+        if not models:
+            print("ℹ️ None of the example Ollama models are installed; select models with --model")
+            return
+
+    print(
+        f"📊 Searching the saturation point of {base_url} for {len(models)} models: "
+        f"levels {','.join(str(level) for level in args.levels)}, {args.rounds} rounds per level, "
+        f"num_predict={args.num_predict}..."
+    )
+    results = []
+    for model in models:
+        print(f"Ramping {model}...")
+        results.append(find_saturation(base_url, model, args.levels, args.rounds, args.num_predict))
+    print("\n" + format_saturation_report(results))
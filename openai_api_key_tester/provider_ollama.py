@@ -0,0 +1,66 @@
+"""
+Ollama provider: checks the models of an Ollama server.
+"""
+import time
+from typing import Tuple
+from .api_key_tester import (
+    validate_ollama_url, get_ollama_status, format_usage_stats, test_ollama_model
+)
+from .catalog import discover_ollama_models
+from .errors import FailFast
+from .providers import Provider
+
+
+def probe(ollama_url: str, model: str) -> Tuple[bool, str]:
+    """
+    Check that one model is installed and generates.
+    """
+    return test_ollama_model(ollama_url, model)
+
+
+def run(ollama_url: str, args, recorder=None):
+    """
+    Run the Ollama checks of the command line.
+    """
+    if not validate_ollama_url(ollama_url):
+        print("\nℹ️ Invalid or missing Ollama API URL, skipping Ollama tests.")
+        return
+    print("\nTesting Ollama API...")
+    try:
+        # Get and display Ollama status
+        start = time.perf_counter()
+        ollama_stats = get_ollama_status(ollama_url)
+        print("\n" + format_usage_stats(ollama_stats) + "\n")
+        if recorder is not None:
+            status_ok = ollama_stats["status"] == "success" and ollama_stats["data"]["api_status"].startswith("✅")
+            recorder.record(
+                "ollama", ollama_url, "status", status_ok, "ok" if status_ok else "failed",
+                ollama_stats["data"]["api_status"] if ollama_stats["status"] == "success" else ollama_stats["error"],
+                (time.perf_counter() - start) * 1000
+            )
+
+        if ollama_stats["status"] == "success":
+            # Test the installed models, by the tagged names the server lists
+            models = PROVIDER.catalog(ollama_url)
+            if not models:
+                print("\nℹ️ No models installed on the Ollama server")
+                return
+            print("\nTesting Ollama model access:")
+            fail_fast = FailFast()
+            for index, model in enumerate(models):
+                if fail_fast.cancelled:
+                    print(f"\n⏭️ Cancelled {len(models) - index} remaining probes: {fail_fast.describe()}")
+                    break
+                start = time.perf_counter()
+                success, message = test_ollama_model(ollama_url, model, fail_fast, args.stream_probes)
+                print(message)
+                if recorder is not None:
+                    recorder.record(
+                        "ollama", ollama_url, model, success, "ok" if success else "failed",
+                        message, (time.perf_counter() - start) * 1000
+                    )
+    except Exception as e:
+        print(f"\n❌ Ollama API Error: {str(e)}")
+
+
+PROVIDER = Provider("ollama", discover_ollama_models, probe, run)
@@ -0,0 +1,111 @@
+"""
+OpenAI provider: checks an API key against the OpenAI API.
+
+The command-line flow plans the run so the quota check and model probes
+share requests, samples one model per family, and honours the transport,
+budget and history options.
+"""
+from typing import List, Tuple
+from openai import OpenAI, APIError, APIConnectionError
+from .api_key_tester import (
+    OPENAI_MODELS, validate_key_format, get_usage_stats, format_usage_stats, test_model, record_openai_result
+)
+from .planner import ProbeCache, STATUS_PROBE_MODEL, probe_signature, plan_openai_probes, format_plan_summary
+from .keyindex import key_fingerprint
+from .catalog import discover_openai_models, group_families, format_catalog_summary, sample_families
+from .transport import TransportStats, make_http_client
+from .budget import budget_from_args, order_by_cost, format_cost_estimate
+from .providers import Provider
+
+
+def catalog(api_key: str) -> List[str]:
+    """
+    Return the models the key can see, from /v1/models.
+    """
+    return discover_openai_models(OpenAI(api_key=api_key), ProbeCache())
+
+
+def probe(api_key: str, model: str) -> Tuple[bool, str]:
+    """
+    Check the key's access to one model.
+    """
+    return test_model(OpenAI(api_key=api_key), model)
+
+
+def run(api_key: str, args, recorder=None):
+    """
+    Run the OpenAI checks of the command line.
+    """
+    print("Testing OpenAI API...")
+    if not validate_key_format(api_key):
+        print("❌ Error: Invalid API key format. OpenAI API keys should start with 'sk-'")
+    else:
+        budget, ledger = budget_from_args(args)
+        try:
+            transport = TransportStats()
+            client = OpenAI(api_key=api_key, http_client=make_http_client(args.http2, transport))
+            print("✅ OpenAI API client initialized successfully\n")
+
+            # Plan the run so the quota check and model probes share requests
+            cache = ProbeCache(stream=args.stream_probes, budget=budget)
+            models = discover_openai_models(client, cache) if args.discover else OPENAI_MODELS
+            families = group_families(models)
+            print(format_catalog_summary(families, args.exhaustive))
+            if budget is not None:
+                # Cheapest first, so a tight budget covers as many models as possible
+                families = order_by_cost(families)
+            planned = models if args.exhaustive else [members[0] for members in families.values()]
+            plan = plan_openai_probes(planned, stream=args.stream_probes)
+            print(format_plan_summary(plan))
+            if budget is not None:
+                print(format_cost_estimate([signature[1] for signature in plan], budget))
+            print()
+
+            # Get and display usage statistics
+            usage_stats = get_usage_stats(client, cache)
+            print("\n" + format_usage_stats(usage_stats) + "\n")
+            target = str(client.base_url)
+            fingerprint = key_fingerprint(api_key).hex()
+            if recorder is not None and usage_stats["status"] == "success":
+                status_ok = usage_stats["data"]["terminal"] is None
+                outcome = cache.outcome(probe_signature(STATUS_PROBE_MODEL, cache.stream))
+                recorder.record(
+                    "openai", target, "status", status_ok, "ok" if status_ok else "failed",
+                    usage_stats["data"]["quota_status"],
+                    outcome.elapsed * 1000 if outcome is not None else None, fingerprint
+                )
+
+            # If the key failed terminally, skip model testing
+            if cache.fail_fast.cancelled:
+                print(f"\n{cache.fail_fast.describe()}, skipping OpenAI model testing.")
+            else:
+                # Test models, stopping as soon as the key fails terminally
+                print("\nTesting OpenAI model access:")
+                checked = 0
+                for model, success, message in sample_families(client, families, cache, args.exhaustive):
+                    print(message)
+                    record_openai_result(recorder, cache, target, fingerprint, model, success, message)
+                    checked += 1
+                    if cache.fail_fast.cancelled:
+                        break
+                if checked < len(models):
+                    print(f"\n⏭️ Cancelled {len(models) - checked} remaining probes: {cache.fail_fast.describe()}")
+                print("\n" + cache.summary())
+            print(transport.summary())
+            if budget is not None:
+                print(budget.summary())
+
+        except APIError as e:
+            print(f"\n❌ OpenAI API Error: {str(e)}")
+        except APIConnectionError:
+            print("\n❌ Connection error. Please check your internet connection.")
+        except Exception as e:
+            print(f"\n❌ Unexpected error: {str(e)}")
+        if ledger is not None:
+            try:
+                ledger.add(budget.spent)
+            except OSError as e:
+                print(f"\n⚠️ Could not record spend: {str(e)}")
+
+
+PROVIDER = Provider("openai", catalog, probe, run)
@@ -0,0 +1,228 @@
+"""
+Secret scanning of files and directories for OpenAI API keys.
+
+Files are matched as raw bytes against one precompiled pattern that covers
+the current key formats (project, service-account, admin and user keys)
+and legacy keys. Plain files are memory-mapped and scanned in place; gzip
+archives and standard input are read in overlapping blocks so a key split
+across two blocks is still found. Files are spread over worker processes,
+and candidates are deduplicated by fingerprint so each key is reported and
+validated once, with the place it was first seen.
+"""
+import gzip
+import mmap
+import os
+import re
+import sys
+import time
+from typing import Dict, Iterable, Iterator, List, Optional
+from .bulk import BulkValidator
+from .keyindex import RevokedKeyIndex, key_fingerprint, mask_key
+from .sharding import sharded_map
+from .streaming import prefetch
+from .transport import _require_h2
+
+# Key kinds by the part after 'sk-'; keys without one are legacy keys
+KEY_KINDS = {b"proj": "project", b"svcacct": "service-account", b"admin": "admin", b"None": "user"}
+
+# Longest key the pattern accepts; blocks overlap by more than this
+MAX_KEY_LENGTH = 256
+BLOCK_SIZE = 8 * 1024 * 1024
+OVERLAP = 2 * MAX_KEY_LENGTH
+
+# Starts with a literal so the regex engine can skip ahead to 'sk-'
+KEY_PATTERN = re.compile(
+    rb"sk-(?:(proj|svcacct|admin|None)-[A-Za-z0-9_-]{40,%d}|[A-Za-z0-9]{48})(?![A-Za-z0-9_-])"
+    % (MAX_KEY_LENGTH - 16)
+)
+
+# Characters that may not precede a key; 'task-…' is not a key
+_KEY_CHARS = frozenset(b"ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz0123456789_-")
+
+# Directories of version control metadata, skipped when walking
+SKIP_DIRS = {".git", ".hg", ".svn"}
+
+
+def _matches(data, base_line: int = 1, limit: Optional[int] = None) -> Iterator[Dict]:
+    """
+    Yield the keys found in a bytes-like object with their kind and line.
+    Matches starting at or after limit are left for the next block.
+    """
+    line = base_line
+    position = 0
+    for match in KEY_PATTERN.finditer(data):
+        start = match.start()
+        if limit is not None and start >= limit:
+            break
+        if start > 0 and data[start - 1] in _KEY_CHARS:
+            continue
+        line += data[position:start].count(b"\n")
+        position = start
+        kind = match.group(1)
+        yield {
+            "key": match.group(0).decode("ascii"),
+            "kind": KEY_KINDS[kind] if kind else "legacy",
+            "line": line,
+        }
+
+
+def _scan_blocks(f, result: Dict) -> Iterator[Dict]:
+    """
+    Scan a binary stream in overlapping blocks, counting the bytes read into result.
+    """
+    tail = b""
+    line = 1
+    while True:
+        block = f.read(BLOCK_SIZE)
+        result["bytes"] += len(block)
+        data = tail + block
+        if not block:
+            yield from _matches(data, line)
+            return
+        cut = max(len(data) - OVERLAP, 0)
+        yield from _matches(data, line, cut)
+        line += data[:cut].count(b"\n")
+        tail = data[cut:]
+
+
+def scan_file(path: str) -> Dict:
+    """
+    Scan one file, or standard input for '-'.
+    Returns the path, bytes scanned, candidates found and any error.
+    """
+    result = {"path": path, "bytes": 0, "candidates": [], "error": None}
+    try:
+        if path == "-":
+            result["candidates"] = list(_scan_blocks(sys.stdin.buffer, result))
+        elif path.endswith(".gz"):
+            with gzip.open(path, "rb") as f:
+                result["candidates"] = list(_scan_blocks(f, result))
+        else:
+            size = os.path.getsize(path)
+            result["bytes"] = size
+            if size:
+                with open(path, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+                    result["candidates"] = list(_matches(mapped))
+    except (OSError, EOFError) as e:
+        result["error"] = str(e)
+    return result
+
+
+def _scan_chunk(paths: List[str]) -> List[Dict]:
+    """
+    Scan the files of a shard. Runs inside a worker process.
+    """
+    return [scan_file(path) for path in paths]
+
+
+def iter_paths(paths: Iterable[str]) -> Iterator[str]:
+    """
+    Yield the files to scan: files as given and every file under directories.
+    """
+    for path in paths:
+        if path != "-" and os.path.isdir(path):
+            for root, dirs, files in os.walk(path):
+                dirs[:] = sorted(d for d in dirs if d not in SKIP_DIRS)
+                for name in sorted(files):
+                    full = os.path.join(root, name)
+                    if not os.path.islink(full):
+                        yield full
+        else:
+            yield path
+
+
+class SecretScanner:
+    """
+    Scans paths for keys across worker processes and deduplicates them.
+    """
+
+    def __init__(self, workers: int = 1):
+        self.workers = workers
+        self.files = 0
+        self.bytes = 0
+        self.matches = 0
+        self.errors: List[str] = []
+        self.kinds: Dict[str, int] = {}
+        self.seen = set()
+        self.elapsed = 0.0
+
+    def scan(self, paths: Iterable[str]) -> Iterator[Dict]:
+        """
+        Yield each distinct key once, with the kind, file and line where it
+        was first seen. Files are reported in the order they were given.
+        Standard input ('-') is only readable here, so it is scanned without workers.
+        """
+        paths = list(paths)
+        workers = 1 if "-" in paths else self.workers
+        start = time.perf_counter()
+        try:
+            for result in sharded_map(_scan_chunk, iter_paths(paths), workers, chunk_size=1):
+                self.files += 1
+                self.bytes += result["bytes"]
+                if result["error"] is not None:
+                    self.errors.append(f"{result['path']}: {result['error']}")
+                for candidate in result["candidates"]:
+                    self.matches += 1
+                    fingerprint = key_fingerprint(candidate["key"])
+                    if fingerprint in self.seen:
+                        continue
+                    self.seen.add(fingerprint)
+                    self.kinds[candidate["kind"]] = self.kinds.get(candidate["kind"], 0) + 1
+                    yield dict(candidate, path=result["path"], fingerprint=fingerprint.hex())
+        finally:
+            self.elapsed = time.perf_counter() - start
+
+    def summary(self) -> str:
+        """
+        Format the scan counters and throughput into a readable summary.
+        """
+        megabytes = self.bytes / 1024 ** 2
+        rate = megabytes / self.elapsed if self.elapsed else 0.0
+        lines = [
+            "📊 Scan summary:",
+            f"- Scanned {self.files} files, {megabytes:.1f} MiB in {self.elapsed:.1f} s ({rate:.0f} MiB/s)",
+            f"- {self.matches} matches, {len(self.seen)} distinct keys",
+        ]
+        for kind, count in sorted(self.kinds.items()):
+            lines.append(f"- {kind}: {count}")
+        for error in self.errors:
+            lines.append(f"⚠️ Could not read {error}")
+        return "\n".join(lines)
+
+
+def run_scan(args) -> None:
+    """
+    Run the scan subcommand, validating the keys found if requested.
+    """
+    scanner = SecretScanner(args.workers)
+    print(f"ℹ️ Scanning {', '.join(args.paths)} with {args.workers} worker process(es)\n")
+    if not args.validate:
+        for candidate in scanner.scan(args.paths):
+            print(f"{mask_key(candidate['key'])}  {candidate['kind']}  {candidate['path']}:{candidate['line']}")
+        print("\n" + scanner.summary())
+        return
+
+    if args.http2:
+        try:
+            _require_h2()
+        except RuntimeError as e:
+            print(f"❌ Error: {str(e)}")
+            return
+    index = RevokedKeyIndex(args.index)
+    validator = BulkValidator(index, recheck=args.recheck, workers=args.workers, http2=args.http2)
+    locations: Dict[str, str] = {}
+
+    def keys():
+        for candidate in scanner.scan(args.paths):
+            locations[candidate["fingerprint"]] = f"{candidate['path']}:{candidate['line']}"
+            yield candidate["key"]
+
+    try:
+        # Scanning and validation run as stages, so probes start with the first key found
+        for result in prefetch(validator.run(prefetch(keys(), args.queue_size)), args.queue_size):
+            print(f"{result['key']}  {result['message']}  ({locations.pop(result['fingerprint'], '?')})")
+    finally:
+        index.save()
+        index.close()
+    print("\n" + scanner.summary())
+    print("\n" + validator.summary())
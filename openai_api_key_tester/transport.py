@@ -0,0 +1,86 @@
+"""
+HTTP transport for OpenAI clients.
+
+By default every in-flight request holds its own HTTP/1.1 connection, with
+its own TLS handshake. With HTTP/2 enabled, concurrent requests to one host
+are multiplexed as streams over a single connection. Transport statistics
+count the requests (streams) and distinct connections a client used, so
+the effect can be seen in a run's output.
+"""
+import threading
+from typing import Dict, Optional
+from openai import DefaultHttpxClient
+from .tracing import on_httpx_request, on_httpx_response
+
+
+def _require_h2():
+    """
+    Import the h2 package, which httpx needs for HTTP/2.
+    """
+    try:
+        import h2
+    except ImportError:
+        raise RuntimeError(
+            "HTTP/2 transport requires the h2 package. "
+            "Install it with: pip install 'openai-api-key-tester[http2]'"
+        )
+    return h2
+
+
+class TransportStats:
+    """
+    Counts the requests sent and the connections they travelled over.
+    Fed by an httpx response hook, so it is safe to share between threads.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        # Network streams are kept alive here so their identities stay unique
+        self._connections = set()
+        self.streams = 0
+        self.versions: Dict[str, int] = {}
+
+    def on_response(self, response):
+        """
+        httpx response hook: record the connection and protocol of a response.
+        """
+        version = response.extensions.get("http_version", b"HTTP/1.1")
+        if isinstance(version, bytes):
+            version = version.decode("ascii", errors="replace")
+        connection = response.extensions.get("network_stream")
+        with self._lock:
+            self.streams += 1
+            self.versions[version] = self.versions.get(version, 0) + 1
+            if connection is not None:
+                self._connections.add(connection)
+
+    @property
+    def connections(self) -> int:
+        return len(self._connections)
+
+    def summary(self) -> str:
+        """
+        Format the statistics into a readable one-line summary.
+        """
+        if not self.streams:
+            return "📊 Transport: no requests sent"
+        versions = ", ".join(f"{version}: {count}" for version, count in sorted(self.versions.items()))
+        plural = "" if self.connections == 1 else "s"
+        return (
+            f"📊 Transport: {self.streams} requests (streams) over {self.connections} "
+            f"connection{plural} ({versions})"
+        )
+
+
+def make_http_client(http2: bool = False, stats: Optional[TransportStats] = None) -> DefaultHttpxClient:
+    """
+    Create the httpx client for an OpenAI client, with HTTP/2 if requested.
+    Pass a TransportStats to count the streams and connections used.
+    Requests show up as HTTP spans when the run is traced.
+    """
+    if http2:
+        _require_h2()
+    hooks = {"request": [on_httpx_request], "response": [on_httpx_response]}
+    if stats is not None:
+        hooks["response"].append(stats.on_response)
+    return DefaultHttpxClient(http2=http2, event_hooks=hooks)
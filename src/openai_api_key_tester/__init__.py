@@ -1,12 +1,14 @@
-from .api_key_tester import main as cli_main
-from .gui import main as gui_main
+"""OpenAI API Key Tester package."""
 
 __version__ = "0.1.0"
 
 def main():
-    """Entry point for the application."""
-    try:
-        gui_main()
-    except Exception as e:
-        print(f"GUI failed to start: {str(e)}. Falling back to CLI mode.")
-        cli_main()
+    """Entry point for CLI interface."""
+    # Imported on use so the CLI does not pay for loading the GUI toolkit
+    from .api_key_tester import main as cli_main
+    cli_main()
+
+def gui():
+    """Entry point for GUI interface."""
+    from .gui import main as gui_main
+    gui_main()
@@ -1,11 +1,26 @@
 import sys
 import os
-from typing import Tuple, List, Dict
+import argparse
+import contextlib
+from typing import TYPE_CHECKING, Tuple, List, Dict, Optional
 from openai import OpenAI, APIError, APIConnectionError
 from datetime import datetime, timezone
 import base64
+import time
 import requests
 import json
+from .planner import ProbeCache, STATUS_PROBE_MODEL, STREAMABLE_KINDS, probe_kind, probe_signature
+from .errors import BudgetExceeded, FailFast, ProbeCancelled, REASON_MESSAGES, classify_error
+from .keyindex import DEFAULT_INDEX_PATH
+from .defaults import (
+    DEFAULT_BATCH_STATE_PATH, DEFAULT_DAEMON_HOST, DEFAULT_DAEMON_PORT, DEFAULT_DAEMON_TOKEN_PATH,
+    DEFAULT_DAEMON_URL, DEFAULT_HISTORY_DIR, DEFAULT_LEDGER_PATH, DEFAULT_PROFILE_DIR, PRIORITY_CLASSES
+)
+from .tracing import REQUESTS_HOOKS, traced_probe, traced_status
+from .providers import available_providers, configured_targets, format_provider_list, parse_target, run_provider
+
+if TYPE_CHECKING:
+    from .history import HistoryRecorder
 
 # Available models to test
 OPENAI_MODELS = [
@@ -49,15 +64,27 @@ def validate_ollama_url(url: str) -> bool:
         return False
     return True
 
-def test_ollama_model(base_url: str, model: str) -> Tuple[bool, str]:
+@traced_probe
+def test_ollama_model(
+    base_url: str,
+    model: str,
+    fail_fast: Optional[FailFast] = None,
+    stream: bool = False
+) -> Tuple[bool, str]:
     """
     Test a specific Ollama model.
     Returns a tuple of (success: bool, message: str)
+    Pass a FailFast shared by the endpoint's probes to stop after a terminal error.
+    With stream=True the generation is streamed and closed after the first chunk,
+    so the check takes the time to first byte instead of the full generation.
     """
+    if fail_fast is None:
+        fail_fast = FailFast()
     try:
+        fail_fast.check()
         print(f"Testing Ollama model: {model}...")
         # First check if model exists
-        response = requests.get(f"{base_url}/api/tags")
+        response = requests.get(f"{base_url}/api/tags", hooks=REQUESTS_HOOKS)
         if response.status_code != 200:
             return False, f"❌ Failed to get model list: HTTP {response.status_code}"
             
@@ -70,20 +97,34 @@ def test_ollama_model(base_url: str, model: str) -> Tuple[bool, str]:
         data = {
             'model': model,
             'prompt': 'Hello',
-            'stream': False
+            'stream': stream
         }
-        response = requests.post(f"{base_url}/api/generate", headers=headers, json=data)
+        if stream:
+            start = time.perf_counter()
+            with requests.post(f"{base_url}/api/generate", headers=headers, json=data, stream=True, hooks=REQUESTS_HOOKS) as response:
+                if response.status_code != 200:
+                    return False, f"❌ Error testing {model}: HTTP {response.status_code}"
+                # The first chunk proves the model loaded and started generating
+                next(response.iter_lines(), None)
+                ttfb = (time.perf_counter() - start) * 1000
+            return True, f"✅ Model {model} is accessible (first byte in {ttfb:.0f} ms)"
+
+        response = requests.post(f"{base_url}/api/generate", headers=headers, json=data, hooks=REQUESTS_HOOKS)
         
         if response.status_code == 200:
             return True, f"✅ Model {model} is accessible"
         else:
             return False, f"❌ Error testing {model}: HTTP {response.status_code}"
             
+    except ProbeCancelled as e:
+        return False, f"⏭️ Skipped {model}: {str(e)}"
     except requests.exceptions.RequestException as e:
+        fail_fast.record(e)
         return False, f"❌ Connection error with {model}: {str(e)}"
     except Exception as e:
         return False, f"❌ Unexpected error with {model}: {str(e)}"
 
+@traced_status
 def get_ollama_status(base_url: str) -> Dict:
     """
     Get Ollama API status.
@@ -96,7 +137,7 @@ def get_ollama_status(base_url: str) -> Dict:
         now = datetime.now(timezone.utc)
         
         # Test API connection
-        response = requests.get(f"{base_url}/api/tags")
+        response = requests.get(f"{base_url}/api/tags", hooks=REQUESTS_HOOKS)
         if response.status_code == 200:
             status = "✅ API is responsive"
             available_models = len(response.json().get("models", []))
@@ -123,11 +164,15 @@ def get_ollama_status(base_url: str) -> Dict:
             "error": f"Unexpected error: {str(e)}"
         }
 
-def get_usage_stats(client: OpenAI) -> Dict:
+@traced_status
+def get_usage_stats(client: OpenAI, cache: Optional[ProbeCache] = None) -> Dict:
     """
     Retrieve usage statistics for the API key.
     Returns a dictionary containing usage information.
+    Pass the run's ProbeCache to share the quota request with test_model.
     """
+    if cache is None:
+        cache = ProbeCache()
     try:
         print("📊 Retrieving usage statistics...")
         
@@ -137,16 +182,20 @@ def get_usage_stats(client: OpenAI) -> Dict:
         end_date = now
         
         # Test a simple API call to check quota
+        terminal = None
         try:
-            response = client.chat.completions.create(
-                model="gpt-3.5-turbo",
-                messages=[{"role": "user", "content": "test"}],
-                max_tokens=1
+            cache.run(
+                probe_signature(STATUS_PROBE_MODEL, cache.stream),
+                lambda: send_probe(client, STATUS_PROBE_MODEL, cache.stream),
+                STATUS_PROBE_MODEL
             )
             quota_status = "✅ API quota available"
-        except APIError as e:
-            if "exceeded your current quota" in str(e):
-                quota_status = "❌ API quota exceeded"
+        except BudgetExceeded as e:
+            quota_status = f"⏭️ Quota check skipped: {str(e)}"
+        except (APIError, ProbeCancelled) as e:
+            terminal = classify_error(e)
+            if terminal is not None:
+                quota_status = REASON_MESSAGES[terminal]
             else:
                 quota_status = f"⚠️ API status unknown: {str(e)}"
 
@@ -155,7 +204,8 @@ def get_usage_stats(client: OpenAI) -> Dict:
             "data": {
                 "checked_at": now.strftime("%Y-%m-%d %H:%M:%S UTC"),
                 "quota_status": quota_status,
-                "api_status": "✅ API is responsive" if quota_status != "❌ API quota exceeded" else "❌ API quota exceeded"
+                "api_status": "✅ API is responsive" if terminal is None else REASON_MESSAGES[terminal],
+                "terminal": terminal.value if terminal is not None else None
             }
         }
     except APIError as e:
@@ -169,60 +219,91 @@ def get_usage_stats(client: OpenAI) -> Dict:
             "error": f"Unexpected error while checking status: {str(e)}"
         }
 
-def test_model(client: OpenAI, model: str) -> Tuple[bool, str]:
+def _first_chunk(stream):
+    """
+    Read the first chunk of a streamed response and close the connection.
+    """
+    with stream:
+        return next(iter(stream), None)
+
+def probe_messages(kind: str) -> List[Dict]:
+    """
+    Return the chat messages of the probe for a 'vision' or 'chat' model.
+    """
+    if kind == "vision":
+        # Test vision model with a simple base64 image
+        # Create a 1x1 transparent pixel
+        base64_image = "iVBORw0KGgoAAAANSUhEUgAAAAEAAAABCAQAAAC1HAwCAAAAC0lEQVR42mNk+A8AAQUBAScY42YAAAAASUVORK5CYII="
+        return [
+            {
+                "role": "user",
+                "content": [
+                    {"type": "text", "text": "What's in this image?"},
+                    {"type": "image_url", "image_url": {"url": f"data:image/jpeg;base64,{base64_image}"}}
+                ]
+            }
+        ]
+    # Test chat completion models
+    return [{"role": "user", "content": "test"}]
+
+def send_probe(client: OpenAI, model: str, stream: bool = False):
+    """
+    Send the cheapest request that proves access to a model.
+    Returns the SDK response and raises the SDK error on failure.
+    With stream=True, chat probes return the first streamed chunk and close
+    the connection instead of waiting for the whole response body.
+    """
+    kind = probe_kind(model)
+    if kind == "image":
+        # Test DALL-E 3 model
+        return client.images.generate(
+            model=model,
+            prompt="A simple test image of a blue dot",
+            n=1,
+            size="1024x1024"
+        )
+
+    elif kind == "embedding":
+        # Test embedding model
+        return client.embeddings.create(
+            model=model,
+            input="test"
+        )
+
+    messages = probe_messages(kind)
+    if stream:
+        return _first_chunk(client.chat.completions.create(
+            model=model,
+            messages=messages,
+            max_tokens=1,
+            stream=True
+        ))
+    return client.chat.completions.create(
+        model=model,
+        messages=messages,
+        max_tokens=1
+    )
+
+@traced_probe
+def test_model(client: OpenAI, model: str, cache: Optional[ProbeCache] = None) -> Tuple[bool, str]:
     """
     Test a specific OpenAI model with the API key.
     Returns a tuple of (success: bool, message: str)
+    Pass the run's ProbeCache to reuse requests already sent in this run.
     """
+    if cache is None:
+        cache = ProbeCache()
     try:
         print(f"Testing model: {model}...")
-        
-        if model == "dall-e-3":
-            # Test DALL-E 3 model
-            response = client.images.generate(
-                model=model,
-                prompt="A simple test image of a blue dot",
-                n=1,
-                size="1024x1024"
-            )
-            return True, f"✅ Model {model} is accessible"
-            
-        elif model == "text-embedding-ada-002":
-            # Test embedding model
-            response = client.embeddings.create(
-                model=model,
-                input="test"
-            )
-            return True, f"✅ Model {model} is accessible"
-            
-        elif model == "gpt-4-vision-preview":
-            # Test vision model with a simple base64 image
-            # Create a 1x1 transparent pixel
-            base64_image = "iVBORw0KGgoAAAANSUhEUgAAAAEAAAABCAQAAAC1HAwCAAAAC0lEQVR42mNk+A8AAQUBAScY42YAAAAASUVORK5CYII="
-            response = client.chat.completions.create(
-                model=model,
-                messages=[
-                    {
-                        "role": "user",
-                        "content": [
-                            {"type": "text", "text": "What's in this image?"},
-                            {"type": "image_url", "image_url": {"url": f"data:image/jpeg;base64,{base64_image}"}}
-                        ]
-                    }
-                ],
-                max_tokens=1
-            )
-            return True, f"✅ Model {model} is accessible"
-            
-        else:
-            # Test chat completion models
-            response = client.chat.completions.create(
-                model=model,
-                messages=[{"role": "user", "content": "test"}],
-                max_tokens=1
-            )
-            return True, f"✅ Model {model} is accessible"
-            
+        signature = probe_signature(model, cache.stream)
+        cache.run(signature, lambda: send_probe(client, model, cache.stream), model)
+        if cache.stream and probe_kind(model) in STREAMABLE_KINDS:
+            ttfb = cache.outcome(signature).elapsed * 1000
+            return True, f"✅ Model {model} is accessible (first byte in {ttfb:.0f} ms)"
+        return True, f"✅ Model {model} is accessible"
+
+    except (ProbeCancelled, BudgetExceeded) as e:
+        return False, f"⏭️ Skipped {model}: {str(e)}"
     except APIError as e:
         if "model not found" in str(e).lower():
             return False, f"❌ Model {model} is not available with this API key"
@@ -246,65 +327,505 @@ def format_usage_stats(stats: Dict) -> str:
     else:
         return f"❌ Failed to retrieve API status:\n{stats['error']}"
 
-def main():
+def record_openai_result(
+    recorder: Optional["HistoryRecorder"],
+    cache: ProbeCache,
+    target: str,
+    fingerprint: str,
+    model: str,
+    success: bool,
+    message: str
+):
+    """
+    Add an OpenAI probe result to the run history, with the latency of its request.
+    Results without a request of their own were inferred or skipped.
+    """
+    if recorder is None:
+        return
+    outcome = cache.outcome(probe_signature(model, cache.stream))
+    if outcome is None:
+        status = "inferred" if success else "skipped"
+        latency_ms = None
+    else:
+        status = "ok" if success else "failed"
+        latency_ms = outcome.elapsed * 1000
+    recorder.record("openai", target, model, success, status, message, latency_ms, fingerprint)
+
+def _int_list(value: str) -> List[int]:
+    """
+    Parse a comma-separated list of positive integers.
+    """
+    try:
+        numbers = [int(part) for part in value.split(",") if part.strip()]
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"expected comma-separated integers, got '{value}'")
+    if not numbers or any(number <= 0 for number in numbers):
+        raise argparse.ArgumentTypeError(f"expected positive integers, got '{value}'")
+    return numbers
+
+def _positive_int(value: str) -> int:
+    """
+    Parse a positive integer for argparse.
+    """
+    try:
+        number = int(value)
+    except ValueError:
+        number = 0
+    if number <= 0:
+        raise argparse.ArgumentTypeError(f"expected a positive integer, got '{value}'")
+    return number
+
+def _budget(value: str) -> Tuple[float, str]:
+    """
+    Parse --budget; the budget module is only imported when the option is given.
+    """
+    from .budget import parse_budget
+    return parse_budget(value)
+
+def _reservations(value: str) -> Dict[str, int]:
+    """
+    Parse --reserve; the scheduler is only imported when the option is given.
+    """
+    from .scheduler import parse_reservations
+    return parse_reservations(value)
+
+def _ratio(value: str) -> float:
+    """
+    Parse a fraction between 0 and 1 for argparse.
+    """
+    try:
+        ratio = float(value)
+    except ValueError:
+        ratio = -1.0
+    if not 0.0 <= ratio <= 1.0:
+        raise argparse.ArgumentTypeError(f"expected a number between 0 and 1, got '{value}'")
+    return ratio
+
+# Subcommands that send billable requests without checking them against --budget
+UNBUDGETED_COMMANDS = {"embed-bench", "batch-audit", "daemon"}
+
+def build_parser() -> argparse.ArgumentParser:
+    """
+    Build the command-line argument parser.
+    """
+    parser = argparse.ArgumentParser(
+        prog="openai-key-tester",
+        description="Test OpenAI API keys and Ollama endpoints. "
+                    "The key is read from OPENAI_API_KEY and the Ollama URL from OLLAMA_API_URL."
+    )
+    parser.add_argument(
+        "--discover", action="store_true",
+        help="probe the models listed by /v1/models instead of the built-in list"
+    )
+    parser.add_argument(
+        "--exhaustive", action="store_true",
+        help="probe every model instead of one representative per model family"
+    )
+    parser.add_argument(
+        "--stream-probes", action="store_true",
+        help="check access with streamed requests closed after the first chunk"
+    )
+    parser.add_argument(
+        "--http2", action="store_true",
+        help="multiplex concurrent OpenAI requests over one HTTP/2 connection per host"
+    )
+    parser.add_argument(
+        "--budget", type=_budget,
+        help="spending limit for model probes, in tokens (5000, 5000tokens) or US dollars ($0.50, 0.50usd)"
+    )
+    parser.add_argument(
+        "--budget-period", choices=["run", "month"], default="run",
+        help="apply the budget to this run or to the calendar month, "
+             f"with earlier runs' spend kept in {DEFAULT_LEDGER_PATH} (default: run)"
+    )
+    parser.add_argument(
+        "--target", type=parse_target, action="append", metavar="NAME=TARGET",
+        help="check a provider's target, may be repeated; replaces the provider's environment variable "
+             "(see the providers command)"
+    )
+    parser.add_argument(
+        "--daemon", nargs="?", const=DEFAULT_DAEMON_URL, metavar="URL",
+        help=f"send the checks to a running probe daemon (default URL: {DEFAULT_DAEMON_URL})"
+    )
+    parser.add_argument(
+        "--daemon-token-file", default=DEFAULT_DAEMON_TOKEN_PATH, metavar="PATH",
+        help=f"token file written by the daemon (default: {DEFAULT_DAEMON_TOKEN_PATH})"
+    )
+    parser.add_argument(
+        "--priority", choices=PRIORITY_CLASSES, default="interactive",
+        help="priority class of checks sent to the daemon (default: interactive)"
+    )
+    parser.add_argument(
+        "--profile", nargs="?", const=DEFAULT_PROFILE_DIR, metavar="DIR",
+        help=f"profile the run and write a CPU and allocation report (default DIR: {DEFAULT_PROFILE_DIR})"
+    )
+    parser.add_argument(
+        "--trace", metavar="DEST",
+        help="record the run as OTLP/JSON trace spans, appended to a file or posted to a collector URL"
+    )
+    parser.add_argument(
+        "--trace-sample", type=_ratio, default=1.0, metavar="RATIO",
+        help="fraction of runs to trace (default: 1.0); runs with errors are always kept"
+    )
+    parser.add_argument(
+        "--history-dir", default=DEFAULT_HISTORY_DIR,
+        help=f"directory of the result history (default: {DEFAULT_HISTORY_DIR})"
+    )
+    parser.add_argument(
+        "--no-history", action="store_true",
+        help="do not record this run in the result history"
+    )
+
+    subparsers = parser.add_subparsers(dest="command", metavar="command")
+    embed_bench = subparsers.add_parser(
+        "embed-bench",
+        help="benchmark embedding throughput by batch size"
+    )
+    embed_bench.add_argument(
+        "--provider", choices=["openai", "ollama"], default="openai",
+        help="embedding provider to benchmark (default: openai)"
+    )
+    embed_bench.add_argument("--model", help="embedding model (default depends on provider)")
+    embed_bench.add_argument(
+        "--batch-sizes", type=_int_list, default=[1, 8, 32, 128],
+        help="comma-separated batch sizes (default: 1,8,32,128)"
+    )
+    embed_bench.add_argument(
+        "--batches", type=_positive_int, default=5,
+        help="number of batches sent per batch size (default: 5)"
+    )
+
+    bulk = subparsers.add_parser(
+        "bulk",
+        help="validate many keys from a file, one key per line"
+    )
+    bulk.add_argument("keyfile", help="file with one key per line, or - for standard input")
+    bulk.add_argument(
+        "--recheck", action="store_true",
+        help="probe keys even if they are already known to be revoked"
+    )
+    bulk.add_argument(
+        "--index", default=DEFAULT_INDEX_PATH,
+        help=f"revoked-key index file (default: {DEFAULT_INDEX_PATH})"
+    )
+    bulk.add_argument(
+        "--workers", type=int, default=1,
+        help="shard probes across N worker processes (default: 1)"
+    )
+    bulk.add_argument(
+        "--resume", metavar="JOURNAL",
+        help="journal completed keys to this file and skip keys it already records"
+    )
+    bulk.add_argument(
+        "--queue-size", type=int, default=1024,
+        help="items buffered between the read, probe and output stages (default: 1024)"
+    )
+
+    matrix = subparsers.add_parser(
+        "matrix",
+        help="check which of many keys can use which models"
+    )
+    matrix.add_argument("keyfile", help="file with one key per line, or - for standard input")
+    matrix.add_argument(
+        "--model", action="append",
+        help="model to check; repeat for several (default: the built-in model list)"
+    )
+    matrix.add_argument(
+        "--workers", type=int, default=16,
+        help="probes in flight across all keys (default: 16)"
+    )
+    matrix.add_argument(
+        "--per-key", type=int, default=2,
+        help="probes in flight per key; halved while a key is rate limited (default: 2)"
+    )
+    matrix.add_argument(
+        "--max-attempts", type=int, default=4,
+        help="attempts per cell when rate limited (default: 4)"
+    )
+    matrix.add_argument(
+        "--jsonl", metavar="FILE",
+        help="append each cell to FILE as a JSON line as soon as it is known"
+    )
+
+    batch_audit = subparsers.add_parser(
+        "batch-audit",
+        help="check which keys can use which models through the Batch API, at batch prices"
+    )
+    batch_audit.add_argument("keyfile", help="file with one key per line, or - for standard input")
+    batch_audit.add_argument(
+        "--model", action="append",
+        help="model to check; repeat for several (default: the built-in model list)"
+    )
+    batch_audit.add_argument(
+        "--base-url",
+        help="API base URL, e.g. of a local stand-in server (default: OPENAI_BASE_URL or the OpenAI API)"
+    )
+    batch_audit.add_argument(
+        "--state", default=DEFAULT_BATCH_STATE_PATH,
+        help=f"file remembering submitted batches by key fingerprint (default: {DEFAULT_BATCH_STATE_PATH})"
+    )
+    batch_audit.add_argument(
+        "--no-wait", action="store_true",
+        help="submit the batches and exit; run again later to collect the results"
+    )
+    batch_audit.add_argument(
+        "--poll-interval", type=float, default=10.0,
+        help="seconds before the first status check; later checks back off up to 5 minutes (default: 10)"
+    )
+    batch_audit.add_argument(
+        "--timeout", type=float, default=0,
+        help="stop waiting after this many seconds, leaving the rest for a later run (default: wait up to the 24 h window)"
+    )
+    batch_audit.add_argument(
+        "--workers", type=int, default=8,
+        help="batches checked concurrently per polling round (default: 8)"
+    )
+    batch_audit.add_argument(
+        "--jsonl", metavar="FILE",
+        help="append each cell to FILE as a JSON line when its key's batches finish"
+    )
+
+    scan = subparsers.add_parser(
+        "scan",
+        help="scan files and directories for leaked keys, optionally validating them"
+    )
+    scan.add_argument("paths", nargs="+", metavar="PATH", help="files, directories or gzip archives; - for standard input")
+    scan.add_argument(
+        "--workers", type=int, default=os.cpu_count() or 1,
+        help="scan files (and validate keys) across N worker processes (default: CPU count)"
+    )
+    scan.add_argument(
+        "--validate", action="store_true",
+        help="validate each distinct key found, as the bulk command does"
+    )
+    scan.add_argument(
+        "--recheck", action="store_true",
+        help="with --validate, probe keys even if they are already known to be revoked"
+    )
+    scan.add_argument(
+        "--index", default=DEFAULT_INDEX_PATH,
+        help=f"revoked-key index file (default: {DEFAULT_INDEX_PATH})"
+    )
+    scan.add_argument(
+        "--queue-size", type=int, default=1024,
+        help="keys buffered between the scan, probe and output stages (default: 1024)"
+    )
+
+    ollama_load = subparsers.add_parser(
+        "ollama-load",
+        help="measure cold and warm load of Ollama models and their resident memory"
+    )
+    ollama_load.add_argument(
+        "--model", action="append",
+        help="model to measure, may be repeated (default: all installed models)"
+    )
+    ollama_load.add_argument(
+        "--cold", action="store_true",
+        help="unload each model first so the first request always loads it from disk"
+    )
+
+    ollama_bench = subparsers.add_parser(
+        "ollama-bench",
+        help="compare generation speed of Ollama models"
+    )
+    ollama_bench.add_argument(
+        "--model", action="append",
+        help="model to benchmark, may be repeated (default: installed models of the built-in list)"
+    )
+    ollama_bench.add_argument(
+        "--num-predict", type=_positive_int, default=128,
+        help="tokens generated per prompt (default: 128)"
+    )
+    ollama_bench.add_argument("--seed", type=int, default=42, help="sampling seed (default: 42)")
+    ollama_bench.add_argument(
+        "--repeats", type=_positive_int, default=3,
+        help="times the prompt set is run per model (default: 3)"
+    )
+
+    ollama_saturation = subparsers.add_parser(
+        "ollama-saturation",
+        help="find how many concurrent generations an Ollama server can take"
+    )
+    ollama_saturation.add_argument(
+        "--model", action="append",
+        help="model to ramp, may be repeated (default: installed models of the built-in list)"
+    )
+    ollama_saturation.add_argument(
+        "--levels", type=_int_list, default=[1, 2, 4, 8, 16, 32],
+        help="comma-separated concurrency levels to try in order (default: 1,2,4,8,16,32)"
+    )
+    ollama_saturation.add_argument(
+        "--rounds", type=_positive_int, default=3,
+        help="requests per slot at each level (default: 3)"
+    )
+    ollama_saturation.add_argument(
+        "--num-predict", type=_positive_int, default=64,
+        help="tokens generated per request (default: 64)"
+    )
+
+    subparsers.add_parser(
+        "providers",
+        help="list the available providers and how their targets are configured"
+    )
+
+    daemon = subparsers.add_parser(
+        "daemon",
+        help="serve checks over JSON-RPC with warm clients and request coalescing"
+    )
+    daemon.add_argument(
+        "--host", default=DEFAULT_DAEMON_HOST,
+        help=f"address to listen on (default: {DEFAULT_DAEMON_HOST})"
+    )
+    daemon.add_argument(
+        "--port", type=int, default=DEFAULT_DAEMON_PORT,
+        help=f"port to listen on (default: {DEFAULT_DAEMON_PORT})"
+    )
+    daemon.add_argument(
+        "--token-file", default=DEFAULT_DAEMON_TOKEN_PATH,
+        help=f"file the daemon writes its client token to, readable only by you (default: {DEFAULT_DAEMON_TOKEN_PATH})"
+    )
+    daemon.add_argument(
+        "--slots", type=int, default=16,
+        help="probes run at the same time across all priority classes (default: 16)"
+    )
+    daemon.add_argument(
+        "--reserve", type=_reservations, default={},
+        help="slots reserved per priority class (default: interactive=2,scheduled=1)"
+    )
+    daemon.add_argument(
+        "--result-ttl", type=float, default=15.0,
+        help="seconds a check result is reused for identical requests (default: 15)"
+    )
+    daemon.add_argument(
+        "--catalog-ttl", type=float, default=300.0,
+        help="seconds a model catalog is cached (default: 300)"
+    )
+
+    history = subparsers.add_parser(
+        "history",
+        help="query the recorded result history"
+    )
+    history_queries = history.add_subparsers(dest="query", metavar="query")
+    history_queries.required = True
+    latency = history_queries.add_parser("latency", help="latency percentile of a model per day")
+    latency.add_argument("--model", required=True, help="model to report")
+    latency.add_argument("--days", type=int, default=90, help="number of days to cover (default: 90)")
+    latency.add_argument("--percentile", type=float, default=95, help="latency percentile (default: 95)")
+    changes = history_queries.add_parser("changes", help="when a key gained or lost access to a model")
+    changes.add_argument("--key", required=True, help="API key to look up (only its fingerprint is used)")
+    changes.add_argument("--model", required=True, help="model to report")
+    return parser
+
+def main(argv: Optional[List[str]] = None):
     """
     Main function to handle the API key testing process.
     """
+    parser = build_parser()
+    args = parser.parse_args(argv)
+    if args.budget is not None and args.command in UNBUDGETED_COMMANDS:
+        parser.error(f"--budget is not supported by {args.command}, whose requests are not metered against a budget")
+    profiler = tracer = None
+    try:
+        with contextlib.ExitStack() as stack:
+            if args.profile:
+                from .profiling import RunProfiler
+                profiler = stack.enter_context(RunProfiler(args.profile))
+            if args.trace:
+                from .tracing import Tracer, make_exporter
+                tracer = stack.enter_context(Tracer(make_exporter(args.trace), args.trace_sample))
+                stack.enter_context(tracer.span("run", command=args.command or "check"))
+            run_command(args)
+    finally:
+        # Also reported when the run ends with sys.exit or Ctrl+C
+        if tracer is not None:
+            print("\n" + tracer.summary())
+        if profiler is not None:
+            print("\n" + profiler.summary())
+
+def run_command(args):
+    """
+    Run the subcommand, or the default checks, selected by parsed arguments.
+    """
+    if args.command == "embed-bench":
+        from .embedding_bench import run_embedding_benchmark
+        run_embedding_benchmark(args)
+        return
+    if args.command == "bulk":
+        from .bulk import run_bulk
+        run_bulk(args)
+        return
+    if args.command == "matrix":
+        from .matrix import run_matrix
+        run_matrix(args)
+        return
+    if args.command == "batch-audit":
+        from .batch_audit import run_batch_audit
+        run_batch_audit(args)
+        return
+    if args.command == "scan":
+        from .scanner import run_scan
+        run_scan(args)
+        return
+    if args.command == "ollama-load":
+        from .ollama_bench import run_load_profile
+        run_load_profile(args)
+        return
+    if args.command == "ollama-bench":
+        from .ollama_bench import run_speed_benchmark
+        run_speed_benchmark(args)
+        return
+    if args.command == "ollama-saturation":
+        from .ollama_bench import run_saturation_search
+        run_saturation_search(args)
+        return
+    if args.command == "daemon":
+        from .daemon import run_daemon
+        run_daemon(args)
+        return
+    if args.command == "history":
+        from .history import run_history
+        run_history(args)
+        return
+
+    providers = available_providers()
+    if args.command == "providers":
+        print(format_provider_list(providers))
+        return
+    try:
+        targets = list(configured_targets(providers, args.target))
+    except ValueError as e:
+        print(f"❌ Error: {str(e)}")
+        return
+
     print("\n=== API Key Tester ===\n")
+    if args.daemon:
+        # Thin client: the daemon holds the clients, caches and connections
+        from .daemon import DaemonClient, run_remote_checks
+        try:
+            client = DaemonClient(args.daemon, token_path=args.daemon_token_file)
+            run_remote_checks(client, targets, print, priority=args.priority)
+        except requests.exceptions.RequestException as e:
+            print(f"❌ Could not reach the daemon at {args.daemon}: {str(e)}")
+        print("\n✅ Test completed.")
+        return
+
+    from .history import HistoryRecorder, history_available
+    recorder = None
+    if not args.no_history and history_available():
+        recorder = HistoryRecorder(args.history_dir)
     
-    # Test OpenAI API
-    api_key = os.getenv("OPENAI_API_KEY")
-    if api_key:
-        print("Testing OpenAI API...")
-        if not validate_key_format(api_key):
-            print("❌ Error: Invalid API key format. OpenAI API keys should start with 'sk-'")
-        else:
-            try:
-                client = OpenAI(api_key=api_key)
-                print("✅ OpenAI API client initialized successfully\n")
-                
-                # Get and display usage statistics
-                usage_stats = get_usage_stats(client)
-                print("\n" + format_usage_stats(usage_stats) + "\n")
-                
-                # If quota is exceeded, skip model testing
-                if usage_stats["status"] == "success" and "❌ API quota exceeded" in usage_stats["data"]["quota_status"]:
-                    print("\n❌ Skipping OpenAI model testing due to exceeded quota.")
-                else:
-                    # Test models
-                    print("\nTesting OpenAI model access:")
-                    for model in OPENAI_MODELS:
-                        success, message = test_model(client, model)
-                        print(message)
-                    
-            except APIError as e:
-                print(f"\n❌ OpenAI API Error: {str(e)}")
-            except APIConnectionError:
-                print("\n❌ Connection error. Please check your internet connection.")
-            except Exception as e:
-                print(f"\n❌ Unexpected error: {str(e)}")
-    else:
-        print("ℹ️ OpenAI API key not provided, skipping OpenAI tests.")
+    # Check every provider with a configured target; a provider's module
+    # is only imported when it has one
+    for spec, target in targets:
+        run_provider(spec, target, args, recorder)
 
-    # Test Ollama API
-    ollama_url = os.getenv("OLLAMA_API_URL", "http://localhost:11434")
-    if validate_ollama_url(ollama_url):
-        print("\nTesting Ollama API...")
+    if recorder is not None:
         try:
-            # Get and display Ollama status
-            ollama_stats = get_ollama_status(ollama_url)
-            print("\n" + format_usage_stats(ollama_stats) + "\n")
-            
-            if ollama_stats["status"] == "success":
-                # Test models
-                print("\nTesting Ollama model access:")
-                for model in OLLAMA_MODELS:
-                    success, message = test_ollama_model(ollama_url, model)
-                    print(message)
-        except Exception as e:
-            print(f"\n❌ Ollama API Error: {str(e)}")
-    else:
-        print("\nℹ️ Invalid or missing Ollama API URL, skipping Ollama tests.")
+            path = recorder.flush()
+            if path:
+                print(f"\nℹ️ Results recorded in {path}")
+        except OSError as e:
+            print(f"\n⚠️ Could not record results: {str(e)}")
 
     print("\n✅ Test completed.")
 
@@ -0,0 +1,382 @@
+"""
+Model-access audits through the Batch API.
+
+For audits that do not need answers right away, the chat and embedding
+probes of each key are packed into JSONL files, uploaded through
+/v1/files and submitted as batches through /v1/batches, one per key and
+endpoint. Batch requests are billed at a discount and draw on a separate
+rate limit, so audits leave the real-time headroom alone. Outstanding
+batches are polled with a growing interval, and results are mapped back to
+(key, model) cells by custom_id. Submitted batches are remembered by key
+fingerprint in a state file, so an audit can be submitted by one run and
+collected by a later one with the same key file. Keys themselves are never
+written to disk.
+"""
+import json
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+from typing import Callable, Dict, Iterable, List, Optional, Set, Tuple
+from openai import OpenAI, APIError
+from .defaults import DEFAULT_BATCH_STATE_PATH
+from .errors import REASON_MESSAGES, classify_error
+from .keyindex import key_fingerprint, mask_key
+from .matrix import format_matrix_header, format_matrix_row
+from .planner import probe_kind
+from .transport import make_http_client
+
+COMPLETION_WINDOW = "24h"
+
+# Batch statuses after which a batch will not change again
+FINISHED_STATUSES = {"completed", "failed", "expired", "cancelled"}
+
+# Polling starts at the requested interval and grows by this factor up to the cap
+POLL_GROWTH = 1.5
+MAX_POLL_INTERVAL = 300.0
+
+# Error codes in a result body that mean the key cannot use the model
+UNAVAILABLE_CODES = {"model_not_found"}
+
+
+def batch_request(model: str) -> Optional[Tuple[str, Dict]]:
+    """
+    Return the endpoint and body of the batch probe for a model,
+    or None for models the Batch API cannot check (image generation).
+    """
+    # Imported here to avoid a circular import with api_key_tester
+    from .api_key_tester import probe_messages
+    kind = probe_kind(model)
+    if kind == "image":
+        return None
+    if kind == "embedding":
+        return "/v1/embeddings", {"model": model, "input": "test"}
+    return "/v1/chat/completions", {"model": model, "messages": probe_messages(kind), "max_tokens": 1}
+
+
+def build_batch_files(models: List[str]) -> Dict[str, Tuple[bytes, List[str]]]:
+    """
+    Pack the probes for models into one JSONL file per endpoint.
+    Each line's custom_id is the model it checks.
+    Returns the file contents and the models they check, by endpoint.
+    """
+    lines: Dict[str, List[str]] = {}
+    packed: Dict[str, List[str]] = {}
+    for model in models:
+        request = batch_request(model)
+        if request is None:
+            continue
+        endpoint, body = request
+        lines.setdefault(endpoint, []).append(json.dumps(
+            {"custom_id": model, "method": "POST", "url": endpoint, "body": body}
+        ))
+        packed.setdefault(endpoint, []).append(model)
+    return {
+        endpoint: (("\n".join(entries) + "\n").encode("utf-8"), packed[endpoint])
+        for endpoint, entries in lines.items()
+    }
+
+
+def parse_result_line(entry: Dict) -> Tuple[str, str]:
+    """
+    Map one line of a batch output or error file to a cell status and message.
+    """
+    model = entry.get("custom_id", "?")
+    error = entry.get("error")
+    if error:
+        return "failed", f"❌ Error testing {model}: {error.get('message', error)}"
+    response = entry.get("response") or {}
+    status_code = response.get("status_code")
+    if status_code == 200:
+        return "ok", f"✅ Model {model} is accessible"
+    body_error = (response.get("body") or {}).get("error") or {}
+    if status_code in (403, 404) or body_error.get("code") in UNAVAILABLE_CODES:
+        return "unavailable", f"❌ Model {model} is not available with this API key"
+    return "failed", f"❌ Error testing {model}: HTTP {status_code} {body_error.get('message', '')}".rstrip()
+
+
+class AuditState:
+    """
+    Batches submitted for each key fingerprint, kept across runs in a JSON file.
+    """
+
+    def __init__(self, path: str = DEFAULT_BATCH_STATE_PATH):
+        self.path = path
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                self.batches: Dict[str, List[Dict]] = json.load(f)
+        except (OSError, ValueError):
+            self.batches = {}
+
+    def save(self):
+        """
+        Save the state atomically.
+        """
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        tmp_path = self.path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(self.batches, f, indent=2, sort_keys=True)
+        os.replace(tmp_path, self.path)
+
+
+class KeyAudit:
+    """
+    The batches and collected cells of one key.
+    """
+
+    def __init__(self, key: str, models: List[str], client: OpenAI):
+        self.key = key
+        self.fingerprint = key_fingerprint(key).hex()
+        self.masked = mask_key(key)
+        # The API rejects a batch file with duplicate custom_ids, and they are the models
+        self.models = list(dict.fromkeys(models))
+        self.client = client
+        self.batches: List[Dict] = []
+        self.cells: Dict[str, Dict] = {}
+
+    def cell(self, model: str, status: str, message: str, batch_id: Optional[str] = None) -> Dict:
+        cell = {
+            "key": self.masked,
+            "fingerprint": self.fingerprint,
+            "model": model,
+            "status": status,
+            "message": message,
+            "batch_id": batch_id,
+        }
+        self.cells[model] = cell
+        return cell
+
+    def fail_all(self, error: BaseException, models: Optional[Iterable[str]] = None):
+        """
+        Fail every cell of models (default: all) that is not settled yet,
+        for an error of the whole key.
+        """
+        reason = classify_error(error)
+        message = REASON_MESSAGES[reason] if reason is not None else f"❌ Batch request failed: {str(error)}"
+        for model in self.models if models is None else models:
+            if model not in self.cells:
+                self.cell(model, "failed", message)
+
+    def skip_unsupported(self):
+        """
+        Settle the cells of models the Batch API cannot check.
+        """
+        for model in self.models:
+            if batch_request(model) is None:
+                self.cell(model, "skipped", f"⏭️ Skipped {model}: the Batch API does not serve this model's endpoint")
+
+    @property
+    def submitted(self) -> Set[str]:
+        """
+        The models covered by submitted batches.
+        """
+        return {model for record in self.batches for model in record["models"]}
+
+    def resume(self, batches: List[Dict]) -> bool:
+        """
+        Take over the batches an earlier run submitted for this key that
+        check models of this audit. Returns True if they cover every model
+        the Batch API can check, so nothing is left to submit.
+        """
+        wanted = {model for model in self.models if batch_request(model) is not None}
+        self.batches = [record for record in batches if set(record["models"]) <= wanted]
+        for record in self.batches:
+            # Cells are not kept across runs, so the results of finished batches are read again
+            record.pop("finished", None)
+        self.skip_unsupported()
+        return self.submitted == wanted
+
+    def submit(self, on_batch: Optional[Callable[[], None]] = None):
+        """
+        Upload the probe files and create one batch per endpoint, for the
+        models not covered by a batch yet. on_batch is called as soon as each
+        batch is created, so it can be saved before the next request can fail.
+        """
+        self.skip_unsupported()
+        pending = [model for model in self.models if model not in self.submitted]
+        for endpoint, (data, models) in build_batch_files(pending).items():
+            upload = self.client.files.create(file=("probe-audit.jsonl", data), purpose="batch")
+            batch = self.client.batches.create(
+                input_file_id=upload.id,
+                endpoint=endpoint,
+                completion_window=COMPLETION_WINDOW,
+                metadata={"source": "openai-api-key-tester"}
+            )
+            self.batches.append({
+                "batch_id": batch.id,
+                "endpoint": endpoint,
+                "models": models,
+                "submitted_at": datetime.now(timezone.utc).strftime("%Y-%m-%d %H:%M:%S UTC"),
+            })
+            if on_batch is not None:
+                on_batch()
+
+    @property
+    def done(self) -> bool:
+        return len(self.cells) == len(self.models)
+
+    def _read_file(self, file_id: Optional[str], batch_id: str):
+        if not file_id:
+            return
+        for line in self.client.files.content(file_id).text.splitlines():
+            if line.strip():
+                entry = json.loads(line)
+                if entry.get("custom_id") in self.models:
+                    status, message = parse_result_line(entry)
+                    self.cell(entry["custom_id"], status, message, batch_id)
+
+    def poll(self) -> Dict[str, int]:
+        """
+        Check the unfinished batches once and collect the results of finished ones.
+        Returns the completed and total request counts of the batches still running.
+        """
+        progress = {"completed": 0, "total": 0}
+        for record in self.batches:
+            if record.get("finished"):
+                continue
+            batch = self.client.batches.retrieve(record["batch_id"])
+            if batch.status not in FINISHED_STATUSES:
+                counts = getattr(batch, "request_counts", None)
+                if counts is not None:
+                    progress["completed"] += counts.completed + counts.failed
+                    progress["total"] += counts.total
+                continue
+            # Expired and cancelled batches may still have partial results
+            self._read_file(batch.output_file_id, batch.id)
+            self._read_file(batch.error_file_id, batch.id)
+            for model in record["models"]:
+                if model not in self.cells:
+                    self.cell(model, "failed", f"❌ Batch {batch.status} without a result for {model}", batch.id)
+            record["finished"] = True
+        return progress
+
+
+def _poll_all(audits: List[KeyAudit], workers: int) -> Tuple[List[KeyAudit], Dict[str, int], List[str]]:
+    """
+    Poll every unfinished audit once, concurrently.
+    Returns the audits that finished in this round, the request counts and
+    the errors of audits that will be polled again in the next round.
+    """
+    pending = [audit for audit in audits if not audit.done]
+    retrying: List[str] = []
+
+    def poll(audit: KeyAudit):
+        try:
+            return audit.poll()
+        except APIError as e:
+            if classify_error(e) is not None:
+                audit.fail_all(e)
+            else:
+                # Rate limits, server errors and dropped connections pass; the batches are still running
+                retrying.append(f"{audit.masked}: {str(e)}")
+            return {"completed": 0, "total": 0}
+
+    progress = {"completed": 0, "total": 0}
+    with ThreadPoolExecutor(max_workers=max(1, min(workers, len(pending)))) as executor:
+        for counts in executor.map(poll, pending):
+            progress["completed"] += counts["completed"]
+            progress["total"] += counts["total"]
+    return [audit for audit in pending if audit.done], progress, retrying
+
+
+def run_batch_audit(args) -> None:
+    """
+    Run the batch-audit subcommand.
+    """
+    # Imported here to avoid a circular import with api_key_tester
+    from .api_key_tester import OPENAI_MODELS, validate_key_format
+    from .bulk import iter_key_lines
+    from .streaming import iter_file_lines
+
+    models = list(dict.fromkeys(args.model or OPENAI_MODELS))
+    state = AuditState(args.state)
+    http_client = make_http_client(args.http2)
+    audits: List[KeyAudit] = []
+    seen = set()
+    for key in iter_key_lines(iter_file_lines(args.keyfile)):
+        audit = KeyAudit(key, models, OpenAI(api_key=key, base_url=args.base_url, http_client=http_client))
+        if audit.fingerprint not in seen:
+            seen.add(audit.fingerprint)
+            audits.append(audit)
+
+    width = max((len(audit.masked) for audit in audits), default=0)
+    submitted = resumed = 0
+    for audit in audits:
+        if not validate_key_format(audit.key):
+            for model in models:
+                audit.cell(model, "failed", "❌ Invalid API key format")
+            continue
+        # Collect the batches an earlier run submitted instead of paying again
+        if audit.fingerprint in state.batches and audit.resume(state.batches[audit.fingerprint]):
+            resumed += 1
+            continue
+
+        def remember(audit=audit):
+            # A created batch is billed, so it is saved before anything else can fail
+            state.batches[audit.fingerprint] = audit.batches
+            state.save()
+
+        try:
+            audit.submit(remember)
+            submitted += 1
+        except APIError as e:
+            # Batches created before the error are still collected
+            audit.fail_all(e, [model for model in audit.models if model not in audit.submitted])
+    state.save()
+    print(f"ℹ️ {len(audits)} keys × {len(models)} models: {submitted} keys submitted, {resumed} resumed from {args.state}")
+    if args.no_wait:
+        print("ℹ️ Not waiting for results; run the same command again to collect them.")
+        return
+
+    output = open(args.jsonl, "a", encoding="utf-8") if args.jsonl else None
+    print("\n" + format_matrix_header(models, width))
+
+    def report(audit: KeyAudit):
+        if output is not None:
+            for model in models:
+                output.write(json.dumps(audit.cells[model], ensure_ascii=False) + "\n")
+            output.flush()
+        print(format_matrix_row(audit.masked, audit.cells, models, width))
+        # A batch is billed until it finishes, so one that has not stays remembered
+        running = [record for record in audit.batches if not record.get("finished")]
+        if running:
+            state.batches[audit.fingerprint] = running
+        else:
+            state.batches.pop(audit.fingerprint, None)
+
+    try:
+        for audit in audits:
+            if audit.done:
+                report(audit)
+        interval = args.poll_interval
+        deadline = time.monotonic() + args.timeout if args.timeout else None
+        while not all(audit.done for audit in audits):
+            finished, progress, retrying = _poll_all(audits, args.workers)
+            for audit in finished:
+                report(audit)
+            for error in retrying:
+                print(f"⚠️ Could not check the batches of {error}; checking again next round")
+            state.save()
+            if all(audit.done for audit in audits):
+                break
+            if deadline is not None and time.monotonic() + interval > deadline:
+                print(f"\n⏭️ Stopped waiting after {args.timeout:.0f} s; run the same command again to collect the rest.")
+                break
+            if progress["total"]:
+                print(f"ℹ️ {progress['completed']}/{progress['total']} batch requests done, next check in {interval:.1f} s")
+            time.sleep(interval)
+            # Batches take minutes to hours, so checks get rarer the longer they run
+            interval = min(interval * POLL_GROWTH, MAX_POLL_INTERVAL)
+    finally:
+        if output is not None:
+            output.close()
+        state.save()
+
+    complete = [audit for audit in audits if audit.done]
+    lines = ["\n📊 Batch audit summary:"]
+    for model in models if complete else []:
+        accessible = sum(1 for audit in complete if audit.cells[model]["status"] == "ok")
+        lines.append(f"- {model}: {accessible}/{len(complete)} keys")
+    if len(complete) < len(audits):
+        lines.append(f"- {len(audits) - len(complete)} keys still waiting for their batches")
+    print("\n".join(lines))
@@ -0,0 +1,523 @@
+"""
+Long-lived probe daemon with a JSON-RPC API.
+
+The daemon keeps the probe engine warm between checks: OpenAI clients per
+key sharing one connection pool, cached model catalogs and recent results. It serves
+JSON-RPC 2.0 over HTTP on a local address. Identical concurrent checks
+(same provider, target and model) are coalesced into a single upstream
+probe whose result every caller receives, and results are reused for a
+short time, so CI jobs asking the same question many times per minute cost
+one probe. Probes run on a priority scheduler, so interactive checks are
+not stuck behind scheduled or bulk work. The CLI acts as a thin client
+with --daemon.
+
+Requests must carry the bearer token the daemon writes to a file only its
+user can read, and must be JSON; requests from a web page of another
+origin are refused, so a browser cannot be used to spend the daemon's keys.
+"""
+import hmac
+import inspect
+import json
+import os
+import secrets
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Callable, Dict, Hashable, List, Optional, Tuple
+from urllib.parse import urlsplit
+import requests
+from openai import OpenAI
+from .defaults import (
+    DEFAULT_DAEMON_HOST, DEFAULT_DAEMON_PORT, DEFAULT_DAEMON_TOKEN_PATH, DEFAULT_DAEMON_URL, INTERACTIVE
+)
+from .keyindex import key_fingerprint
+from .scheduler import PriorityScheduler, format_scheduler_stats
+
+# Seconds a probe result is reused, and a model catalog is kept
+DEFAULT_RESULT_TTL = 15.0
+DEFAULT_CATALOG_TTL = 300.0
+
+# OpenAI clients kept for the most recently used keys
+DEFAULT_MAX_CLIENTS = 256
+
+# JSON-RPC 2.0 error codes
+PARSE_ERROR = -32700
+INVALID_REQUEST = -32600
+METHOD_NOT_FOUND = -32601
+INVALID_PARAMS = -32602
+SERVER_ERROR = -32000
+
+
+class Coalescer:
+    """
+    Runs a function once per key for all concurrent callers and keeps
+    successful results for a time-to-live.
+    """
+
+    def __init__(self, ttl: float = 0.0):
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._inflight: Dict[Hashable, Future] = {}
+        self._results: Dict[Hashable, Tuple[float, Any]] = {}
+        self._next_purge = 0.0
+
+    def run(
+        self,
+        key: Hashable,
+        func: Callable[[], Any],
+        on_join: Optional[Callable[[], Any]] = None
+    ) -> Tuple[Any, str]:
+        """
+        Return func's result for a key and how it was obtained:
+        'probe' if this call ran it, 'coalesced' if it joined a call already
+        in flight, or 'cached' if a recent result was reused.
+        on_join is called before waiting on a call in flight.
+        """
+        with self._lock:
+            cached = self._results.get(key)
+            if cached is not None and cached[0] > time.monotonic():
+                return cached[1], "cached"
+            future = self._inflight.get(key)
+            leader = future is None
+            if leader:
+                future = Future()
+                self._inflight[key] = future
+        if not leader:
+            if on_join is not None:
+                on_join()
+            return future.result(), "coalesced"
+
+        try:
+            value = func()
+        except BaseException as e:
+            with self._lock:
+                del self._inflight[key]
+            future.set_exception(e)
+            raise
+        with self._lock:
+            del self._inflight[key]
+            if self.ttl > 0:
+                now = time.monotonic()
+                # Drop expired results at most once per TTL, so keys asked about once do not pile up
+                if now >= self._next_purge:
+                    for stale in [k for k, (expires, _) in self._results.items() if expires <= now]:
+                        del self._results[stale]
+                    self._next_purge = now + self.ttl
+                self._results[key] = (now + self.ttl, value)
+        future.set_result(value)
+        return value, "probe"
+
+
+class ProbeEngine:
+    """
+    Answers check requests with warm clients, coalescing identical ones.
+    """
+
+    def __init__(
+        self,
+        result_ttl: float = DEFAULT_RESULT_TTL,
+        catalog_ttl: float = DEFAULT_CATALOG_TTL,
+        http2: bool = False,
+        scheduler: Optional[PriorityScheduler] = None,
+        max_clients: int = DEFAULT_MAX_CLIENTS
+    ):
+        # Imported here so the daemon only loads the transport when it starts
+        from .transport import make_http_client
+
+        # One connection pool shared by every key: connections are per host
+        self.http_client = make_http_client(http2)
+        self.results = Coalescer(result_ttl)
+        self.catalogs = Coalescer(catalog_ttl)
+        self.scheduler = scheduler or PriorityScheduler()
+        self.max_clients = max_clients
+        self._clients: "OrderedDict[bytes, OpenAI]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.counters = {"requests": 0, "probe": 0, "coalesced": 0, "cached": 0}
+        self.started = time.time()
+
+    def _count(self, how: str):
+        with self._lock:
+            self.counters["requests"] += 1
+            self.counters[how] += 1
+
+    def _openai_client(self, api_key: str) -> OpenAI:
+        fingerprint = key_fingerprint(api_key)
+        with self._lock:
+            client = self._clients.get(fingerprint)
+            if client is None:
+                client = OpenAI(api_key=api_key, http_client=self.http_client)
+                self._clients[fingerprint] = client
+                # Evicted clients are dropped, not closed: closing one would
+                # close the connection pool that every key shares
+                while len(self._clients) > self.max_clients:
+                    self._clients.popitem(last=False)
+            else:
+                self._clients.move_to_end(fingerprint)
+            return client
+
+    def _scheduled(self, coalescer: Coalescer, key: Hashable, func: Callable[[], Any], priority: str):
+        """
+        Run func once for concurrent identical requests, on the scheduler.
+        A more urgent request joining a queued probe promotes it.
+        """
+        return coalescer.run(
+            key,
+            lambda: self.scheduler.run(priority, func, key),
+            on_join=lambda: self.scheduler.promote(key, priority)
+        )
+
+    @staticmethod
+    def _target_id(provider: str, target: str) -> str:
+        # Keys are never kept as coalescing keys, only their fingerprints
+        return key_fingerprint(target).hex() if provider == "openai" else target
+
+    def check_model(self, provider: str, target: str, model: str, priority: str = INTERACTIVE) -> Dict:
+        """
+        Check one model of a provider's target.
+        """
+        def probe() -> Dict:
+            start = time.perf_counter()
+            if provider == "openai":
+                from .api_key_tester import test_model
+                success, message = test_model(self._openai_client(target), model)
+            elif provider == "ollama":
+                from .api_key_tester import test_ollama_model
+                success, message = test_ollama_model(target, model)
+            else:
+                success, message = self._provider(provider).probe(target, model)
+            return {"success": success, "message": message, "latency_ms": (time.perf_counter() - start) * 1000}
+
+        key = ("check", provider, self._target_id(provider, target), model)
+        result, how = self._scheduled(self.results, key, probe, priority)
+        self._count(how)
+        return dict(result, served=how)
+
+    def list_models(self, provider: str, target: str, priority: str = INTERACTIVE) -> Dict:
+        """
+        Return the catalog of a provider's target.
+        """
+        def fetch() -> List[str]:
+            if provider == "openai":
+                from .catalog import discover_openai_models
+                from .planner import ProbeCache
+                return discover_openai_models(self._openai_client(target), ProbeCache())
+            return list(self._provider(provider).catalog(target))
+
+        key = ("catalog", provider, self._target_id(provider, target))
+        models, how = self._scheduled(self.catalogs, key, fetch, priority)
+        self._count(how)
+        return {"models": models, "served": how}
+
+    def validate_key(self, key: str, priority: str = INTERACTIVE) -> Dict:
+        """
+        Check whether a key is accepted, as the bulk subcommand does.
+        """
+        from .bulk import validate_key
+        from .keyindex import normalize_key, mask_key
+
+        key = normalize_key(key)
+        result, how = self._scheduled(
+            self.results,
+            ("validate", key_fingerprint(key).hex()),
+            lambda: validate_key(key, self.http_client),
+            priority
+        )
+        self._count(how)
+        return dict(result, key=mask_key(key), served=how)
+
+    @staticmethod
+    def _provider(name: str):
+        from .providers import available_providers, load_provider
+        providers = available_providers()
+        if name not in providers:
+            raise ValueError(f"unknown provider '{name}' (available: {', '.join(providers)})")
+        return load_provider(providers[name])
+
+    def stats(self) -> Dict:
+        """
+        Return request counters, scheduler queues and uptime.
+        """
+        with self._lock:
+            counters = dict(self.counters, clients=len(self._clients), uptime_s=round(time.time() - self.started, 1))
+        counters["scheduler"] = self.scheduler.stats()
+        return counters
+
+    def close(self):
+        """
+        Drop the clients and close the shared connection pool.
+        """
+        with self._lock:
+            self._clients.clear()
+        self.http_client.close()
+
+
+def _error(request_id: Any, code: int, message: str) -> Dict:
+    return {"jsonrpc": "2.0", "id": request_id, "error": {"code": code, "message": message}}
+
+
+def handle_rpc(engine: ProbeEngine, request: Any) -> Optional[Dict]:
+    """
+    Dispatch one JSON-RPC request object and return the response object,
+    or None for a notification.
+    """
+    if not isinstance(request, dict) or request.get("jsonrpc") != "2.0" or not isinstance(request.get("method"), str):
+        return _error(None, INVALID_REQUEST, "Invalid Request")
+    request_id = request.get("id")
+    methods = {
+        "ping": lambda: "pong",
+        "check_model": engine.check_model,
+        "list_models": engine.list_models,
+        "validate_key": engine.validate_key,
+        "stats": engine.stats,
+    }
+    method = methods.get(request["method"])
+    if method is None:
+        return _error(request_id, METHOD_NOT_FOUND, f"Method not found: {request['method']}")
+    params = request.get("params") or {}
+    try:
+        bound = inspect.signature(method).bind(*params) if isinstance(params, list) \
+            else inspect.signature(method).bind(**params)
+    except TypeError as e:
+        return _error(request_id, INVALID_PARAMS, f"Invalid params: {str(e)}")
+    try:
+        result = method(*bound.args, **bound.kwargs)
+    except Exception as e:
+        return _error(request_id, SERVER_ERROR, str(e))
+    if "id" not in request:
+        return None
+    return {"jsonrpc": "2.0", "id": request_id, "result": result}
+
+
+class _RPCHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, format, *args):
+        pass
+
+    def _send(self, status: int, body: Any):
+        data = json.dumps(body).encode("utf-8") if body is not None else b""
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def _refusal(self) -> Optional[Tuple[int, str]]:
+        """
+        Return the HTTP status and message to refuse the request with, or None to serve it.
+        """
+        token = self.headers.get("Authorization", "")
+        if not hmac.compare_digest(token.encode("utf-8"), f"Bearer {self.server.token}".encode("utf-8")):
+            return 401, "Missing or wrong daemon token"
+        # Browsers send Origin on cross-site requests; local clients send none
+        origin = self.headers.get("Origin")
+        if origin is not None and urlsplit(origin).netloc != self.headers.get("Host"):
+            return 403, f"Requests from origin {origin} are not allowed"
+        if self.headers.get_content_type() != "application/json":
+            return 415, "Content-Type must be application/json"
+        return None
+
+    def do_POST(self):
+        refusal = self._refusal()
+        if refusal is not None:
+            status, message = refusal
+            # The body is not read, so the connection cannot be reused
+            self.close_connection = True
+            self._send(status, _error(None, INVALID_REQUEST, message))
+            return
+        length = int(self.headers.get("Content-Length") or 0)
+        try:
+            payload = json.loads(self.rfile.read(length) or b"null")
+        except ValueError:
+            self._send(200, _error(None, PARSE_ERROR, "Parse error"))
+            return
+
+        engine = self.server.engine
+        if isinstance(payload, list):
+            if not payload:
+                self._send(200, _error(None, INVALID_REQUEST, "Invalid Request"))
+                return
+            # Batched requests are answered concurrently so they coalesce too,
+            # with no more threads than the scheduler has probe slots
+            workers = max(1, min(len(payload), engine.scheduler.slots))
+            with ThreadPoolExecutor(max_workers=workers) as executor:
+                responses = list(executor.map(lambda request: handle_rpc(engine, request), payload))
+            answered = [response for response in responses if response is not None]
+            self._send(200 if answered else 204, answered or None)
+        else:
+            response = handle_rpc(engine, payload)
+            self._send(200 if response is not None else 204, response)
+
+
+class _DaemonServer(ThreadingHTTPServer):
+    daemon_threads = True
+    # Many clients connect at once when background jobs fan out
+    request_queue_size = 256
+
+
+def write_token(path: str = DEFAULT_DAEMON_TOKEN_PATH) -> str:
+    """
+    Generate a new daemon token and write it to a file only the current user can read.
+    """
+    token = secrets.token_urlsafe(32)
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    fd = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+    with os.fdopen(fd, "w", encoding="utf-8") as f:
+        # The mode only applies to new files, so tighten an existing one too
+        os.chmod(path, 0o600)
+        f.write(token + "\n")
+    return token
+
+
+def read_token(path: str = DEFAULT_DAEMON_TOKEN_PATH) -> Optional[str]:
+    """
+    Read the token of a running daemon, or None if there is no token file.
+    """
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            return f.read().strip()
+    except OSError:
+        return None
+
+
+def serve(
+    host: str = DEFAULT_DAEMON_HOST,
+    port: int = DEFAULT_DAEMON_PORT,
+    engine: Optional[ProbeEngine] = None,
+    token: Optional[str] = None
+) -> ThreadingHTTPServer:
+    """
+    Create the daemon's HTTP server; call serve_forever() to run it.
+    Requests must carry token; a new token is written to the default token file if none is given.
+    """
+    server = _DaemonServer((host, port), _RPCHandler)
+    server.engine = engine or ProbeEngine()
+    server.token = token or write_token()
+    return server
+
+
+class DaemonError(Exception):
+    """
+    Error returned by the daemon for a request.
+    """
+
+
+class DaemonClient:
+    """
+    Thin client for a running daemon.
+    """
+
+    def __init__(self, url: str = DEFAULT_DAEMON_URL, timeout: float = 300.0, token_path: str = DEFAULT_DAEMON_TOKEN_PATH):
+        self.url = url.rstrip("/") + "/"
+        self.timeout = timeout
+        self.token_path = token_path
+        self.session = requests.Session()
+        token = read_token(token_path)
+        if token is not None:
+            self.session.headers["Authorization"] = f"Bearer {token}"
+        self._next_id = 0
+
+    def call(self, method: str, **params) -> Any:
+        """
+        Call a daemon method and return its result.
+        Raises DaemonError for errors reported by the daemon.
+        """
+        self._next_id += 1
+        response = self.session.post(
+            self.url,
+            json={"jsonrpc": "2.0", "id": self._next_id, "method": method, "params": params},
+            timeout=self.timeout
+        )
+        if response.status_code == 401:
+            raise DaemonError(f"the daemon did not accept the token in {self.token_path}")
+        response.raise_for_status()
+        body = response.json()
+        if "error" in body:
+            raise DaemonError(body["error"].get("message", "unknown error"))
+        return body["result"]
+
+
+def run_remote_checks(
+    client: DaemonClient,
+    targets: List[Tuple[Any, Optional[str]]],
+    emit: Callable[[str], None],
+    models: Optional[Dict[str, List[str]]] = None,
+    priority: str = INTERACTIVE
+):
+    """
+    Check every configured target through the daemon, reporting each
+    result through emit. models selects the models per provider name;
+    by default the built-in lists or the target's catalog are checked.
+    """
+    # Imported here to avoid a circular import with api_key_tester
+    from .api_key_tester import OPENAI_MODELS, OLLAMA_MODELS
+
+    for spec, target in targets:
+        if target is None:
+            if spec.missing_message:
+                emit(spec.missing_message)
+            continue
+        emit(f"\nTesting {spec.name} through the daemon...")
+        try:
+            if models is not None and spec.name in models:
+                selected = models[spec.name]
+            elif spec.name == "openai":
+                selected = OPENAI_MODELS
+            elif spec.name == "ollama":
+                selected = OLLAMA_MODELS
+            else:
+                selected = client.call("list_models", provider=spec.name, target=target, priority=priority)["models"]
+            for model in selected:
+                result = client.call(
+                    "check_model", provider=spec.name, target=target, model=model, priority=priority
+                )
+                note = f" [{result['served']}]" if result["served"] != "probe" else ""
+                emit(result["message"] + note)
+        except (DaemonError, requests.exceptions.RequestException) as e:
+            emit(f"❌ Daemon error: {str(e)}")
+    try:
+        stats = client.call("stats")
+    except (DaemonError, requests.exceptions.RequestException) as e:
+        emit(f"❌ Daemon error: {str(e)}")
+        return
+    emit(
+        f"\nℹ️ Daemon: {stats['requests']} requests served, {stats['probe']} upstream probes, "
+        f"{stats['coalesced']} coalesced, {stats['cached']} cached"
+    )
+    for line in format_scheduler_stats(stats["scheduler"]):
+        emit(line)
+
+
+def run_daemon(args) -> None:
+    """
+    Run the daemon subcommand.
+    """
+    try:
+        scheduler = PriorityScheduler(args.slots, reserved=args.reserve)
+    except ValueError as e:
+        print(f"❌ Error: {str(e)}")
+        return
+    engine = ProbeEngine(args.result_ttl, args.catalog_ttl, args.http2, scheduler)
+    try:
+        token = write_token(args.token_file)
+    except OSError as e:
+        print(f"❌ Error: could not write the daemon token: {str(e)}")
+        scheduler.shutdown()
+        engine.close()
+        return
+    server = serve(args.host, args.port, engine, token)
+    print(f"✅ Probe daemon listening on http://{args.host}:{server.server_address[1]} (JSON-RPC 2.0)")
+    print(f"ℹ️ Clients authenticate with the token in {args.token_file}")
+    reserved = ", ".join(f"{cls} {count}" for cls, count in scheduler.reserved.items() if count)
+    print(f"ℹ️ {scheduler.slots} probe slots, reserved: {reserved or 'none'}")
+    print(f"ℹ️ Results reused for {args.result_ttl:g} s, catalogs for {args.catalog_ttl:g} s. Press Ctrl+C to stop.")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        print("\nℹ️ Daemon stopped.")
+    finally:
+        server.server_close()
+        scheduler.shutdown()
+        engine.close()
@@ -0,0 +1,27 @@
+"""
+Default paths and settings of the command line.
+
+The subsystems that use these defaults are only imported when their
+subcommand or option runs; keeping the defaults here lets the argument
+parser show them without loading history, batch audits, budgets, the
+daemon, profiling or the scheduler.
+"""
+import os
+
+DEFAULT_HISTORY_DIR = os.path.join(os.path.expanduser("~"), ".openai_key_tester", "history")
+DEFAULT_BATCH_STATE_PATH = os.path.join(os.path.expanduser("~"), ".openai_key_tester", "batch-audits.json")
+DEFAULT_LEDGER_PATH = os.path.join(os.path.expanduser("~"), ".openai_key_tester", "spend.json")
+DEFAULT_PROFILE_DIR = os.path.join(os.path.expanduser("~"), ".openai_key_tester", "profiles")
+
+DEFAULT_DAEMON_HOST = "127.0.0.1"
+DEFAULT_DAEMON_PORT = 8788
+DEFAULT_DAEMON_URL = f"http://{DEFAULT_DAEMON_HOST}:{DEFAULT_DAEMON_PORT}"
+# Written by the daemon, readable only by its user, and sent back by clients
+DEFAULT_DAEMON_TOKEN_PATH = os.path.join(os.path.expanduser("~"), ".openai_key_tester", "daemon.token")
+
+INTERACTIVE = "interactive"
+SCHEDULED = "scheduled"
+BULK = "bulk"
+
+# Classes from most to least urgent
+PRIORITY_CLASSES = [INTERACTIVE, SCHEDULED, BULK]
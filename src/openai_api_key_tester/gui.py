@@ -1,18 +1,34 @@
 import tkinter as tk
 from tkinter import ttk, scrolledtext, messagebox
 import os
+import queue
+import threading
+import time
 from typing import List, Optional
 from .api_key_tester import (
-    validate_key_format, test_model, get_usage_stats,
+    validate_key_format, get_usage_stats,
     validate_ollama_url, test_ollama_model, get_ollama_status,
-    OPENAI_MODELS, OLLAMA_MODELS
+    OPENAI_MODELS, OLLAMA_MODELS, record_openai_result
 )
+from .planner import ProbeCache, plan_openai_probes, format_plan_summary
+from .errors import FailFast
+from .catalog import (
+    group_families, format_catalog_summary, sample_families,
+    discover_openai_models, discover_ollama_models, SearchIndex
+)
+from .history import HistoryRecorder, history_available
+from .keyindex import key_fingerprint
+from .dashboard import DashboardPanel
+from .planner import probe_signature
+from .transport import TransportStats, make_http_client
+from .profiling import DEFAULT_PROFILE_DIR, RunProfiler
 from openai import OpenAI, APIError, APIConnectionError
 import requests
 
 class APIKeyTesterGUI:
-    def __init__(self, root):
+    def __init__(self, root, profile_dir: Optional[str] = None):
         self.root = root
+        self.profile_dir = profile_dir or DEFAULT_PROFILE_DIR
         self.root.title("API Key Tester")
         self.root.geometry("800x900")
         
@@ -115,6 +131,28 @@ class APIKeyTesterGUI:
         )
         model_section.grid(row=3, column=0, columnspan=3, sticky=(tk.W, tk.E), pady=(0, 15))
         
+        # Search box and live refresh of the model lists
+        search_frame = ttk.Frame(model_section)
+        search_frame.grid(row=0, column=0, columnspan=3, sticky=(tk.W, tk.E))
+        ttk.Label(search_frame, text="Search:").pack(side=tk.LEFT)
+        self.search_var = tk.StringVar(value='')
+        self.search_var.trace_add("write", self.on_search_changed)
+        ttk.Entry(
+            search_frame,
+            textvariable=self.search_var,
+            width=30,
+            style="APIKey.TEntry"
+        ).pack(side=tk.LEFT, padx=5)
+        self.refresh_button = ttk.Button(
+            search_frame,
+            text="Refresh from Servers",
+            style="Action.TButton",
+            command=self.refresh_catalogs
+        )
+        self.refresh_button.pack(side=tk.LEFT, padx=5)
+        self.catalog_status_var = tk.StringVar(value='')
+        ttk.Label(search_frame, textvariable=self.catalog_status_var).pack(side=tk.LEFT, padx=5)
+        
         # Create notebook for OpenAI and Ollama models
         model_notebook = ttk.Notebook(model_section)
         model_notebook.grid(row=1, column=0, columnspan=3, sticky=(tk.W, tk.E), pady=5)
@@ -139,8 +177,6 @@ class APIKeyTesterGUI:
             activestyle='none'
         )
         self.openai_model_listbox.pack(fill=tk.X, pady=5)
-        for model in OPENAI_MODELS:
-            self.openai_model_listbox.insert(tk.END, model)
             
         # Ollama models frame
         ollama_models_frame = ttk.Frame(model_notebook)
@@ -162,8 +198,18 @@ class APIKeyTesterGUI:
             activestyle='none'
         )
         self.ollama_model_listbox.pack(fill=tk.X, pady=5)
-        for model in OLLAMA_MODELS:
-            self.ollama_model_listbox.insert(tk.END, model)
+        
+        # Model catalogs start from the built-in lists until refreshed
+        self.catalogs = {"openai": SearchIndex(OPENAI_MODELS), "ollama": SearchIndex(OLLAMA_MODELS)}
+        self.listboxes = {"openai": self.openai_model_listbox, "ollama": self.ollama_model_listbox}
+        self.selected = {"openai": set(), "ollama": set()}
+        self.visible = {"openai": [], "ollama": []}
+        self._filter_job = None
+        # Queue of the catalog refresh in flight, if any
+        self._catalog_queue: Optional[queue.Queue] = None
+        for provider, listbox in self.listboxes.items():
+            listbox.bind("<<ListboxSelect>>", lambda event, provider=provider: self.on_model_select(provider))
+        self.apply_model_filter()
             
         # Model selection buttons
         button_frame = ttk.Frame(model_section)
@@ -181,12 +227,44 @@ class APIKeyTesterGUI:
             command=lambda: self.clear_model_selection(model_notebook.index("current"))
         ).pack(side=tk.LEFT)
         
+        # Family sampling: probe one model per family unless exhaustive
+        self.exhaustive_var = tk.BooleanVar(value=False)
+        ttk.Checkbutton(
+            button_frame,
+            text="Exhaustive (probe every selected model)",
+            variable=self.exhaustive_var
+        ).pack(side=tk.LEFT, padx=(15, 0))
+        
+        # Streamed access checks return at the first chunk
+        self.stream_var = tk.BooleanVar(value=False)
+        ttk.Checkbutton(
+            button_frame,
+            text="Streamed access checks",
+            variable=self.stream_var
+        ).pack(side=tk.LEFT, padx=(15, 0))
+        
+        # Multiplex OpenAI requests over one HTTP/2 connection
+        self.http2_var = tk.BooleanVar(value=False)
+        ttk.Checkbutton(
+            button_frame,
+            text="HTTP/2",
+            variable=self.http2_var
+        ).pack(side=tk.LEFT, padx=(15, 0))
+        
+        # Profile the next run and write a CPU and allocation report
+        self.profile_var = tk.BooleanVar(value=profile_dir is not None)
+        ttk.Checkbutton(
+            button_frame,
+            text="Profile run",
+            variable=self.profile_var
+        ).pack(side=tk.LEFT, padx=(15, 0))
+        
         # Test Button
         self.test_button = ttk.Button(
             main_container,
             text="Test APIs",
             style="Primary.TButton",
-            command=self.run_tests
+            command=self.on_test_clicked
         )
         self.test_button.grid(row=4, column=0, columnspan=3, pady=15)
         
@@ -199,9 +277,17 @@ class APIKeyTesterGUI:
         )
         results_section.grid(row=5, column=0, columnspan=3, sticky=(tk.W, tk.E, tk.N, tk.S), pady=(0, 15))
         
+        # Results notebook with the text log and the latency dashboard
+        results_notebook = ttk.Notebook(results_section)
+        results_notebook.grid(row=0, column=0, sticky=(tk.W, tk.E, tk.N, tk.S))
+        log_frame = ttk.Frame(results_notebook)
+        results_notebook.add(log_frame, text='Log')
+        self.dashboard = DashboardPanel(results_notebook, padding="5")
+        results_notebook.add(self.dashboard, text='Dashboard')
+        
         # Results text area with custom style
         self.results_text = scrolledtext.ScrolledText(
-            results_section,
+            log_frame,
             width=70,
             height=15,
             font=('Consolas', 10),
@@ -228,6 +314,9 @@ class APIKeyTesterGUI:
         
         # Bind window closing event
         self.root.protocol("WM_DELETE_WINDOW", self.on_closing)
+        
+        # Fill the model lists from the live servers without blocking startup
+        self.root.after(0, self.refresh_catalogs)
 
     def configure_styles(self):
         """Configure custom styles for the application"""
@@ -304,23 +393,130 @@ class APIKeyTesterGUI:
         self.show_key.set(not self.show_key.get())
 
     def select_all_models(self, tab_index):
-        """Select all models in the current tab"""
-        if tab_index == 0:  # OpenAI models
-            self.openai_model_listbox.select_set(0, tk.END)
-        else:  # Ollama models
-            self.ollama_model_listbox.select_set(0, tk.END)
+        """Select all visible models in the current tab"""
+        provider = "openai" if tab_index == 0 else "ollama"
+        self.listboxes[provider].select_set(0, tk.END)
+        self.selected[provider].update(self.visible[provider])
 
     def clear_model_selection(self, tab_index):
         """Clear all model selections in the current tab"""
-        if tab_index == 0:  # OpenAI models
-            self.openai_model_listbox.selection_clear(0, tk.END)
-        else:  # Ollama models
-            self.ollama_model_listbox.selection_clear(0, tk.END)
+        provider = "openai" if tab_index == 0 else "ollama"
+        self.listboxes[provider].selection_clear(0, tk.END)
+        self.selected[provider].clear()
+
+    def on_model_select(self, provider: str):
+        """Keep the selection of visible models in sync, so it survives filtering"""
+        chosen = set(self.listboxes[provider].curselection())
+        for idx, model in enumerate(self.visible[provider]):
+            if idx in chosen:
+                self.selected[provider].add(model)
+            else:
+                self.selected[provider].discard(model)
+
+    def on_search_changed(self, *args):
+        """Debounce the search box so fast typing filters only once"""
+        if self._filter_job is not None:
+            self.root.after_cancel(self._filter_job)
+        self._filter_job = self.root.after(150, self.apply_model_filter)
+
+    def apply_model_filter(self):
+        """Fill both model lists with the catalog entries matching the search"""
+        self._filter_job = None
+        query = self.search_var.get()
+        for provider, listbox in self.listboxes.items():
+            visible = self.catalogs[provider].filter(query)
+            self.visible[provider] = visible
+            listbox.delete(0, tk.END)
+            if visible:
+                listbox.insert(tk.END, *visible)
+            for idx, model in enumerate(visible):
+                if model in self.selected[provider]:
+                    listbox.select_set(idx)
+
+    def refresh_catalogs(self):
+        """Fetch the live model lists in the background, one refresh at a time"""
+        if self._catalog_queue is not None:
+            return
+        api_key = self.api_key_var.get().strip()
+        ollama_url = self.ollama_url_var.get().strip()
+        # Each refresh gets its own queue, so results of different refreshes never mix
+        catalog_queue = queue.Queue()
+        self._catalog_queue = catalog_queue
+        self.refresh_button.config(state=tk.DISABLED)
+        self.catalog_status_var.set("Refreshing model lists...")
+        threading.Thread(
+            target=self._fetch_catalogs,
+            args=(catalog_queue, api_key, ollama_url),
+            daemon=True
+        ).start()
+        self.root.after(100, self._poll_catalogs, catalog_queue)
+
+    def _fetch_catalogs(self, catalog_queue: queue.Queue, api_key: str, ollama_url: str):
+        """Worker thread: fetch catalogs and hand them to the UI thread"""
+        if api_key and validate_key_format(api_key):
+            try:
+                catalog_queue.put(("openai", discover_openai_models(OpenAI(api_key=api_key)), None))
+            except Exception as e:
+                catalog_queue.put(("openai", None, str(e)))
+        if validate_ollama_url(ollama_url):
+            try:
+                catalog_queue.put(("ollama", discover_ollama_models(ollama_url), None))
+            except Exception as e:
+                catalog_queue.put(("ollama", None, str(e)))
+        catalog_queue.put((None, None, None))
+
+    def _poll_catalogs(self, catalog_queue: queue.Queue):
+        """UI thread: apply fetched catalogs without blocking the event loop"""
+        done = False
+        messages = []
+        while True:
+            try:
+                provider, models, error = catalog_queue.get_nowait()
+            except queue.Empty:
+                break
+            if provider is None:
+                done = True
+            elif error is not None:
+                messages.append(f"{provider}: failed")
+            else:
+                self.catalogs[provider] = SearchIndex(models)
+                messages.append(f"{provider}: {len(models)} models")
+        if messages:
+            self.apply_model_filter()
+            self.catalog_status_var.set(", ".join(messages))
+        if done:
+            self._catalog_queue = None
+            self.refresh_button.config(state=tk.NORMAL)
+        else:
+            self.root.after(100, self._poll_catalogs, catalog_queue)
+
+    def run_tests_via_daemon(self, daemon_url: str, openai_models: List[str], ollama_models: List[str]):
+        """Run the selected checks through a probe daemon"""
+        # Imported here so the GUI only needs the daemon client when it is used
+        from .daemon import DaemonClient, run_remote_checks
+        from .providers import available_providers
+
+        providers = available_providers()
+        targets = [
+            (providers["openai"], self.api_key_var.get().strip() or None),
+            (providers["ollama"], self.ollama_url_var.get().strip() or None)
+        ]
+        self.update_results(f"ℹ️ Sending checks to the probe daemon at {daemon_url}")
+        try:
+            run_remote_checks(
+                DaemonClient(daemon_url), targets, self.update_results,
+                {"openai": openai_models, "ollama": ollama_models}
+            )
+        except requests.exceptions.RequestException as e:
+            self.update_results(f"❌ Could not reach the daemon at {daemon_url}: {str(e)}")
+        self.progress_var.set(100)
+        self.dashboard.set_remaining([])
+        self.update_results("\n✅ Test completed.")
 
     def get_selected_models(self) -> tuple[List[str], List[str]]:
         """Get list of selected models for both APIs"""
-        openai_models = [self.openai_model_listbox.get(idx) for idx in self.openai_model_listbox.curselection()]
-        ollama_models = [self.ollama_model_listbox.get(idx) for idx in self.ollama_model_listbox.curselection()]
+        openai_models = [model for model in self.catalogs["openai"].names if model in self.selected["openai"]]
+        ollama_models = [model for model in self.catalogs["ollama"].names if model in self.selected["ollama"]]
         return openai_models, ollama_models
 
     def update_results(self, text: str, clear: bool = False):
@@ -331,6 +527,16 @@ class APIKeyTesterGUI:
         self.results_text.see(tk.END)
         self.root.update_idletasks()
 
+    def on_test_clicked(self):
+        """Run API tests, under the profiler if requested"""
+        if not self.profile_var.get():
+            self.run_tests()
+            return
+        profiler = RunProfiler(self.profile_dir)
+        with profiler:
+            self.run_tests()
+        self.update_results("\n" + profiler.summary())
+
     def run_tests(self):
         """Run API tests"""
         self.update_results("", clear=True)
@@ -339,6 +545,14 @@ class APIKeyTesterGUI:
         openai_models, ollama_models = self.get_selected_models()
         total_steps = len(openai_models) + len(ollama_models) + 2  # +2 for initial checks
         current_step = 0
+        recorder = HistoryRecorder() if history_available() else None
+        self.dashboard.set_remaining(openai_models + ollama_models)
+        
+        # Thin-client mode: let a running probe daemon do the checks
+        daemon_url = os.getenv("OPENAI_KEY_TESTER_DAEMON")
+        if daemon_url:
+            self.run_tests_via_daemon(daemon_url, openai_models, ollama_models)
+            return
         
         # Test OpenAI API
         api_key = self.api_key_var.get().strip()
@@ -349,12 +563,23 @@ class APIKeyTesterGUI:
 
             self.update_results("Testing OpenAI API...")
             try:
-                client = OpenAI(api_key=api_key)
+                transport = TransportStats()
+                client = OpenAI(api_key=api_key, http_client=make_http_client(self.http2_var.get(), transport))
                 self.update_results("✅ OpenAI API client initialized successfully\n")
                 
+                # Plan the run so the quota check and model probes share requests
+                cache = ProbeCache(stream=self.stream_var.get())
+                exhaustive = self.exhaustive_var.get()
+                families = group_families(openai_models)
+                planned = openai_models if exhaustive else [members[0] for members in families.values()]
+                self.update_results(format_catalog_summary(families, exhaustive))
+                self.update_results(format_plan_summary(plan_openai_probes(planned, stream=cache.stream)))
+                
                 # Get usage statistics
-                stats = get_usage_stats(client)
+                stats = get_usage_stats(client, cache)
                 self.update_results("\n" + "="*50)
+                target = str(client.base_url)
+                fingerprint = key_fingerprint(api_key).hex()
                 if stats["status"] == "success":
                     data = stats["data"]
                     self.update_results("📊 OpenAI API Status Check:")
@@ -369,11 +594,24 @@ class APIKeyTesterGUI:
 
                 if openai_models:
                     self.update_results("\nTesting OpenAI models:")
-                    for model in openai_models:
-                        success, message = test_model(client, model)
+                    checked = 0
+                    for model, success, message in sample_families(client, families, cache, exhaustive):
                         self.update_results(message)
+                        record_openai_result(recorder, cache, target, fingerprint, model, success, message)
+                        outcome = cache.outcome(probe_signature(model, cache.stream))
+                        if outcome is not None:
+                            self.dashboard.add("openai", model, outcome.elapsed * 1000, success)
+                        else:
+                            self.dashboard.done(model)
+                        checked += 1
                         current_step += 1
                         self.progress_var.set((current_step / total_steps) * 100)
+                        if cache.fail_fast.cancelled:
+                            break
+                    if checked < len(openai_models):
+                        self.update_results(f"⏭️ Cancelled {len(openai_models) - checked} remaining probes: {cache.fail_fast.describe()}")
+                    self.update_results("\n" + cache.summary())
+                self.update_results(transport.summary())
                         
             except Exception as e:
                 self.update_results(f"\n❌ OpenAI API Error: {str(e)}")
@@ -399,9 +637,21 @@ class APIKeyTesterGUI:
 
                     if ollama_models:
                         self.update_results("\nTesting Ollama models:")
-                        for model in ollama_models:
-                            success, message = test_ollama_model(ollama_url, model)
+                        fail_fast = FailFast()
+                        for index, model in enumerate(ollama_models):
+                            if fail_fast.cancelled:
+                                self.update_results(f"⏭️ Cancelled {len(ollama_models) - index} remaining probes: {fail_fast.describe()}")
+                                break
+                            start = time.perf_counter()
+                            success, message = test_ollama_model(ollama_url, model, fail_fast, self.stream_var.get())
                             self.update_results(message)
+                            latency_ms = (time.perf_counter() - start) * 1000
+                            self.dashboard.add("ollama", model, latency_ms, success)
+                            if recorder is not None:
+                                recorder.record(
+                                    "ollama", ollama_url, model, success, "ok" if success else "failed",
+                                    message, latency_ms
+                                )
                             current_step += 1
                             self.progress_var.set((current_step / total_steps) * 100)
                 else:
@@ -411,12 +661,26 @@ class APIKeyTesterGUI:
         else:
             self.update_results("\nℹ️ Invalid Ollama API URL, skipping Ollama tests.")
 
+        if recorder is not None:
+            try:
+                recorder.flush()
+            except OSError as e:
+                self.update_results(f"\n⚠️ Could not record results: {str(e)}")
+
+        self.dashboard.set_remaining([])
         self.update_results("\n✅ Test completed.")
         self.progress_var.set(100)
 
-def main():
+def main(argv: Optional[List[str]] = None):
+    import argparse
+    parser = argparse.ArgumentParser(description="Check OpenAI API keys and Ollama servers in a window.")
+    parser.add_argument(
+        "--profile", nargs="?", const=DEFAULT_PROFILE_DIR, metavar="DIR",
+        help=f"profile test runs and write CPU and allocation reports (default DIR: {DEFAULT_PROFILE_DIR})"
+    )
+    args = parser.parse_args(argv)
     root = tk.Tk()
-    app = APIKeyTesterGUI(root)
+    app = APIKeyTesterGUI(root, profile_dir=args.profile)
     root.mainloop()
 
 if __name__ == "__main__":
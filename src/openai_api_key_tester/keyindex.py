@@ -0,0 +1,212 @@
+"""
+Key normalisation, fingerprints and the persistent index of revoked keys.
+
+Keys are never stored: only truncated SHA-256 fingerprints are. The index is
+a Bloom filter kept in memory, backed by an exact store of sorted fixed-width
+fingerprints on disk. A lookup that the Bloom filter rejects costs no I/O;
+one it accepts is confirmed with a binary search over the memory-mapped store.
+"""
+import bisect
+import hashlib
+import math
+import mmap
+import os
+from typing import Iterable, Optional
+
+# Bytes of SHA-256 kept per key; 128 bits make collisions irrelevant in practice
+FINGERPRINT_SIZE = 16
+
+DEFAULT_INDEX_PATH = os.path.join(os.path.expanduser("~"), ".openai_key_tester", "revoked.idx")
+
+# Prefixes commonly found in front of keys copied from configs and headers
+_KEY_PREFIXES = ("bearer ", "authorization:", "openai_api_key=", "openai_api_key:")
+
+
+def normalize_key(raw: str) -> str:
+    """
+    Normalise a key as found in a dump: strip whitespace, quotes and
+    'Bearer' or 'OPENAI_API_KEY=' prefixes.
+    """
+    key = raw.strip()
+    # Prefixes can be stacked, as in 'Authorization: Bearer sk-…'
+    stripped = True
+    while stripped:
+        stripped = False
+        lowered = key.lower()
+        for prefix in _KEY_PREFIXES:
+            if lowered.startswith(prefix):
+                key = key[len(prefix):].strip()
+                stripped = True
+                break
+    return key.strip("'\"` ,;")
+
+
+def key_fingerprint(key: str) -> bytes:
+    """
+    Return the fingerprint used to identify a key without storing it.
+    """
+    return hashlib.sha256(key.encode("utf-8")).digest()[:FINGERPRINT_SIZE]
+
+
+def mask_key(key: str) -> str:
+    """
+    Mask a key for display, keeping its prefix and last four characters.
+    """
+    if len(key) <= 12:
+        return key[:3] + "…"
+    prefix = key[:8] if key.startswith("sk-") else key[:4]
+    return f"{prefix}…{key[-4:]}"
+
+
+class BloomFilter:
+    """
+    Fixed-size Bloom filter over fingerprints.
+    Bit positions come from double hashing the two halves of the fingerprint,
+    which is already uniformly distributed, so no extra hashing is needed.
+    """
+
+    def __init__(self, capacity: int = 100_000, error_rate: float = 0.001, bits: Optional[bytes] = None):
+        capacity = max(capacity, 1)
+        self.size = max(8, int(-capacity * math.log(error_rate) / (math.log(2) ** 2)))
+        self.hashes = max(1, round(self.size / capacity * math.log(2)))
+        self.capacity = capacity
+        self.error_rate = error_rate
+        if bits is not None and len(bits) == (self.size + 7) // 8:
+            self.bits = bytearray(bits)
+        else:
+            self.bits = bytearray((self.size + 7) // 8)
+
+    def _positions(self, fingerprint: bytes):
+        h1 = int.from_bytes(fingerprint[:8], "little")
+        h2 = int.from_bytes(fingerprint[8:16], "little") | 1
+        for i in range(self.hashes):
+            yield (h1 + i * h2) % self.size
+
+    def add(self, fingerprint: bytes):
+        for position in self._positions(fingerprint):
+            self.bits[position >> 3] |= 1 << (position & 7)
+
+    def __contains__(self, fingerprint: bytes) -> bool:
+        return all(self.bits[position >> 3] & (1 << (position & 7)) for position in self._positions(fingerprint))
+
+
+class _FingerprintView:
+    """
+    Sequence view over a buffer of sorted fixed-width fingerprints, for bisect.
+    """
+
+    def __init__(self, buffer):
+        self.buffer = buffer
+
+    def __len__(self) -> int:
+        return len(self.buffer) // FINGERPRINT_SIZE
+
+    def __getitem__(self, i: int) -> bytes:
+        return self.buffer[i * FINGERPRINT_SIZE:(i + 1) * FINGERPRINT_SIZE]
+
+
+class RevokedKeyIndex:
+    """
+    Persistent index of fingerprints of keys known to be revoked.
+    New entries are kept in memory until save() merges them into the store.
+    """
+
+    def __init__(self, path: str = DEFAULT_INDEX_PATH, capacity: int = 100_000):
+        self.path = path
+        self.bloom_path = path + ".bloom"
+        self._pending = set()
+        self._store: Optional[mmap.mmap] = None
+        self._store_file = None
+        self._count = 0
+
+        if os.path.exists(path) and os.path.getsize(path) >= FINGERPRINT_SIZE:
+            self._store_file = open(path, "rb")
+            self._store = mmap.mmap(self._store_file.fileno(), 0, access=mmap.ACCESS_READ)
+            self._count = len(self._store) // FINGERPRINT_SIZE
+
+        # Size the filter for growth; rebuild it if the saved one is missing or too small
+        capacity = max(capacity, self._count * 2)
+        bits = None
+        if os.path.exists(self.bloom_path):
+            with open(self.bloom_path, "rb") as f:
+                bits = f.read()
+        self.bloom = BloomFilter(capacity, bits=bits)
+        if bits is None or len(bits) != len(self.bloom.bits):
+            for fingerprint in self._iter_store():
+                self.bloom.add(fingerprint)
+
+    def __len__(self) -> int:
+        return self._count + len(self._pending)
+
+    def _iter_store(self):
+        for i in range(self._count):
+            yield self._store[i * FINGERPRINT_SIZE:(i + 1) * FINGERPRINT_SIZE]
+
+    def _store_contains(self, fingerprint: bytes) -> bool:
+        if not self._count:
+            return False
+        view = _FingerprintView(self._store)
+        i = bisect.bisect_left(view, fingerprint)
+        return i < len(view) and view[i] == fingerprint
+
+    def __contains__(self, fingerprint: bytes) -> bool:
+        if fingerprint not in self.bloom:
+            return False
+        return fingerprint in self._pending or self._store_contains(fingerprint)
+
+    def add(self, fingerprint: bytes):
+        """
+        Record a revoked key's fingerprint.
+        """
+        if fingerprint not in self:
+            self._pending.add(fingerprint)
+            self.bloom.add(fingerprint)
+
+    def update(self, fingerprints: Iterable[bytes]):
+        """
+        Record several revoked keys' fingerprints.
+        """
+        for fingerprint in fingerprints:
+            self.add(fingerprint)
+
+    def save(self):
+        """
+        Merge pending fingerprints into the sorted store and write the filter.
+        Files are replaced atomically so a crash never leaves a torn index.
+        """
+        if not self._pending and os.path.exists(self.bloom_path):
+            return
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+
+        merged = sorted(set(self._iter_store()) | self._pending)
+        tmp_path = self.path + ".tmp"
+        with open(tmp_path, "wb") as f:
+            for fingerprint in merged:
+                f.write(fingerprint)
+            f.flush()
+            os.fsync(f.fileno())
+        self.close()
+        self._count = 0
+        os.replace(tmp_path, self.path)
+
+        tmp_path = self.bloom_path + ".tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(self.bloom.bits)
+        os.replace(tmp_path, self.bloom_path)
+
+        self._pending = set()
+        if merged:
+            self._store_file = open(self.path, "rb")
+            self._store = mmap.mmap(self._store_file.fileno(), 0, access=mmap.ACCESS_READ)
+        self._count = len(merged)
+
+    def close(self):
+        """
+        Release the memory map of the store.
+        """
+        if self._store is not None:
+            self._store.close()
+            self._store = None
+        if self._store_file is not None:
+            self._store_file.close()
+            self._store_file = None
@@ -0,0 +1,142 @@
+"""
+Probe planning for a single test run.
+
+Several checks in a run need the very same upstream request: the quota
+check in get_usage_stats is a gpt-3.5-turbo chat completion, which is also
+the model probe for gpt-3.5-turbo. The planner merges equivalent requests
+and the ProbeCache lets later checks reuse the outcome of earlier ones.
+"""
+import time
+from typing import Any, Callable, Dict, Hashable, Iterable, List, NamedTuple, Optional, Tuple
+from .errors import FailFast
+
+# Model used by the status check to find out whether quota is available
+STATUS_PROBE_MODEL = "gpt-3.5-turbo"
+
+# Consumer name used in plans for the status check
+STATUS_CHECK = "status"
+
+# Model id prefixes that need a non-chat request shape
+IMAGE_PREFIXES = ("dall-e-",)
+EMBEDDING_PREFIXES = ("text-embedding-",)
+
+# Probe kinds that can be checked with a streamed request
+STREAMABLE_KINDS = {"chat", "vision"}
+
+
+class ProbeOutcome(NamedTuple):
+    """Result of one upstream request: either a response or the error it raised."""
+    response: Any
+    error: Optional[BaseException]
+    elapsed: float
+
+
+def probe_kind(model: str) -> str:
+    """
+    Return the kind of request used to probe a model.
+    One of 'image', 'embedding', 'vision' or 'chat'.
+    """
+    if model.startswith(IMAGE_PREFIXES):
+        return "image"
+    if model.startswith(EMBEDDING_PREFIXES):
+        return "embedding"
+    if "-vision" in model:
+        return "vision"
+    return "chat"
+
+
+def probe_signature(model: str, stream: bool = False) -> Tuple[str, ...]:
+    """
+    Return a hashable signature of the request used to probe a model.
+    Two checks with the same signature send identical requests.
+    """
+    kind = probe_kind(model)
+    if stream and kind in STREAMABLE_KINDS:
+        return (kind, model, "stream")
+    return (kind, model)
+
+
+def plan_openai_probes(
+    models: Iterable[str],
+    include_status: bool = True,
+    stream: bool = False
+) -> Dict[Tuple[str, ...], List[str]]:
+    """
+    Build the set of requests needed for a run.
+    Returns an ordered mapping of request signature to the checks it answers.
+    """
+    plan: Dict[Tuple[str, ...], List[str]] = {}
+    if include_status:
+        plan.setdefault(probe_signature(STATUS_PROBE_MODEL, stream), []).append(STATUS_CHECK)
+    for model in models:
+        plan.setdefault(probe_signature(model, stream), []).append(model)
+    return plan
+
+
+def format_plan_summary(plan: Dict[Tuple[str, ...], List[str]]) -> str:
+    """
+    Format a probe plan into a one-line summary.
+    """
+    checks = sum(len(consumers) for consumers in plan.values())
+    merged = checks - len(plan)
+    return f"ℹ️ Planned {len(plan)} requests for {checks} checks ({merged} merged)"
+
+
+class ProbeCache:
+    """
+    Memoises probe outcomes by request signature for the duration of a run.
+    Errors are cached as well and re-raised to every check that shares them.
+    A terminal error cancels every request that has not been sent yet.
+    With stream=True, chat probes are streamed and closed after the first chunk.
+    With a budget, model probes that would not fit are refused before sending
+    and the usage of the ones sent is charged to it.
+    """
+
+    def __init__(self, fail_fast: Optional[FailFast] = None, stream: bool = False, budget=None):
+        self._outcomes: Dict[Hashable, ProbeOutcome] = {}
+        self.fail_fast = fail_fast if fail_fast is not None else FailFast()
+        self.stream = stream
+        self.budget = budget
+        self.sent = 0
+        self.reused = 0
+
+    def run(self, signature: Hashable, send: Callable[[], Any], model: Optional[str] = None) -> Any:
+        """
+        Return the response for a signature, sending the request only once.
+        Raises ProbeCancelled if the run was cancelled by a terminal error,
+        and BudgetExceeded if the probe for model does not fit the budget.
+        """
+        outcome = self._outcomes.get(signature)
+        if outcome is None:
+            self.fail_fast.check()
+            metered = self.budget is not None and model is not None
+            if metered:
+                self.budget.check(model)
+            start = time.perf_counter()
+            try:
+                outcome = ProbeOutcome(send(), None, time.perf_counter() - start)
+                if metered:
+                    self.budget.charge(model, outcome.response)
+            except Exception as e:
+                outcome = ProbeOutcome(None, e, time.perf_counter() - start)
+                self.fail_fast.record(e)
+            self._outcomes[signature] = outcome
+            self.sent += 1
+        else:
+            self.reused += 1
+
+        if outcome.error is not None:
+            raise outcome.error
+        return outcome.response
+
+    def outcome(self, signature: Hashable) -> Optional[ProbeOutcome]:
+        """
+        Return the cached outcome for a signature, if any.
+        """
+        return self._outcomes.get(signature)
+
+    def summary(self) -> str:
+        """
+        Format request counters into a one-line summary.
+        """
+        return f"ℹ️ {self.sent} requests sent, {self.reused} reused from earlier checks"
@@ -0,0 +1,138 @@
+"""
+Built-in profiling of a run.
+
+Wraps a run in cProfile and tracemalloc and writes a report with the
+hotspots by own time, the top allocation sites and the wall time split
+into CPU time and time spent waiting on the network. Network time is the
+time the profiled thread spent inside socket and TLS calls, so it answers
+"is it us or the server" without attaching an external profiler. Raw
+profile data is saved next to the report for tools such as snakeviz.
+"""
+import cProfile
+import io
+import os
+import pstats
+import time
+import tracemalloc
+from datetime import datetime
+from typing import Dict, Optional
+from .defaults import DEFAULT_PROFILE_DIR
+
+# Frames kept per allocation traceback
+TRACE_FRAMES = 10
+
+# Built-in functions in which the process waits on the network
+NETWORK_CALLS = (
+    "recv", "recv_into", "recvfrom", "send", "sendall", "connect", "connect_ex", "read", "write",
+    "do_handshake", "getaddrinfo", "gethostbyname", "select", "poll",
+)
+NETWORK_MODULES = ("_socket", "_ssl", "select", "selectors")
+
+
+def _is_network_call(func: tuple) -> bool:
+    """
+    Return True for a pstats function key of a blocking socket or TLS call.
+    """
+    filename, _, name = func
+    if filename != "~":
+        return False
+    # Built-ins show up as "<method 'recv_into' of '_socket.socket' objects>"
+    # or "<built-in method _socket.getaddrinfo>"
+    return any(f"'{call}'" in name or f".{call}>" in name for call in NETWORK_CALLS) and \
+        any(module in name for module in NETWORK_MODULES)
+
+
+class RunProfiler:
+    """
+    Context manager that profiles CPU time and allocations of the code it wraps.
+    Only the entering thread is profiled by cProfile; CPU time covers the
+    whole process.
+    """
+
+    def __init__(self, output_dir: str = DEFAULT_PROFILE_DIR, top: int = 25):
+        self.output_dir = output_dir
+        self.top = top
+        self.profile = cProfile.Profile()
+        self.report_path: Optional[str] = None
+        self.split: Dict[str, float] = {}
+
+    def __enter__(self):
+        self._was_tracing = tracemalloc.is_tracing()
+        if not self._was_tracing:
+            tracemalloc.start(TRACE_FRAMES)
+        self._wall_start = time.perf_counter()
+        self._cpu_start = time.process_time()
+        self.profile.enable()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.profile.disable()
+        wall = time.perf_counter() - self._wall_start
+        cpu = time.process_time() - self._cpu_start
+        snapshot = tracemalloc.take_snapshot()
+        current, peak = tracemalloc.get_traced_memory()
+        if not self._was_tracing:
+            tracemalloc.stop()
+
+        stats = pstats.Stats(self.profile)
+        network = sum(entry[2] for func, entry in stats.stats.items() if _is_network_call(func))
+        self.split = {
+            "wall": wall,
+            "cpu": cpu,
+            "network": min(network, wall),
+            "other": max(wall - cpu - network, 0.0),
+            "peak_bytes": peak,
+            "current_bytes": current,
+        }
+        try:
+            self.report_path = self._write(stats, snapshot)
+        except OSError as e:
+            print(f"⚠️ Could not write the profile report: {str(e)}")
+        return False
+
+    def _write(self, stats: pstats.Stats, snapshot) -> str:
+        os.makedirs(self.output_dir, exist_ok=True)
+        base = os.path.join(self.output_dir, f"profile-{datetime.now().strftime('%Y%m%d-%H%M%S')}")
+        self.profile.dump_stats(base + ".prof")
+
+        out = io.StringIO()
+        out.write(self.summary() + "\n\n")
+        out.write(f"=== Hotspots by own time (top {self.top}) ===\n")
+        stats.stream = out
+        stats.sort_stats(pstats.SortKey.TIME).print_stats(self.top)
+        out.write(f"=== Hotspots by cumulative time (top {self.top}) ===\n")
+        stats.sort_stats(pstats.SortKey.CUMULATIVE).print_stats(self.top)
+
+        out.write(f"=== Top allocation sites (top {self.top}) ===\n")
+        snapshot = snapshot.filter_traces([
+            tracemalloc.Filter(False, tracemalloc.__file__),
+            tracemalloc.Filter(False, "<frozen importlib._bootstrap>"),
+            tracemalloc.Filter(False, "<frozen importlib._bootstrap_external>"),
+        ])
+        for stat in snapshot.statistics("lineno")[:self.top]:
+            frame = stat.traceback[0]
+            out.write(f"{stat.size / 1024:10.1f} KiB {stat.count:8} blocks  {frame.filename}:{frame.lineno}\n")
+
+        path = base + ".txt"
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(out.getvalue())
+        return path
+
+    def summary(self) -> str:
+        """
+        Format the time split and memory peak into a short summary.
+        """
+        split = self.split
+        if not split:
+            return "📊 Profile: not collected"
+        wall = split["wall"] or 1e-9
+        lines = [
+            f"📊 Profile: {split['wall']:.2f} s wall time",
+            f"- CPU in this process: {split['cpu']:.2f} s ({split['cpu'] / wall:.0%})",
+            f"- Waiting on the network: {split['network']:.2f} s ({split['network'] / wall:.0%})",
+            f"- Other waiting (sleeps, locks, other threads): {split['other']:.2f} s ({split['other'] / wall:.0%})",
+            f"- Peak traced memory: {split['peak_bytes'] / 1024 ** 2:.1f} MiB",
+        ]
+        if self.report_path:
+            lines.append(f"ℹ️ Report written to {self.report_path}")
+        return "\n".join(lines)
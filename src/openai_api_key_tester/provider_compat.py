@@ -0,0 +1,38 @@
+"""
+OpenAI-compatible provider: checks any server that speaks the OpenAI API,
+such as vLLM, LiteLLM, LocalAI or an in-house gateway.
+
+The target is the server's base URL (for example http://gpu01:8000/v1).
+The key, if the server needs one, is read from OPENAI_COMPATIBLE_API_KEY.
+"""
+import os
+from functools import lru_cache
+from typing import List, Tuple
+from openai import OpenAI
+from .api_key_tester import test_model
+from .providers import Provider
+
+# Placeholder sent to servers that do not check keys; the SDK requires one
+NO_KEY = "not-needed"
+
+
+@lru_cache(maxsize=None)
+def _client(base_url: str) -> OpenAI:
+    return OpenAI(base_url=base_url, api_key=os.getenv("OPENAI_COMPATIBLE_API_KEY") or NO_KEY)
+
+
+def catalog(base_url: str) -> List[str]:
+    """
+    Return the models the server lists under /models.
+    """
+    return sorted(model.id for model in _client(base_url).models.list())
+
+
+def probe(base_url: str, model: str) -> Tuple[bool, str]:
+    """
+    Check one model with the cheapest request for its kind.
+    """
+    return test_model(_client(base_url), model)
+
+
+PROVIDER = Provider("openai-compatible", catalog, probe)
@@ -0,0 +1,210 @@
+"""
+Registry of the providers the tester can check.
+
+A provider bundles the probes and the catalog function for one kind of
+endpoint: the OpenAI API, an Ollama server, or any server speaking the
+OpenAI API. Built-in providers are listed here by module path and other
+packages can add their own through the 'openai_api_key_tester.providers'
+entry point group. Listing providers reads only package metadata; a
+provider's module is imported when a target for it is configured.
+"""
+import importlib
+import os
+import sys
+import time
+from typing import Callable, Dict, Iterator, List, Mapping, NamedTuple, Optional, Tuple
+from .tracing import span
+
+ENTRY_POINT_GROUP = "openai_api_key_tester.providers"
+
+# Environment variable prefix for targets of plug-in providers
+TARGET_ENV_PREFIX = "OPENAI_KEY_TESTER_TARGET_"
+
+
+class Provider(NamedTuple):
+    """
+    What a provider module exposes, usually as a module-level PROVIDER.
+    catalog(target) lists the models to check and probe(target, model)
+    checks one of them, returning (success, message). A provider with a
+    richer command-line flow sets run(target, args, recorder) instead of
+    relying on the generic catalog-then-probe loop.
+    """
+    name: str
+    catalog: Callable[[str], List[str]]
+    probe: Callable[[str, str], Tuple[bool, str]]
+    run: Optional[Callable] = None
+
+
+class ProviderSpec(NamedTuple):
+    """
+    Registry entry of a provider that has not necessarily been imported.
+    """
+    name: str
+    # 'module:attribute'; built-in modules are relative to this package
+    reference: str
+    # Environment variable holding the target, if the provider has one
+    env_var: Optional[str] = None
+    default_target: Optional[str] = None
+    # Printed when no target is configured; None to stay silent
+    missing_message: Optional[str] = None
+
+
+BUILTIN_PROVIDERS = [
+    ProviderSpec(
+        "openai", ".provider_openai:PROVIDER", "OPENAI_API_KEY",
+        missing_message="ℹ️ OpenAI API key not provided, skipping OpenAI tests."
+    ),
+    ProviderSpec(
+        "ollama", ".provider_ollama:PROVIDER", "OLLAMA_API_URL", "http://localhost:11434"
+    ),
+    ProviderSpec(
+        "openai-compatible", ".provider_compat:PROVIDER", "OPENAI_COMPATIBLE_BASE_URL"
+    ),
+]
+
+
+def _entry_points() -> List:
+    """
+    Return the provider entry points of installed packages, without loading them.
+    """
+    from importlib import metadata
+    if sys.version_info >= (3, 10):
+        return list(metadata.entry_points(group=ENTRY_POINT_GROUP))
+    return list(metadata.entry_points().get(ENTRY_POINT_GROUP, []))
+
+
+def available_providers() -> Dict[str, ProviderSpec]:
+    """
+    Return every known provider by name, built-in ones first.
+    A plug-in cannot replace a built-in provider of the same name.
+    """
+    providers = {spec.name: spec for spec in BUILTIN_PROVIDERS}
+    for entry_point in _entry_points():
+        if entry_point.name not in providers:
+            providers[entry_point.name] = ProviderSpec(
+                entry_point.name,
+                entry_point.value,
+                TARGET_ENV_PREFIX + entry_point.name.upper().replace("-", "_")
+            )
+    return providers
+
+
+_loaded: Dict[str, Provider] = {}
+
+
+def load_provider(spec: ProviderSpec) -> Provider:
+    """
+    Import a provider's module and return its Provider, once per process.
+    """
+    if spec.name not in _loaded:
+        module_name, _, attribute = spec.reference.partition(":")
+        module = importlib.import_module(module_name, __package__)
+        provider = getattr(module, attribute or "PROVIDER")
+        if not isinstance(provider, Provider):
+            # Plug-ins may point at a factory instead of a ready Provider
+            provider = provider()
+        _loaded[spec.name] = provider
+    return _loaded[spec.name]
+
+
+def parse_target(value: str) -> Tuple[str, str]:
+    """
+    Parse a NAME=TARGET command-line option.
+    """
+    import argparse
+    name, sep, target = value.partition("=")
+    if not sep or not name or not target:
+        raise argparse.ArgumentTypeError(f"expected NAME=TARGET, got '{value}'")
+    return name, target
+
+
+def configured_targets(
+    providers: Dict[str, ProviderSpec],
+    explicit: Optional[List[Tuple[str, str]]] = None,
+    environ: Optional[Mapping[str, str]] = None
+) -> Iterator[Tuple[ProviderSpec, Optional[str]]]:
+    """
+    Yield each provider with its configured target, or None when it has none.
+    Targets given on the command line come first and replace the
+    environment for that provider.
+    """
+    if environ is None:
+        environ = os.environ
+    explicit_targets: Dict[str, List[str]] = {}
+    for name, target in explicit or []:
+        if name not in providers:
+            raise ValueError(f"unknown provider '{name}' (available: {', '.join(providers)})")
+        explicit_targets.setdefault(name, []).append(target)
+
+    for name, spec in providers.items():
+        if name in explicit_targets:
+            for target in explicit_targets[name]:
+                yield spec, target
+        elif spec.env_var is not None:
+            yield spec, environ.get(spec.env_var, spec.default_target) or None
+        else:
+            yield spec, None
+
+
+def run_generic(provider: Provider, target: str, args, recorder=None):
+    """
+    Command-line flow for providers without a run function of their own:
+    list the target's models and probe each of them.
+    """
+    print(f"\nTesting {provider.name} at {target}...")
+    try:
+        models = provider.catalog(target)
+    except Exception as e:
+        print(f"❌ Could not list models: {str(e)}")
+        return
+    print(f"ℹ️ {len(models)} models listed\n")
+    for model in models:
+        start = time.perf_counter()
+        success, message = provider.probe(target, model)
+        print(message)
+        if recorder is not None:
+            recorder.record(
+                provider.name, target, model, success, "ok" if success else "failed",
+                message, (time.perf_counter() - start) * 1000
+            )
+
+
+def run_provider(spec: ProviderSpec, target: Optional[str], args, recorder=None):
+    """
+    Run the command-line checks of one provider against a target.
+    """
+    if target is None:
+        if spec.missing_message:
+            print(spec.missing_message)
+        return
+    try:
+        provider = load_provider(spec)
+    except Exception as e:
+        print(f"\n❌ Could not load provider {spec.name}: {str(e)}")
+        return
+    with span(f"provider {spec.name}", provider=spec.name):
+        if provider.run is not None:
+            provider.run(target, args, recorder)
+        else:
+            run_generic(provider, target, args, recorder)
+
+
+def format_provider_list(providers: Dict[str, ProviderSpec], environ: Optional[Mapping[str, str]] = None) -> str:
+    """
+    Format the known providers and how their targets are configured.
+    """
+    if environ is None:
+        environ = os.environ
+    lines = ["📊 Providers:"]
+    for spec in providers.values():
+        origin = "built-in" if spec.reference.startswith(".") else spec.reference
+        if spec.env_var is None:
+            source = "--target only"
+        elif environ.get(spec.env_var):
+            source = f"{spec.env_var} is set"
+        elif spec.default_target:
+            source = f"{spec.env_var} (default {spec.default_target})"
+        else:
+            source = f"{spec.env_var} not set"
+        lines.append(f"- {spec.name} ({origin}): {source}")
+    return "\n".join(lines)
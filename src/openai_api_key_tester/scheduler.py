@@ -0,0 +1,189 @@
+"""
+Priority scheduling of probes across classes of work.
+
+Probes are tagged with a class: interactive (a person is waiting),
+scheduled (monitoring and CI) or bulk. Each class has its own queue and
+a number of reserved slots that no other class may use, so an interactive
+check always finds a free slot however much background work is queued.
+The remaining shared slots are handed out by weighted fair queuing: each
+class advances a virtual clock by 1/weight per probe started and the
+eligible class with the earliest clock goes next, so bulk work keeps
+moving but cannot crowd out the others.
+"""
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Callable, Deque, Dict, Hashable, List, Optional
+from .defaults import BULK, INTERACTIVE, PRIORITY_CLASSES, SCHEDULED
+
+DEFAULT_WEIGHTS = {INTERACTIVE: 8, SCHEDULED: 3, BULK: 1}
+DEFAULT_RESERVED = {INTERACTIVE: 2, SCHEDULED: 1, BULK: 0}
+
+
+class _Job:
+    __slots__ = ("cls", "func", "future", "key", "queued_at")
+
+    def __init__(self, cls: str, func: Callable[[], Any], key: Optional[Hashable]):
+        self.cls = cls
+        self.func = func
+        self.future = Future()
+        self.key = key
+        self.queued_at = time.monotonic()
+
+
+class PriorityScheduler:
+    """
+    Runs probe functions on a fixed number of slots, by priority class.
+    """
+
+    def __init__(
+        self,
+        slots: int = 16,
+        weights: Optional[Dict[str, int]] = None,
+        reserved: Optional[Dict[str, int]] = None
+    ):
+        self.weights = dict(DEFAULT_WEIGHTS, **(weights or {}))
+        self.reserved = dict(DEFAULT_RESERVED, **(reserved or {}))
+        if sum(self.reserved.values()) > slots:
+            raise ValueError(f"{sum(self.reserved.values())} reserved slots do not fit in {slots} slots")
+        self.slots = slots
+        self.shared = slots - sum(self.reserved.values())
+
+        self._lock = threading.Lock()
+        self._queues: Dict[str, Deque[_Job]] = {cls: deque() for cls in PRIORITY_CLASSES}
+        self._running = {cls: 0 for cls in PRIORITY_CLASSES}
+        self._shared_in_use = 0
+        self._clock = {cls: 0.0 for cls in PRIORITY_CLASSES}
+        self._completed = {cls: 0 for cls in PRIORITY_CLASSES}
+        self._waited = {cls: 0.0 for cls in PRIORITY_CLASSES}
+        self._executor = ThreadPoolExecutor(max_workers=slots, thread_name_prefix="probe")
+
+    def submit(self, cls: str, func: Callable[[], Any], key: Optional[Hashable] = None) -> Future:
+        """
+        Queue a function in a priority class and return its future.
+        A key lets a later caller promote the job with promote().
+        """
+        if cls not in self._queues:
+            raise ValueError(f"unknown priority class '{cls}' (expected one of {', '.join(PRIORITY_CLASSES)})")
+        job = _Job(cls, func, key)
+        with self._lock:
+            queue = self._queues[cls]
+            if not queue and not self._running[cls]:
+                # A class returning from idle starts at the current virtual time,
+                # so it gets no credit for the time it was not competing
+                busy = [self._clock[c] for c in PRIORITY_CLASSES if self._queues[c] or self._running[c]]
+                self._clock[cls] = max(self._clock[cls], min(busy, default=0.0))
+            queue.append(job)
+            self._dispatch()
+        return job.future
+
+    def run(self, cls: str, func: Callable[[], Any], key: Optional[Hashable] = None) -> Any:
+        """
+        Queue a function in a priority class and wait for its result.
+        """
+        return self.submit(cls, func, key).result()
+
+    def promote(self, key: Hashable, cls: str) -> bool:
+        """
+        Move a queued job to a more urgent class, e.g. when an interactive
+        request joins a bulk probe that has not started yet.
+        Returns True if a job was moved.
+        """
+        with self._lock:
+            rank = PRIORITY_CLASSES.index(cls)
+            for current in PRIORITY_CLASSES[rank + 1:]:
+                for job in self._queues[current]:
+                    if job.key == key:
+                        self._queues[current].remove(job)
+                        job.cls = cls
+                        self._queues[cls].append(job)
+                        self._dispatch()
+                        return True
+        return False
+
+    def _eligible(self, cls: str) -> bool:
+        return self._running[cls] < self.reserved[cls] or self._shared_in_use < self.shared
+
+    def _dispatch(self):
+        """
+        Start queued jobs while slots are free. Must hold the lock.
+        """
+        while True:
+            candidates = [cls for cls in PRIORITY_CLASSES if self._queues[cls] and self._eligible(cls)]
+            if not candidates:
+                return
+            # Earliest virtual clock first; ties go to the more urgent class
+            cls = min(candidates, key=lambda c: (self._clock[c], PRIORITY_CLASSES.index(c)))
+            job = self._queues[cls].popleft()
+            uses_shared = self._running[cls] >= self.reserved[cls]
+            self._running[cls] += 1
+            if uses_shared:
+                self._shared_in_use += 1
+            self._clock[cls] += 1.0 / self.weights[cls]
+            self._waited[cls] += time.monotonic() - job.queued_at
+            self._executor.submit(self._execute, job, uses_shared)
+
+    def _execute(self, job: _Job, uses_shared: bool):
+        try:
+            result = job.func()
+        except BaseException as e:
+            job.future.set_exception(e)
+        else:
+            job.future.set_result(result)
+        finally:
+            with self._lock:
+                self._running[job.cls] -= 1
+                if uses_shared:
+                    self._shared_in_use -= 1
+                self._completed[job.cls] += 1
+                self._dispatch()
+
+    def stats(self) -> Dict[str, Dict]:
+        """
+        Return queued, running and completed jobs and the mean queue wait per class.
+        """
+        with self._lock:
+            return {
+                cls: {
+                    "queued": len(self._queues[cls]),
+                    "running": self._running[cls],
+                    "completed": self._completed[cls],
+                    "mean_wait_ms": round(self._waited[cls] / self._completed[cls] * 1000, 1)
+                    if self._completed[cls] else None
+                }
+                for cls in PRIORITY_CLASSES
+            }
+
+    def shutdown(self):
+        self._executor.shutdown(wait=False)
+
+
+def parse_reservations(value: str) -> Dict[str, int]:
+    """
+    Parse reserved slots such as 'interactive=2,scheduled=1'.
+    """
+    import argparse
+    reserved: Dict[str, int] = {}
+    for part in value.split(","):
+        name, _, count = part.strip().partition("=")
+        if name not in PRIORITY_CLASSES or not count.isdigit():
+            raise argparse.ArgumentTypeError(
+                f"expected CLASS=N pairs with classes {', '.join(PRIORITY_CLASSES)}, got '{value}'"
+            )
+        reserved[name] = int(count)
+    return reserved
+
+
+def format_scheduler_stats(stats: Dict[str, Dict]) -> List[str]:
+    """
+    Format scheduler statistics into one line per class.
+    """
+    lines = []
+    for cls, entry in stats.items():
+        wait = f"{entry['mean_wait_ms']:.1f} ms" if entry["mean_wait_ms"] is not None else "-"
+        lines.append(
+            f"- {cls}: {entry['completed']} completed, {entry['running']} running, "
+            f"{entry['queued']} queued, mean wait {wait}"
+        )
+    return lines
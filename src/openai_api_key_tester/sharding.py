@@ -0,0 +1,72 @@
+"""
+Sharded execution of work items across a process pool.
+
+Input is cut into chunks that are handed to worker processes, each with its
+own connection pool. Results come back in input order with only a bounded
+number of chunks in flight, so output streams as soon as the head of the
+input is done and memory stays proportional to the number of workers.
+"""
+from collections import deque
+from concurrent.futures import Executor, ProcessPoolExecutor
+from typing import Callable, Iterable, Iterator, List, Optional, TypeVar
+
+T = TypeVar("T")
+R = TypeVar("R")
+
+
+def chunked(items: Iterable[T], size: int) -> Iterator[List[T]]:
+    """
+    Yield lists of up to size consecutive items.
+    """
+    chunk = []
+    for item in items:
+        chunk.append(item)
+        if len(chunk) >= size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def ordered_map(
+    executor: Executor,
+    func: Callable[[T], R],
+    items: Iterable[T],
+    max_in_flight: int
+) -> Iterator[R]:
+    """
+    Like Executor.map, but consumes items lazily and keeps at most
+    max_in_flight calls pending. Results are yielded in input order.
+    """
+    pending = deque()
+    for item in items:
+        pending.append(executor.submit(func, item))
+        if len(pending) >= max_in_flight:
+            yield pending.popleft().result()
+    while pending:
+        yield pending.popleft().result()
+
+
+def sharded_map(
+    func: Callable[[List[T]], List[R]],
+    items: Iterable[T],
+    workers: int,
+    chunk_size: int = 64,
+    initializer: Optional[Callable[[], None]] = None
+) -> Iterator[R]:
+    """
+    Apply a chunk function to items across a pool of worker processes.
+    func receives a list of items and must return a list of results of the
+    same length; results are yielded one by one in input order.
+    With workers <= 1 everything runs in the current process, one item at a time.
+    """
+    if workers <= 1:
+        if initializer is not None:
+            initializer()
+        for item in items:
+            yield from func([item])
+        return
+
+    with ProcessPoolExecutor(max_workers=workers, initializer=initializer) as executor:
+        for results in ordered_map(executor, func, chunked(items, chunk_size), workers * 2):
+            yield from results
@@ -0,0 +1,102 @@
+"""
+Constant-memory input streaming for bulk runs.
+
+Large key or host files are memory-mapped and split into lines lazily, and
+pages that have been consumed are released again, so reading a file of ten
+million lines costs no more memory than reading a thousand. Stages of a
+pipeline are decoupled by bounded queues: a slow stage makes the ones in
+front of it wait instead of letting work pile up in memory.
+"""
+import mmap
+import os
+import queue
+import sys
+import threading
+from typing import Iterable, Iterator, TypeVar
+
+T = TypeVar("T")
+
+# Release consumed pages of a mapped file after this many bytes
+RELEASE_EVERY = 64 * 1024 * 1024
+
+DEFAULT_QUEUE_SIZE = 1024
+
+_DONE = object()
+
+
+def iter_file_lines(path: str) -> Iterator[str]:
+    """
+    Yield the lines of a file without loading it, or of stdin for '-'.
+    """
+    if path == "-":
+        for line in sys.stdin:
+            yield line.rstrip("\n")
+        return
+
+    with open(path, "rb") as f:
+        size = os.fstat(f.fileno()).st_size
+        if size == 0:
+            return
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+            if hasattr(mapped, "madvise"):
+                mapped.madvise(mmap.MADV_SEQUENTIAL)
+            start = 0
+            released = 0
+            while start < size:
+                end = mapped.find(b"\n", start)
+                if end == -1:
+                    end = size
+                yield mapped[start:end].decode("utf-8", errors="replace")
+                start = end + 1
+
+                # Drop pages already read so resident memory stays flat
+                if hasattr(mapped, "madvise") and start - released >= RELEASE_EVERY:
+                    boundary = start - start % mmap.PAGESIZE
+                    mapped.madvise(mmap.MADV_DONTNEED, released, boundary - released)
+                    released = boundary
+
+
+def prefetch(items: Iterable[T], maxsize: int = DEFAULT_QUEUE_SIZE) -> Iterator[T]:
+    """
+    Run an iterable in a background thread, handing items over through a
+    bounded queue. Exceptions raised by the iterable are re-raised here;
+    closing the returned generator stops the background thread.
+    """
+    handoff = queue.Queue(maxsize=maxsize)
+    stop = threading.Event()
+
+    def put(item) -> bool:
+        while not stop.is_set():
+            try:
+                handoff.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def produce():
+        try:
+            for item in items:
+                if not put((item, None)):
+                    # Let a generator upstream run its cleanup, such as closing its own prefetch thread
+                    close = getattr(items, "close", None)
+                    if close is not None:
+                        close()
+                    return
+            put((_DONE, None))
+        except BaseException as e:
+            put((_DONE, e))
+
+    thread = threading.Thread(target=produce, daemon=True)
+    thread.start()
+    try:
+        while True:
+            item, error = handoff.get()
+            if item is _DONE:
+                if error is not None:
+                    raise error
+                return
+            yield item
+    finally:
+        stop.set()
+        thread.join()
@@ -0,0 +1,447 @@
+"""
+Tracing of runs as OpenTelemetry-style spans.
+
+A traced run is one trace: a run span holds a span per provider, which
+holds a span per probe, which holds a span per HTTP attempt. Probe spans
+carry the model, status, retries and latency; HTTP spans follow the
+OpenTelemetry HTTP conventions. Finished traces are exported as OTLP/JSON,
+appended to a file (one export request per line, as the OpenTelemetry
+file exporter writes them) or posted to a collector's /v1/traces endpoint,
+so a run can be opened in any tracing UI that reads OTLP.
+
+Spans are kept in memory until the trace ends, so sampling can keep every
+trace with an error besides the sampled fraction of the rest. Nothing here
+needs the OpenTelemetry SDK.
+"""
+import functools
+import json
+import os
+import threading
+import time
+from contextvars import ContextVar
+from typing import Any, Callable, Dict, List, Optional
+from urllib.parse import urlsplit
+import requests
+
+SERVICE_NAME = "openai-api-key-tester"
+SCOPE_NAME = "openai_api_key_tester"
+
+# OTLP span kinds and status codes
+KIND_INTERNAL = 1
+KIND_CLIENT = 3
+STATUS_UNSET = 0
+STATUS_OK = 1
+STATUS_ERROR = 2
+
+# Header the OpenAI SDK sets on every attempt with the retries taken so far
+RETRY_COUNT_HEADER = "x-stainless-retry-count"
+
+_tracer: ContextVar[Optional["Tracer"]] = ContextVar("tracer", default=None)
+_current: ContextVar[Optional["Span"]] = ContextVar("span", default=None)
+
+
+def _new_id(size: int) -> str:
+    return os.urandom(size).hex()
+
+
+class Span:
+    """
+    One timed operation of a trace.
+    """
+    __slots__ = (
+        "trace_id", "span_id", "parent_id", "name", "kind",
+        "start_ns", "end_ns", "attributes", "events", "status", "status_message"
+    )
+
+    def __init__(self, name: str, trace_id: str, parent_id: Optional[str], kind: int = KIND_INTERNAL):
+        self.trace_id = trace_id
+        self.span_id = _new_id(8)
+        self.parent_id = parent_id
+        self.name = name
+        self.kind = kind
+        self.start_ns = time.time_ns()
+        self.end_ns: Optional[int] = None
+        self.attributes: Dict[str, Any] = {}
+        self.events: List[Dict] = []
+        self.status = STATUS_UNSET
+        self.status_message = ""
+
+    def set(self, key: str, value: Any):
+        self.attributes[key] = value
+
+    def set_status(self, ok: bool, message: str = ""):
+        self.status = STATUS_OK if ok else STATUS_ERROR
+        self.status_message = "" if ok else message
+
+    def record_exception(self, error: BaseException):
+        self.events.append({
+            "name": "exception",
+            "time_ns": time.time_ns(),
+            "attributes": {"exception.type": type(error).__name__, "exception.message": str(error)},
+        })
+        self.set_status(False, str(error))
+
+
+class _NoopSpan:
+    """
+    Stands in for a span when no trace is being recorded.
+    """
+
+    def set(self, key: str, value: Any):
+        pass
+
+    def set_status(self, ok: bool, message: str = ""):
+        pass
+
+    def record_exception(self, error: BaseException):
+        pass
+
+
+_NOOP = _NoopSpan()
+
+
+class _SpanScope:
+    """
+    Context manager that makes a span current and ends it on exit.
+    """
+
+    def __init__(self, tracer: "Tracer", span: Span):
+        self.tracer = tracer
+        self.span = span
+
+    def __enter__(self) -> Span:
+        self._token = _current.set(self.span)
+        return self.span
+
+    def __exit__(self, exc_type, exc, tb):
+        _current.reset(self._token)
+        if exc is not None:
+            self.span.record_exception(exc)
+        self.span.end_ns = time.time_ns()
+        self.tracer._finish(self.span)
+        return False
+
+
+class _NoopScope:
+    def __enter__(self) -> _NoopSpan:
+        return _NOOP
+
+    def __exit__(self, exc_type, exc, tb):
+        return False
+
+
+class FileExporter:
+    """
+    Appends each trace to a file as one OTLP/JSON export request per line.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+
+    def export(self, payload: Dict):
+        directory = os.path.dirname(os.path.abspath(self.path))
+        os.makedirs(directory, exist_ok=True)
+        with open(self.path, "a", encoding="utf-8") as f:
+            f.write(json.dumps(payload, separators=(",", ":")) + "\n")
+
+    def describe(self) -> str:
+        return self.path
+
+
+class CollectorExporter:
+    """
+    Posts each trace to an OTLP/HTTP collector as JSON.
+    """
+
+    def __init__(self, endpoint: str, timeout: float = 10.0):
+        endpoint = endpoint.rstrip("/")
+        if not endpoint.endswith("/v1/traces"):
+            endpoint += "/v1/traces"
+        self.endpoint = endpoint
+        self.timeout = timeout
+
+    def export(self, payload: Dict):
+        response = requests.post(self.endpoint, json=payload, timeout=self.timeout)
+        response.raise_for_status()
+
+    def describe(self) -> str:
+        return self.endpoint
+
+
+def make_exporter(destination: str):
+    """
+    Return a collector exporter for an http(s) URL and a file exporter otherwise.
+    """
+    if destination.startswith(("http://", "https://")):
+        return CollectorExporter(destination)
+    return FileExporter(os.path.expanduser(destination))
+
+
+def _otlp_value(value: Any) -> Dict:
+    if isinstance(value, bool):
+        return {"boolValue": value}
+    if isinstance(value, int):
+        # int64 values are strings in the protobuf JSON mapping
+        return {"intValue": str(value)}
+    if isinstance(value, float):
+        return {"doubleValue": value}
+    return {"stringValue": str(value)}
+
+
+def _otlp_attributes(attributes: Dict[str, Any]) -> List[Dict]:
+    return [{"key": key, "value": _otlp_value(value)} for key, value in attributes.items() if value is not None]
+
+
+def _otlp_span(span: Span) -> Dict:
+    entry = {
+        "traceId": span.trace_id,
+        "spanId": span.span_id,
+        "name": span.name,
+        "kind": span.kind,
+        "startTimeUnixNano": str(span.start_ns),
+        "endTimeUnixNano": str(span.end_ns),
+        "attributes": _otlp_attributes(span.attributes),
+        "status": {"code": span.status},
+    }
+    if span.parent_id:
+        entry["parentSpanId"] = span.parent_id
+    if span.status_message:
+        entry["status"]["message"] = span.status_message
+    if span.events:
+        entry["events"] = [
+            {"name": event["name"], "timeUnixNano": str(event["time_ns"]),
+             "attributes": _otlp_attributes(event["attributes"])}
+            for event in span.events
+        ]
+    return entry
+
+
+class Tracer:
+    """
+    Records the spans of the code run while it is active and exports each
+    finished trace. sample_ratio is the fraction of traces kept; traces
+    with an error are kept regardless unless keep_errors is False.
+    """
+
+    def __init__(self, exporter, sample_ratio: float = 1.0, keep_errors: bool = True):
+        if not 0.0 <= sample_ratio <= 1.0:
+            raise ValueError(f"sample ratio must be between 0 and 1, got {sample_ratio}")
+        self.exporter = exporter
+        self.sample_ratio = sample_ratio
+        self.keep_errors = keep_errors
+        self._lock = threading.Lock()
+        self._pending: Dict[str, List[Span]] = {}
+        self.exported: List[str] = []
+        self.dropped = 0
+        self.errors: List[str] = []
+
+    def __enter__(self):
+        self._token = _tracer.set(self)
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        _tracer.reset(self._token)
+        return False
+
+    def span(self, name: str, kind: int = KIND_INTERNAL, **attributes) -> _SpanScope:
+        """
+        Start a span under the current one, or a new trace if there is none.
+        """
+        parent = _current.get()
+        if isinstance(parent, Span):
+            span = Span(name, parent.trace_id, parent.span_id, kind)
+        else:
+            span = Span(name, _new_id(16), None, kind)
+        span.attributes.update(attributes)
+        with self._lock:
+            self._pending.setdefault(span.trace_id, []).append(span)
+        return _SpanScope(self, span)
+
+    def record(self, name: str, start_ns: int, end_ns: int, kind: int = KIND_INTERNAL, **attributes) -> Optional[Span]:
+        """
+        Record an already finished span under the current one.
+        """
+        parent = _current.get()
+        if not isinstance(parent, Span):
+            return None
+        span = Span(name, parent.trace_id, parent.span_id, kind)
+        span.start_ns = start_ns
+        span.end_ns = end_ns
+        span.attributes.update(attributes)
+        with self._lock:
+            self._pending.setdefault(span.trace_id, []).append(span)
+        return span
+
+    def _sampled(self, trace_id: str) -> bool:
+        # Decided by the trace ID, like OpenTelemetry's TraceIdRatioBased sampler
+        return int(trace_id[16:], 16) < self.sample_ratio * 2 ** 64
+
+    def _finish(self, span: Span):
+        if span.parent_id is not None:
+            return
+        with self._lock:
+            spans = self._pending.pop(span.trace_id, [])
+        keep = self._sampled(span.trace_id) or (
+            self.keep_errors and any(s.status == STATUS_ERROR for s in spans)
+        )
+        if not keep:
+            with self._lock:
+                self.dropped += 1
+            return
+        # Exported outside the lock, so a slow collector does not hold up other traces
+        try:
+            self.exporter.export(self.payload(spans))
+        except (OSError, requests.exceptions.RequestException) as e:
+            with self._lock:
+                self.errors.append(str(e))
+            return
+        with self._lock:
+            self.exported.append(span.trace_id)
+
+    def payload(self, spans: List[Span]) -> Dict:
+        """
+        Build the OTLP/JSON export request for a list of spans.
+        """
+        from . import __version__
+        return {
+            "resourceSpans": [{
+                "resource": {"attributes": _otlp_attributes({"service.name": SERVICE_NAME})},
+                "scopeSpans": [{
+                    "scope": {"name": SCOPE_NAME, "version": __version__},
+                    "spans": [_otlp_span(s) for s in spans if s.end_ns is not None],
+                }],
+            }]
+        }
+
+    def summary(self) -> str:
+        """
+        Format what was exported into a short summary.
+        """
+        with self._lock:
+            exported, dropped, errors = list(self.exported), self.dropped, list(self.errors)
+        lines = []
+        for trace_id in exported:
+            lines.append(f"ℹ️ Trace {trace_id} written to {self.exporter.describe()}")
+        if dropped:
+            lines.append(f"ℹ️ {dropped} trace(s) not sampled")
+        for error in errors:
+            lines.append(f"⚠️ Could not export the trace: {error}")
+        return "\n".join(lines)
+
+
+def span(name: str, kind: int = KIND_INTERNAL, **attributes):
+    """
+    Start a span in the active tracer; does nothing when tracing is off.
+    """
+    tracer = _tracer.get()
+    if tracer is None:
+        return _NoopScope()
+    return tracer.span(name, kind, **attributes)
+
+
+def current_span():
+    """
+    Return the current span, or a no-op span when tracing is off.
+    """
+    if _tracer.get() is None:
+        return _NOOP
+    return _current.get() or _NOOP
+
+
+def traced_probe(func: Callable) -> Callable:
+    """
+    Decorate a probe function f(target, model, ...) -> (success, message)
+    so each call is a probe span with its model, status and latency.
+    """
+    @functools.wraps(func)
+    def wrapper(target, model, *args, **kwargs):
+        start = time.perf_counter()
+        with span(f"probe {model}", model=model) as s:
+            success, message = func(target, model, *args, **kwargs)
+            s.set("status", "ok" if success else "skipped" if message.startswith("⏭️") else "failed")
+            s.set("latency_ms", round((time.perf_counter() - start) * 1000, 1))
+            s.set_status(success, message)
+            return success, message
+    return wrapper
+
+
+def traced_status(func: Callable) -> Callable:
+    """
+    Decorate a status function returning a status dict so each call is
+    a span whose status follows the dict's.
+    """
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        with span("status check") as s:
+            result = func(*args, **kwargs)
+            s.set("status", result["status"])
+            s.set_status(result["status"] == "success", result.get("error", ""))
+            return result
+    return wrapper
+
+
+def _record_attempt(method: str, url: str, status: int, start_ns: int, end_ns: int, version: str, retries: int):
+    tracer = _tracer.get()
+    if tracer is None:
+        return
+    parts = urlsplit(url)
+    attempt = tracer.record(
+        f"HTTP {method}", start_ns, end_ns, KIND_CLIENT, **{
+            "http.request.method": method,
+            # The query is dropped in case it carries credentials
+            "url.full": f"{parts.scheme}://{parts.netloc}{parts.path}",
+            "server.address": parts.hostname,
+            "http.response.status_code": status,
+            "http.request.resend_count": retries or None,
+            "network.protocol.version": version,
+        }
+    )
+    if attempt is None:
+        return
+    if status >= 400:
+        attempt.set_status(False, f"HTTP {status}")
+    parent = _current.get()
+    if retries and isinstance(parent, Span):
+        parent.set("retries", max(parent.attributes.get("retries", 0), retries))
+
+
+def on_httpx_request(request):
+    """
+    httpx request hook: note when an attempt started.
+    """
+    if _tracer.get() is not None:
+        request.extensions["trace_start_ns"] = time.time_ns()
+
+
+def on_httpx_response(response):
+    """
+    httpx response hook: record the attempt as an HTTP span ending at the
+    response headers. Attempts that fail without a response show up as
+    retries of the next one.
+    """
+    start_ns = response.request.extensions.get("trace_start_ns")
+    if start_ns is None:
+        return
+    version = response.extensions.get("http_version", b"HTTP/1.1")
+    if isinstance(version, bytes):
+        version = version.decode("ascii", errors="replace")
+    retries = response.request.headers.get(RETRY_COUNT_HEADER, "0")
+    _record_attempt(
+        response.request.method, str(response.request.url), response.status_code,
+        start_ns, time.time_ns(), version.rpartition("/")[2], int(retries) if retries.isdigit() else 0
+    )
+
+
+def on_requests_response(response, *args, **kwargs):
+    """
+    requests response hook: record the attempt as an HTTP span ending at
+    the response headers.
+    """
+    if _tracer.get() is not None:
+        end_ns = time.time_ns()
+        start_ns = end_ns - int(response.elapsed.total_seconds() * 1e9)
+        _record_attempt(response.request.method, response.url, response.status_code, start_ns, end_ns, "1.1", 0)
+
+
+# Pass as hooks= to requests calls that should show up in traces
+REQUESTS_HOOKS = {"response": [on_requests_response]}
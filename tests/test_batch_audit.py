@@ -0,0 +1,281 @@
+import json
+import threading
+from email.parser import BytesParser
+from email.policy import default as default_policy
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+from openai.resources.files import Files
+
+from openai_api_key_tester.api_key_tester import main
+from openai_api_key_tester.batch_audit import AuditState, build_batch_files
+
+KEY = "sk-proj-" + "A" * 48
+
+# Models the stand-in server answers with model_not_found
+DENIED = {"gpt-4"}
+
+
+class _BatchAPIHandler(BaseHTTPRequestHandler):
+    """
+    Stand-in for the /v1/files and /v1/batches endpoints. Batches complete
+    after a set number of status checks; denied models get a 404 result.
+    """
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, format, *args):
+        pass
+
+    def _send(self, body, content_type="application/json"):
+        data = body if isinstance(body, bytes) else json.dumps(body).encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def _error(self, status, message, **headers):
+        data = json.dumps({"error": {"message": message, "type": "invalid_request_error"}}).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        for name, value in headers.items():
+            self.send_header(name.replace("_", "-"), value)
+        self.end_headers()
+        self.wfile.write(data)
+
+    def _body(self) -> bytes:
+        return self.rfile.read(int(self.headers.get("Content-Length") or 0))
+
+    def do_POST(self):
+        server = self.server
+        body = self._body()
+        if self.path == "/v1/files":
+            message = BytesParser(policy=default_policy).parsebytes(
+                b"Content-Type: " + self.headers["Content-Type"].encode("ascii") + b"\r\n\r\n" + body
+            )
+            content = next(
+                part.get_payload(decode=True) for part in message.iter_parts()
+                if part.get_param("name", header="content-disposition") == "file"
+            )
+            file_id = f"file-{len(server.files)}"
+            server.files[file_id] = [json.loads(line) for line in content.splitlines() if line.strip()]
+            self._send({"id": file_id, "object": "file", "bytes": len(content), "created_at": 0,
+                        "filename": "probe-audit.jsonl", "purpose": "batch", "status": "processed"})
+        elif self.path == "/v1/batches":
+            request = json.loads(body)
+            batch_id = f"batch_{len(server.batches)}"
+            server.batches[batch_id] = {"input_file_id": request["input_file_id"],
+                                        "endpoint": request["endpoint"], "checks": 0}
+            self._send(self._batch(batch_id))
+        else:
+            self.send_error(404)
+
+    def do_GET(self):
+        server = self.server
+        parts = self.path.strip("/").split("/")
+        if parts[:2] == ["v1", "batches"] and server.failures:
+            status = server.failures.pop(0)
+            self._error(status, f"status check failed with {status}", retry_after_ms="1")
+        elif parts[:2] == ["v1", "batches"] and len(parts) == 3:
+            server.batches[parts[2]]["checks"] += 1
+            self._send(self._batch(parts[2]))
+        elif parts[:2] == ["v1", "files"] and len(parts) == 4 and parts[3] == "content":
+            batch = server.batches[parts[2][len("out-"):]]
+            lines = []
+            for request in server.files[batch["input_file_id"]]:
+                denied = request["body"]["model"] in DENIED
+                lines.append(json.dumps({
+                    "id": "response",
+                    "custom_id": request["custom_id"],
+                    "response": {
+                        "status_code": 404 if denied else 200,
+                        "body": {"error": {"code": "model_not_found", "message": "not found"}} if denied else {},
+                    },
+                    "error": None,
+                }))
+            self._send("\n".join(lines).encode("utf-8"), "application/jsonl")
+        else:
+            self.send_error(404)
+
+    def _batch(self, batch_id: str):
+        batch = self.server.batches[batch_id]
+        done = batch["checks"] >= self.server.checks_until_done and batch["endpoint"] not in self.server.stuck
+        total = len(self.server.files[batch["input_file_id"]])
+        return {
+            "id": batch_id, "object": "batch", "endpoint": batch["endpoint"],
+            "input_file_id": batch["input_file_id"], "completion_window": "24h", "created_at": 0,
+            "status": "completed" if done else "in_progress",
+            "output_file_id": f"out-{batch_id}" if done else None,
+            "error_file_id": None,
+            "request_counts": {"total": total, "completed": total if done else 0, "failed": 0},
+        }
+
+
+@pytest.fixture
+def batch_server():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), _BatchAPIHandler)
+    server.files = {}
+    server.batches = {}
+    server.checks_until_done = 2
+    # Status codes to answer the next status checks with
+    server.failures = []
+    # Endpoints whose batches never finish
+    server.stuck = set()
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+@pytest.fixture
+def keyfile(tmp_path):
+    path = tmp_path / "keys.txt"
+    path.write_text(KEY + "\n")
+    return str(path)
+
+
+def _audit(server, keyfile, state, jsonl, *options):
+    main([
+        "batch-audit", keyfile, "--base-url", f"http://127.0.0.1:{server.server_address[1]}/v1",
+        "--state", state, "--jsonl", jsonl, "--poll-interval", "0.01", "--timeout", "30",
+        "--model", "gpt-4", "--model", "gpt-3.5-turbo", "--model", "text-embedding-ada-002",
+        "--model", "dall-e-3", *options
+    ])
+
+
+def _cells(jsonl):
+    with open(jsonl, encoding="utf-8") as f:
+        return {cell["model"]: cell["status"] for cell in map(json.loads, f)}
+
+
+def test_submit_poll_collect(batch_server, keyfile, tmp_path):
+    state, jsonl = str(tmp_path / "state.json"), str(tmp_path / "cells.jsonl")
+    _audit(batch_server, keyfile, state, jsonl)
+
+    # One batch per endpoint, each polled until it completed
+    assert sorted(batch["endpoint"] for batch in batch_server.batches.values()) == [
+        "/v1/chat/completions", "/v1/embeddings"
+    ]
+    assert all(batch["checks"] == 2 for batch in batch_server.batches.values())
+    assert _cells(jsonl) == {
+        "gpt-4": "unavailable",
+        "gpt-3.5-turbo": "ok",
+        "text-embedding-ada-002": "ok",
+        "dall-e-3": "skipped",
+    }
+    # Collected batches are forgotten
+    assert AuditState(state).batches == {}
+
+
+def test_no_wait_then_resume_does_not_resubmit(batch_server, keyfile, tmp_path):
+    state, jsonl = str(tmp_path / "state.json"), str(tmp_path / "cells.jsonl")
+    _audit(batch_server, keyfile, state, jsonl, "--no-wait")
+    assert len(batch_server.batches) == 2
+    assert len(AuditState(state).batches) == 1
+
+    _audit(batch_server, keyfile, state, jsonl)
+    assert len(batch_server.batches) == 2
+    assert _cells(jsonl)["gpt-3.5-turbo"] == "ok"
+    assert AuditState(state).batches == {}
+
+
+def test_duplicate_models_are_packed_once(batch_server, keyfile, tmp_path):
+    state, jsonl = str(tmp_path / "state.json"), str(tmp_path / "cells.jsonl")
+    _audit(batch_server, keyfile, state, jsonl, "--model", "gpt-4", "--model", "gpt-3.5-turbo")
+    custom_ids = [request["custom_id"] for requests in batch_server.files.values() for request in requests]
+    assert sorted(custom_ids) == ["gpt-3.5-turbo", "gpt-4", "text-embedding-ada-002"]
+
+
+def test_batches_created_before_an_error_are_still_collected(batch_server, keyfile, tmp_path, monkeypatch):
+    state, jsonl = str(tmp_path / "state.json"), str(tmp_path / "cells.jsonl")
+    # Uploads after the first one are rejected, so the embedding batch is never created
+    original = _BatchAPIHandler.do_POST
+
+    def do_POST(self):
+        if self.path == "/v1/files" and self.server.files:
+            self._body()
+            self._error(400, "upload rejected")
+            return
+        original(self)
+
+    monkeypatch.setattr(_BatchAPIHandler, "do_POST", do_POST)
+    _audit(batch_server, keyfile, state, jsonl)
+
+    cells = _cells(jsonl)
+    assert cells["gpt-3.5-turbo"] == "ok"
+    assert cells["text-embedding-ada-002"] == "failed"
+
+
+def test_created_batch_is_saved_before_the_next_request(batch_server, keyfile, tmp_path, monkeypatch):
+    state, jsonl = str(tmp_path / "state.json"), str(tmp_path / "cells.jsonl")
+    # The run is interrupted while uploading the second file
+    original = Files.create
+
+    def create(self, *args, **kwargs):
+        if batch_server.files:
+            raise KeyboardInterrupt
+        return original(self, *args, **kwargs)
+
+    monkeypatch.setattr(Files, "create", create)
+    with pytest.raises(KeyboardInterrupt):
+        _audit(batch_server, keyfile, state, jsonl)
+
+    saved = AuditState(state).batches
+    assert [record["batch_id"] for records in saved.values() for record in records] == ["batch_0"]
+
+
+def test_transient_poll_errors_are_retried(batch_server, keyfile, tmp_path, capsys):
+    state, jsonl = str(tmp_path / "state.json"), str(tmp_path / "cells.jsonl")
+    # Enough server errors to outlast the SDK's own retries of one status check
+    batch_server.failures = [503] * 3
+    _audit(batch_server, keyfile, state, jsonl)
+
+    assert "checking again next round" in capsys.readouterr().out
+    assert _cells(jsonl)["gpt-3.5-turbo"] == "ok"
+    assert _cells(jsonl)["text-embedding-ada-002"] == "ok"
+    assert AuditState(state).batches == {}
+
+
+def test_terminal_poll_errors_keep_the_running_batches(batch_server, keyfile, tmp_path):
+    state, jsonl = str(tmp_path / "state.json"), str(tmp_path / "cells.jsonl")
+    _audit(batch_server, keyfile, state, jsonl, "--no-wait")
+    batch_server.failures = [401]
+    _audit(batch_server, keyfile, state, jsonl)
+
+    assert _cells(jsonl)["gpt-3.5-turbo"] == "failed"
+    saved = AuditState(state).batches
+    assert sorted(record["batch_id"] for records in saved.values() for record in records) == ["batch_0", "batch_1"]
+
+    _audit(batch_server, keyfile, state, jsonl)
+    assert len(batch_server.batches) == 2
+    assert _cells(jsonl)["gpt-3.5-turbo"] == "ok"
+    assert AuditState(state).batches == {}
+
+
+def test_partly_finished_audits_are_collected_by_the_next_run(batch_server, keyfile, tmp_path, capsys):
+    state, jsonl = str(tmp_path / "state.json"), str(tmp_path / "cells.jsonl")
+    batch_server.stuck = {"/v1/embeddings"}
+    _audit(batch_server, keyfile, state, jsonl, "--timeout", "0.3")
+    assert "1 keys still waiting for their batches" in capsys.readouterr().out
+    assert len(next(iter(AuditState(state).batches.values()))) == 2
+
+    batch_server.stuck = set()
+    _audit(batch_server, keyfile, state, jsonl, "--timeout", "5")
+    assert len(batch_server.batches) == 2
+    assert _cells(jsonl) == {
+        "gpt-4": "unavailable",
+        "gpt-3.5-turbo": "ok",
+        "text-embedding-ada-002": "ok",
+        "dall-e-3": "skipped",
+    }
+    assert AuditState(state).batches == {}
+
+
+def test_build_batch_files_uses_models_as_custom_ids():
+    files = build_batch_files(["gpt-4", "text-embedding-ada-002", "dall-e-3"])
+    assert set(files) == {"/v1/chat/completions", "/v1/embeddings"}
+    data, models = files["/v1/chat/completions"]
+    assert models == ["gpt-4"]
+    assert json.loads(data.decode("utf-8").splitlines()[0])["custom_id"] == "gpt-4"
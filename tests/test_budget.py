@@ -0,0 +1,89 @@
+import argparse
+from types import SimpleNamespace
+
+import pytest
+
+from openai_api_key_tester.budget import (
+    Budget, ProbeCost, SpendLedger, estimate_probe_cost, parse_budget, response_cost
+)
+from openai_api_key_tester.errors import BudgetExceeded
+
+
+def _chat_response(prompt_tokens, completion_tokens):
+    return SimpleNamespace(usage=SimpleNamespace(prompt_tokens=prompt_tokens, completion_tokens=completion_tokens))
+
+
+@pytest.mark.parametrize("value, expected", [
+    ("5000", (5000.0, "tokens")),
+    ("5000tokens", (5000.0, "tokens")),
+    ("$0.50", (0.5, "usd")),
+    ("0.50 USD", (0.5, "usd")),
+])
+def test_parse_budget(value, expected):
+    assert parse_budget(value) == expected
+
+
+@pytest.mark.parametrize("value", ["lots", "-5", "$"])
+def test_parse_budget_rejects(value):
+    with pytest.raises(argparse.ArgumentTypeError):
+        parse_budget(value)
+
+
+def test_check_admits_probes_until_the_budget_is_spent():
+    estimate = estimate_probe_cost("gpt-4").tokens
+    budget = Budget(2 * estimate)
+    budget.check("gpt-4")
+    budget.charge("gpt-4", _chat_response(estimate - 1, 1))
+    budget.check("gpt-4")
+    budget.charge("gpt-4", _chat_response(estimate, 1))
+
+    with pytest.raises(BudgetExceeded, match="budget exhausted"):
+        budget.check("gpt-4")
+    assert budget.dropped == ["gpt-4"]
+    assert budget.spent.tokens == 2 * estimate + 1
+    assert budget.remaining == -1
+
+
+def test_charge_uses_reported_usage_and_falls_back_to_the_estimate():
+    budget = Budget(10_000)
+    budget.charge("gpt-4", _chat_response(10, 5))
+    assert budget.spent.tokens == 15
+    # The first chunk of a streamed probe carries no usage
+    budget.charge("gpt-4", SimpleNamespace())
+    assert budget.spent.tokens == 15 + estimate_probe_cost("gpt-4").tokens
+    assert budget.spent.dollars == pytest.approx(
+        response_cost("gpt-4", _chat_response(10, 5)).dollars + estimate_probe_cost("gpt-4").dollars
+    )
+
+
+def test_token_budgets_never_admit_image_probes():
+    budget = Budget(1_000_000)
+    with pytest.raises(BudgetExceeded, match="billed per image"):
+        budget.check("dall-e-3")
+    assert budget.dropped == ["dall-e-3"]
+
+
+def test_dollar_budgets_charge_images():
+    price = estimate_probe_cost("dall-e-3").dollars
+    budget = Budget(price * 1.5, "usd")
+    budget.check("dall-e-3")
+    budget.charge("dall-e-3", SimpleNamespace(data=[object()]))
+    assert budget.spent == ProbeCost(0, pytest.approx(price), 1)
+    with pytest.raises(BudgetExceeded):
+        budget.check("dall-e-3")
+
+
+def test_earlier_spend_counts_against_the_limit():
+    estimate = estimate_probe_cost("gpt-4")
+    budget = Budget(estimate.tokens * 3, already_spent=ProbeCost(estimate.tokens * 3, 0.0))
+    with pytest.raises(BudgetExceeded):
+        budget.check("gpt-4")
+    assert "0 tokens of" in budget.summary()
+
+
+def test_ledger_keeps_the_month_total(tmp_path):
+    path = str(tmp_path / "spend.json")
+    ledger = SpendLedger(path)
+    ledger.add(ProbeCost(100, 0.25))
+    ledger.add(ProbeCost(50, 0.05, 1))
+    assert SpendLedger(path).month_total() == ProbeCost(150, pytest.approx(0.30), 1)
@@ -0,0 +1,68 @@
+import pytest
+
+from openai_api_key_tester import bulk
+from openai_api_key_tester.bulk import BulkValidator, iter_key_lines
+from openai_api_key_tester.journal import Journal
+from openai_api_key_tester.keyindex import RevokedKeyIndex, key_fingerprint
+
+
+def _key(i):
+    return f"sk-{i:048d}"
+
+
+@pytest.fixture
+def index(tmp_path):
+    index = RevokedKeyIndex(str(tmp_path / "revoked.idx"))
+    yield index
+    index.close()
+
+
+def test_iter_key_lines_skips_blanks_and_comments():
+    lines = ["", "  # revoked in May", "Bearer sk-a", "OPENAI_API_KEY='sk-b'", "   "]
+    assert list(iter_key_lines(lines)) == ["sk-a", "sk-b"]
+
+
+def test_triage_drops_exact_duplicates_only(index):
+    keys = [_key(i) for i in range(20_000)]
+    validator = BulkValidator(index)
+    items = list(validator.triage(keys + keys[:100]))
+    assert [item["key"] for item in items] == keys
+    assert validator.counts == {"duplicate": 100}
+    assert all(item["result"] is None for item in items)
+    assert items[0]["fingerprint"] == key_fingerprint(keys[0]).hex()
+
+
+def test_triage_settles_known_revoked_keys_unless_rechecking(index):
+    index.add(key_fingerprint(_key(1)))
+    items = list(BulkValidator(index).triage([_key(0), _key(1)]))
+    assert items[0]["result"] is None
+    assert items[1]["result"]["status"] == "known_revoked"
+
+    items = list(BulkValidator(index, recheck=True).triage([_key(1)]))
+    assert items[0]["result"] is None
+
+
+def test_triage_takes_results_from_the_journal(index, tmp_path):
+    journal = Journal(str(tmp_path / "run.journal"))
+    journal.append(key_fingerprint(_key(0)).hex(), {"status": "valid", "message": "✅"})
+    items = list(BulkValidator(index, journal=journal).triage([_key(0), _key(1)]))
+    journal.close()
+    assert items[0]["result"] == {"status": "valid", "message": "✅", "resumed": True}
+    assert items[1]["result"] is None
+
+
+def test_run_records_revoked_keys_and_counts_statuses(index, monkeypatch):
+    def validate_key(key, http_client=None):
+        if key == _key(2):
+            return {"status": "revoked", "message": "❌ API key is invalid or revoked"}
+        return {"status": "valid", "message": "✅ Key is valid"}
+
+    monkeypatch.setattr(bulk, "validate_key", validate_key)
+    validator = BulkValidator(index)
+    results = list(validator.run([_key(i) for i in range(4)] + [_key(0)]))
+
+    assert [result["status"] for result in results] == ["valid", "valid", "revoked", "valid"]
+    assert all(result["key"].startswith("sk-00000") and "…" in result["key"] for result in results)
+    assert key_fingerprint(_key(2)) in index
+    assert validator.counts == {"duplicate": 1, "valid": 3, "revoked": 1}
+    assert "- duplicate: 1" in validator.summary()
@@ -0,0 +1,35 @@
+from openai_api_key_tester.catalog import SearchIndex, group_families, model_family
+
+
+def test_model_family_strips_snapshot_stamps():
+    assert model_family("gpt-4-0613") == "gpt-4"
+    assert model_family("gpt-4-1106-preview") == "gpt-4-preview"
+    assert model_family("gpt-4o-2024-08-06") == "gpt-4o"
+    assert model_family("gpt-4o-mini") == "gpt-4o-mini"
+    assert model_family("text-embedding-3-small") == "text-embedding-3-small"
+
+
+def test_group_families_puts_the_alias_first_then_newest_snapshots():
+    families = group_families([
+        "gpt-4o-2024-05-13", "gpt-4-0314", "gpt-4o", "gpt-4-0613", "gpt-4o-2024-08-06", "gpt-4",
+    ])
+    assert families == {
+        "gpt-4o": ["gpt-4o", "gpt-4o-2024-08-06", "gpt-4o-2024-05-13"],
+        "gpt-4": ["gpt-4", "gpt-4-0613", "gpt-4-0314"],
+    }
+
+
+def test_group_families_ranks_dated_snapshots_above_mmdd_stamps():
+    families = group_families(["gpt-3.5-turbo-1106", "gpt-3.5-turbo-2024-01-25"])
+    assert families["gpt-3.5-turbo"] == ["gpt-3.5-turbo-2024-01-25", "gpt-3.5-turbo-1106"]
+
+
+def test_group_families_keeps_first_seen_family_order():
+    families = group_families(["dall-e-3", "gpt-4-0613", "dall-e-2", "gpt-4"])
+    assert list(families) == ["dall-e-3", "gpt-4", "dall-e-2"]
+
+
+def test_search_index_filters_by_substring():
+    index = SearchIndex(["gpt-4", "gpt-4o", "text-embedding-3-small"])
+    assert index.filter("4O") == ["gpt-4o"]
+    assert index.filter("") == ["gpt-4", "gpt-4o", "text-embedding-3-small"]
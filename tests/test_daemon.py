@@ -0,0 +1,187 @@
+import threading
+import time
+
+import pytest
+import requests
+
+from openai_api_key_tester import daemon
+from openai_api_key_tester.daemon import Coalescer, DaemonClient, DaemonError, ProbeEngine, serve, write_token
+from openai_api_key_tester.scheduler import PriorityScheduler
+
+
+class _Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def monotonic(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = _Clock()
+    monkeypatch.setattr(daemon.time, "monotonic", clock.monotonic)
+    return clock
+
+
+def test_concurrent_callers_share_one_call():
+    coalescer = Coalescer()
+    release = threading.Event()
+    joined = threading.Semaphore(0)
+    calls = []
+    results = []
+
+    def probe():
+        calls.append(1)
+        release.wait(5)
+        return "ok"
+
+    def caller():
+        results.append(coalescer.run("key", probe, on_join=joined.release))
+
+    leader = threading.Thread(target=caller)
+    leader.start()
+    while not calls:
+        time.sleep(0.001)
+    followers = [threading.Thread(target=caller) for _ in range(3)]
+    for thread in followers:
+        thread.start()
+    for _ in followers:
+        assert joined.acquire(timeout=5)
+    release.set()
+    for thread in [leader, *followers]:
+        thread.join(5)
+
+    assert len(calls) == 1
+    assert sorted(results) == [("ok", "coalesced")] * 3 + [("ok", "probe")]
+
+
+def test_errors_reach_every_caller_and_are_not_cached():
+    coalescer = Coalescer(ttl=60)
+    release = threading.Event()
+    joined = threading.Event()
+    errors = []
+
+    def probe():
+        release.wait(5)
+        raise RuntimeError("upstream failed")
+
+    def caller(**kwargs):
+        try:
+            coalescer.run("key", probe, **kwargs)
+        except RuntimeError as e:
+            errors.append(e)
+
+    leader = threading.Thread(target=caller)
+    leader.start()
+    while "key" not in coalescer._inflight:
+        time.sleep(0.001)
+    follower = threading.Thread(target=caller, kwargs={"on_join": joined.set})
+    follower.start()
+    assert joined.wait(5)
+    release.set()
+    leader.join(5)
+    follower.join(5)
+
+    assert len(errors) == 2 and errors[0] is errors[1]
+    assert coalescer.run("key", lambda: "recovered") == ("recovered", "probe")
+
+
+def test_results_are_reused_until_the_ttl_expires(clock):
+    coalescer = Coalescer(ttl=30)
+    assert coalescer.run("key", lambda: 1) == (1, "probe")
+    clock.now += 29
+    assert coalescer.run("key", lambda: 2) == (1, "cached")
+    clock.now += 1
+    assert coalescer.run("key", lambda: 3) == (3, "probe")
+
+
+def test_without_a_ttl_nothing_is_kept():
+    coalescer = Coalescer()
+    assert coalescer.run("key", lambda: 1) == (1, "probe")
+    assert coalescer.run("key", lambda: 2) == (2, "probe")
+    assert coalescer._results == {}
+
+
+def test_expired_results_are_purged(clock):
+    coalescer = Coalescer(ttl=10)
+    for key in range(100):
+        coalescer.run(key, lambda: key)
+    assert len(coalescer._results) == 100
+
+    clock.now += 11
+    coalescer.run("fresh", lambda: "value")
+    assert list(coalescer._results) == ["fresh"]
+
+
+@pytest.fixture
+def engine():
+    engine = ProbeEngine(scheduler=PriorityScheduler(slots=4), max_clients=2)
+    yield engine
+    engine.scheduler.shutdown()
+    engine.close()
+
+
+def test_clients_are_kept_for_the_most_recently_used_keys(engine):
+    first = engine._openai_client("sk-a")
+    second = engine._openai_client("sk-b")
+    assert engine._openai_client("sk-a") is first
+    engine._openai_client("sk-c")
+
+    assert engine.stats()["clients"] == 2
+    assert engine._openai_client("sk-a") is first
+    # The least recently used key lost its client and gets a new one
+    assert engine._openai_client("sk-b") is not second
+    # Evicting a client leaves the pool shared by the other keys open
+    assert not engine.http_client.is_closed
+
+
+def test_closing_the_engine_closes_the_shared_pool():
+    engine = ProbeEngine(scheduler=PriorityScheduler(slots=4))
+    engine._openai_client("sk-a")
+    engine.scheduler.shutdown()
+    engine.close()
+    assert engine.http_client.is_closed
+    assert engine.stats()["clients"] == 0
+
+
+@pytest.fixture
+def rpc_url(engine):
+    server = serve("127.0.0.1", 0, engine, token="secret")
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{server.server_address[1]}/"
+    server.shutdown()
+    server.server_close()
+
+
+def _ping(url, **headers):
+    headers = dict({"Authorization": "Bearer secret", "Content-Type": "application/json"}, **headers)
+    return requests.post(url, data='{"jsonrpc": "2.0", "id": 1, "method": "ping"}', headers=headers, timeout=5)
+
+
+def test_requests_need_the_token_json_and_no_foreign_origin(rpc_url):
+    assert _ping(rpc_url).json()["result"] == "pong"
+    assert _ping(rpc_url, Authorization="Bearer wrong").status_code == 401
+    assert _ping(rpc_url, **{"Content-Type": "text/plain"}).status_code == 415
+    assert _ping(rpc_url, Origin="https://evil.example").status_code == 403
+
+
+def test_batched_requests_are_answered_in_order(rpc_url):
+    batch = [{"jsonrpc": "2.0", "id": i, "method": "ping"} for i in range(8)]
+    batch.append({"jsonrpc": "2.0", "method": "ping"})
+    batch.append({"jsonrpc": "2.0", "id": 99, "method": "missing"})
+    response = requests.post(rpc_url, json=batch, headers={"Authorization": "Bearer secret"}, timeout=5)
+    answers = response.json()
+    assert [answer["id"] for answer in answers] == list(range(8)) + [99]
+    assert answers[-1]["error"]["code"] == daemon.METHOD_NOT_FOUND
+
+
+def test_client_reads_the_token_file(rpc_url, tmp_path):
+    path = str(tmp_path / "daemon.token")
+    write_token(path)
+    with pytest.raises(DaemonError, match="did not accept the token"):
+        DaemonClient(rpc_url, token_path=path).call("ping")
+    with open(path, "w", encoding="utf-8") as f:
+        f.write("secret\n")
+    assert DaemonClient(rpc_url, token_path=path).call("ping") == "pong"
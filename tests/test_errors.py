@@ -0,0 +1,82 @@
+import socket
+
+import pytest
+import requests
+
+from openai_api_key_tester.errors import FailFast, ProbeCancelled, TerminalReason, classify_error
+
+
+class _APIError(Exception):
+    """Carries the attributes classify_error reads from SDK status errors."""
+
+    def __init__(self, status_code, message, code=None):
+        super().__init__(message)
+        self.status_code = status_code
+        self.code = code
+
+
+def _http_error(status_code):
+    response = requests.Response()
+    response.status_code = status_code
+    return requests.HTTPError(f"{status_code} Client Error", response=response)
+
+
+def _raised_from(error, cause):
+    try:
+        try:
+            raise cause
+        except BaseException as e:
+            raise error from e
+    except BaseException as e:
+        return e
+
+
+@pytest.mark.parametrize("error, reason", [
+    (_APIError(401, "Incorrect API key provided", "invalid_api_key"),
+     TerminalReason.INVALID_KEY),
+    (_http_error(401), TerminalReason.INVALID_KEY),
+    (_APIError(401, "Your account is deactivated", "account_deactivated"),
+     TerminalReason.DEACTIVATED_ORG),
+    (_APIError(403, "This organization has been deactivated"),
+     TerminalReason.DEACTIVATED_ORG),
+    (_APIError(429, "You exceeded your current quota", "insufficient_quota"),
+     TerminalReason.QUOTA_EXHAUSTED),
+    (_APIError(400, "Billing hard limit has been reached", "billing_hard_limit_reached"),
+     TerminalReason.QUOTA_EXHAUSTED),
+    (_raised_from(RuntimeError("connection error"), socket.gaierror(-2, "Name or service not known")),
+     TerminalReason.DNS_FAILURE),
+    (_raised_from(RuntimeError("connection error"), ConnectionRefusedError(111, "Connection refused")),
+     TerminalReason.CONNECTION_REFUSED),
+    (OSError("[Errno -3] Temporary failure in name resolution"), TerminalReason.DNS_FAILURE),
+])
+def test_terminal_errors(error, reason):
+    assert classify_error(error) is reason
+
+
+@pytest.mark.parametrize("error", [
+    _APIError(404, "The model does not exist", "model_not_found"),
+    _APIError(429, "Rate limit reached for requests", "rate_limit_exceeded"),
+    _APIError(403, "You are not allowed to sample from this model"),
+    _APIError(500, "The server had an error"),
+    _http_error(404),
+    ValueError("unrelated"),
+])
+def test_errors_about_one_probe_are_not_terminal(error):
+    assert classify_error(error) is None
+
+
+def test_probe_cancelled_keeps_its_reason():
+    assert classify_error(ProbeCancelled(TerminalReason.QUOTA_EXHAUSTED)) is TerminalReason.QUOTA_EXHAUSTED
+
+
+def test_fail_fast_keeps_the_first_terminal_error():
+    scope = FailFast()
+    first = _APIError(401, "Incorrect API key provided")
+    assert scope.record(_APIError(404, "not found")) is None
+    assert not scope.cancelled
+    scope.record(first)
+    scope.record(_APIError(429, "You exceeded your current quota"))
+    with pytest.raises(ProbeCancelled) as raised:
+        scope.check()
+    assert raised.value.reason is TerminalReason.INVALID_KEY
+    assert raised.value.error is first
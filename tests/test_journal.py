@@ -0,0 +1,98 @@
+import json
+
+from openai_api_key_tester import bulk
+from openai_api_key_tester.journal import Journal
+from openai_api_key_tester.keyindex import RevokedKeyIndex
+
+
+def _lines(path):
+    with open(path, "rb") as f:
+        return f.read().split(b"\n")
+
+
+def test_completed_units_survive_reopening(tmp_path):
+    path = str(tmp_path / "run.journal")
+    journal = Journal(path)
+    journal.append("a", {"status": "valid"})
+    journal.append("b", {"status": "invalid"})
+    journal.close()
+
+    reopened = Journal(path)
+    assert "a" in reopened and "c" not in reopened
+    assert reopened.get("b") == {"status": "invalid"}
+    reopened.close()
+
+
+def test_torn_last_line_is_ignored_and_cut_off(tmp_path):
+    path = str(tmp_path / "run.journal")
+    journal = Journal(path)
+    journal.append("a", {"status": "valid"})
+    journal.close()
+    with open(path, "ab") as f:
+        f.write(b'{"unit": "b", "result": {"sta')
+
+    journal = Journal(path)
+    assert list(journal.completed) == ["a"]
+    journal.append("c", {"status": "valid"})
+    journal.close()
+
+    lines = _lines(path)
+    assert lines[-1] == b""
+    assert [json.loads(line)["unit"] for line in lines[:-1]] == ["a", "c"]
+    assert set(Journal(path).completed) == {"a", "c"}
+
+
+def test_loading_stops_at_the_first_damaged_line(tmp_path):
+    path = str(tmp_path / "run.journal")
+    with open(path, "wb") as f:
+        f.write(b'{"unit": "a", "result": {}}\n')
+        f.write(b'not json\n')
+        f.write(b'{"unit": "b", "result": {}}\n')
+
+    journal = Journal(path)
+    assert list(journal.completed) == ["a"]
+    journal.append("c", {})
+    journal.close()
+    assert [json.loads(line)["unit"] for line in _lines(path)[:-1]] == ["a", "c"]
+
+
+def test_entries_are_synced_in_batches(tmp_path, monkeypatch):
+    synced = []
+    monkeypatch.setattr("openai_api_key_tester.journal.os.fsync", synced.append)
+    journal = Journal(str(tmp_path / "run.journal"), sync_every=3, sync_interval=3600)
+    for unit in "abcdefg":
+        journal.append(unit, {})
+    assert len(synced) == 2
+    journal.close()
+    assert len(synced) == 3
+
+
+def test_interrupted_bulk_run_resumes_from_the_journal(tmp_path, monkeypatch):
+    probed = []
+
+    def validate_key(key, http_client=None):
+        probed.append(key)
+        return {"status": "valid", "message": "✅ Key is valid"}
+
+    monkeypatch.setattr(bulk, "validate_key", validate_key)
+    keys = [f"sk-{i:048d}" for i in range(10)]
+    path = str(tmp_path / "run.journal")
+
+    journal = Journal(path)
+    validator = bulk.BulkValidator(RevokedKeyIndex(str(tmp_path / "revoked.idx")), journal=journal)
+    results = validator.run(keys)
+    for _ in range(4):
+        next(results)
+    results.close()
+    journal.close()
+    assert len(probed) == 4
+
+    journal = Journal(path)
+    validator = bulk.BulkValidator(RevokedKeyIndex(str(tmp_path / "revoked.idx")), journal=journal)
+    results = list(validator.run(keys))
+    journal.close()
+
+    assert probed == keys
+    assert [result["status"] for result in results] == ["valid"] * 10
+    assert validator.resumed == 4
+    assert len(Journal(path).completed) == 10
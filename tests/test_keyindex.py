@@ -0,0 +1,109 @@
+import os
+
+import pytest
+
+from openai_api_key_tester.keyindex import (
+    FINGERPRINT_SIZE, BloomFilter, RevokedKeyIndex, key_fingerprint, mask_key, normalize_key
+)
+
+
+def _fingerprints(count, prefix="sk-test-"):
+    return [key_fingerprint(f"{prefix}{i}") for i in range(count)]
+
+
+@pytest.mark.parametrize("raw", [
+    "  sk-abc  ",
+    "Bearer sk-abc",
+    "Authorization: Bearer sk-abc",
+    "OPENAI_API_KEY=\"sk-abc\"",
+    "openai_api_key: 'sk-abc',",
+])
+def test_normalize_key(raw):
+    assert normalize_key(raw) == "sk-abc"
+
+
+def test_fingerprints_and_masks():
+    assert len(key_fingerprint("sk-abc")) == FINGERPRINT_SIZE
+    assert key_fingerprint("sk-abc") != key_fingerprint("sk-abd")
+    assert mask_key("sk-proj-" + "a" * 40 + "wxyz") == "sk-proj-…wxyz"
+    assert mask_key("short") == "sho…"
+
+
+def test_bloom_filter_has_no_false_negatives():
+    bloom = BloomFilter(1000, 0.01)
+    added = _fingerprints(1000)
+    for fingerprint in added:
+        bloom.add(fingerprint)
+    assert all(fingerprint in bloom for fingerprint in added)
+
+
+def test_bloom_filter_false_positive_rate_at_capacity():
+    bloom = BloomFilter(10_000, 0.01)
+    for fingerprint in _fingerprints(10_000):
+        bloom.add(fingerprint)
+    false_positives = sum(fingerprint in bloom for fingerprint in _fingerprints(10_000, "sk-other-"))
+    assert false_positives < 200
+
+
+def test_bloom_filter_restores_its_bits():
+    bloom = BloomFilter(100)
+    bloom.add(key_fingerprint("sk-abc"))
+    restored = BloomFilter(100, bits=bytes(bloom.bits))
+    assert key_fingerprint("sk-abc") in restored
+    # Bits of another size are ignored rather than misread
+    assert key_fingerprint("sk-abc") not in BloomFilter(1000, bits=bytes(bloom.bits))
+
+
+def test_index_finds_pending_and_saved_fingerprints(tmp_path):
+    path = str(tmp_path / "revoked.idx")
+    first, second = _fingerprints(50), _fingerprints(50, "sk-later-")
+    index = RevokedKeyIndex(path)
+    index.update(first)
+    assert all(fingerprint in index for fingerprint in first)
+    index.save()
+    index.update(second + first[:5])
+    assert len(index) == 100
+    assert all(fingerprint in index for fingerprint in first + second)
+    assert key_fingerprint("sk-unknown") not in index
+    index.save()
+    index.close()
+
+    # The store holds each fingerprint once, sorted, and nothing else
+    with open(path, "rb") as f:
+        data = f.read()
+    stored = [data[i:i + FINGERPRINT_SIZE] for i in range(0, len(data), FINGERPRINT_SIZE)]
+    assert stored == sorted(set(first + second))
+
+    reopened = RevokedKeyIndex(path)
+    assert len(reopened) == 100
+    assert all(fingerprint in reopened for fingerprint in first + second)
+    assert key_fingerprint("sk-unknown") not in reopened
+    reopened.close()
+
+
+def test_index_rebuilds_a_missing_or_undersized_filter(tmp_path):
+    path = str(tmp_path / "revoked.idx")
+    added = _fingerprints(300)
+    index = RevokedKeyIndex(path, capacity=10)
+    index.update(added)
+    index.save()
+    index.close()
+
+    reopened = RevokedKeyIndex(path, capacity=10)
+    assert reopened.bloom.capacity == 600
+    assert all(fingerprint in reopened for fingerprint in added)
+    reopened.close()
+
+    os.remove(path + ".bloom")
+    rebuilt = RevokedKeyIndex(path)
+    assert all(fingerprint in rebuilt for fingerprint in added)
+    rebuilt.close()
+
+
+def test_saving_an_empty_index_writes_no_store(tmp_path):
+    path = str(tmp_path / "revoked.idx")
+    index = RevokedKeyIndex(path)
+    index.save()
+    index.close()
+    assert os.path.getsize(path) == 0
+    assert len(RevokedKeyIndex(path)) == 0
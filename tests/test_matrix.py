@@ -0,0 +1,177 @@
+import json
+import threading
+import time
+from collections import Counter
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from types import SimpleNamespace
+
+import pytest
+
+from openai_api_key_tester import matrix
+from openai_api_key_tester.api_key_tester import main
+from openai_api_key_tester.budget import Budget, estimate_probe_cost
+from openai_api_key_tester.matrix import BASE_BACKOFF, MAX_BACKOFF, KeyLane, MatrixScheduler, _retry_after
+
+GOOD = "sk-good-" + "0" * 40
+OTHER = "sk-other-" + "0" * 40
+REVOKED = "sk-revoked-" + "0" * 40
+BUSY = "sk-busy-" + "0" * 40
+MODELS = ["gpt-3.5-turbo", "gpt-4", "gpt-4-turbo-preview"]
+
+
+class _ChatHandler(BaseHTTPRequestHandler):
+    """
+    Stand-in for POST /v1/chat/completions. REVOKED is rejected, gpt-4 is
+    not available to any key and BUSY is rate limited on its first probes.
+    Records how many probes each key has in flight at once.
+    """
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, format, *args):
+        pass
+
+    def _send(self, status, body, **headers):
+        data = json.dumps(body).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        for name, value in headers.items():
+            self.send_header(name.replace("_", "-"), value)
+        self.end_headers()
+        self.wfile.write(data)
+
+    def do_POST(self):
+        server = self.server
+        request = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+        key = self.headers["Authorization"].split()[-1]
+        with server.lock:
+            server.probes[key] += 1
+            server.running[key] += 1
+            server.peak[key] = max(server.peak[key], server.running[key])
+            throttled = key == BUSY and server.probes[key] <= 2
+        try:
+            time.sleep(0.02)
+            if key == REVOKED:
+                self._send(401, {"error": {"message": "Incorrect API key provided", "type": "invalid_request_error",
+                                           "code": "invalid_api_key"}})
+            elif throttled:
+                self._send(429, {"error": {"message": "Rate limit reached", "type": "requests",
+                                           "code": "rate_limit_exceeded"}}, retry_after_ms="20")
+            elif request["model"] == "gpt-4":
+                self._send(404, {"error": {"message": "The model `gpt-4` does not exist", "type": "invalid_request_error",
+                                           "code": "model_not_found"}})
+            else:
+                self._send(200, {
+                    "id": "chatcmpl-1", "object": "chat.completion", "created": 0, "model": request["model"],
+                    "choices": [{"index": 0, "finish_reason": "length",
+                                 "message": {"role": "assistant", "content": "ok"}}],
+                    "usage": {"prompt_tokens": 8, "completion_tokens": 1, "total_tokens": 9},
+                })
+        finally:
+            with server.lock:
+                server.running[key] -= 1
+
+
+@pytest.fixture
+def server(monkeypatch):
+    server = ThreadingHTTPServer(("127.0.0.1", 0), _ChatHandler)
+    server.lock = threading.Lock()
+    server.probes, server.running, server.peak = Counter(), Counter(), Counter()
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    monkeypatch.setenv("OPENAI_BASE_URL", f"http://127.0.0.1:{server.server_address[1]}/v1")
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+def _statuses(scheduler):
+    return {lane.key: {model: cell["status"] for model, cell in lane.cells.items()} for lane in scheduler.lanes}
+
+
+def test_rate_limits_halve_the_limit_and_back_off(monkeypatch):
+    monkeypatch.setattr(matrix.random, "uniform", lambda low, high: high)
+    lane = KeyLane(GOOD, "fp", MODELS, limit=4)
+
+    lane.on_rate_limit(None)
+    assert (lane.limit, lane.backoff) == (2, BASE_BACKOFF)
+    assert lane.ready_at > time.monotonic() + BASE_BACKOFF / 2
+    assert not lane.can_start(time.monotonic())
+    for _ in range(10):
+        lane.on_rate_limit(None)
+    assert (lane.limit, lane.backoff, lane.rate_limited) == (1, MAX_BACKOFF, 11)
+
+    lane.on_success()
+    lane.on_success()
+    assert (lane.limit, lane.backoff) == (3, 0.0)
+    for _ in range(5):
+        lane.on_success()
+    assert lane.limit == 4
+
+
+def test_retry_after_prefers_milliseconds():
+    def error(**headers):
+        return SimpleNamespace(response=SimpleNamespace(headers=headers))
+
+    assert _retry_after(error(**{"retry-after-ms": "250", "retry-after": "3"})) == 0.25
+    assert _retry_after(error(**{"retry-after": "3"})) == 3.0
+    assert _retry_after(error(**{"retry-after": "Wed, 21 Oct 2026 07:28:00 GMT"})) is None
+    assert _retry_after(ValueError("no response")) is None
+
+
+def test_lanes_settle_every_cell_within_their_limits(server):
+    scheduler = MatrixScheduler([GOOD, REVOKED, BUSY, GOOD, "not-a-key"], MODELS, workers=4, per_key=2)
+    try:
+        cells = list(scheduler.run())
+    finally:
+        scheduler.http_client.close()
+
+    assert len(cells) == 4 * len(MODELS)
+    assert scheduler.duplicates == 1
+    statuses = _statuses(scheduler)
+    assert statuses[GOOD] == statuses[BUSY] == {
+        "gpt-3.5-turbo": "ok", "gpt-4": "unavailable", "gpt-4-turbo-preview": "ok"
+    }
+    assert statuses["not-a-key"] == dict.fromkeys(MODELS, "failed")
+    # The 401 cancels the rest of the row; probes already in flight still count
+    assert "failed" in statuses[REVOKED].values() and "ok" not in statuses[REVOKED].values()
+    assert server.probes[REVOKED] <= 2
+    # Rate limited probes were retried after the backoff instead of giving up
+    busy = next(lane for lane in scheduler.lanes if lane.key == BUSY)
+    assert busy.rate_limited == 2
+    assert server.probes[BUSY] == len(MODELS) + 2
+    assert max(server.peak.values()) <= 2
+    assert "- 2 rate limit responses retried after backoff" in scheduler.summary()
+
+
+def test_rate_limits_are_reported_after_the_last_attempt(server):
+    scheduler = MatrixScheduler([BUSY], ["gpt-3.5-turbo"], per_key=1, max_attempts=2)
+    try:
+        [(_, cell)] = list(scheduler.run())
+    finally:
+        scheduler.http_client.close()
+    assert cell["status"] == "rate_limited" and cell["attempts"] == 2
+
+
+def test_cells_over_the_budget_are_skipped(server):
+    budget = Budget(estimate_probe_cost("gpt-3.5-turbo").tokens)
+    scheduler = MatrixScheduler([GOOD], ["gpt-4-turbo-preview", "gpt-3.5-turbo"], budget=budget)
+    try:
+        list(scheduler.run())
+    finally:
+        scheduler.http_client.close()
+    assert _statuses(scheduler)[GOOD] == {"gpt-3.5-turbo": "ok", "gpt-4-turbo-preview": "skipped"}
+    assert server.probes[GOOD] == 1
+
+
+def test_models_named_twice_are_one_column(server, tmp_path, capsys):
+    keyfile = tmp_path / "keys.txt"
+    keyfile.write_text(f"{GOOD}\n{OTHER}\n", encoding="utf-8")
+    main(["--no-history", "matrix", str(keyfile), "--model", "gpt-3.5-turbo", "--model", "gpt-3.5-turbo"])
+
+    out = capsys.readouterr().out
+    assert "2 keys × 1 models" in out
+    rows = [line for line in out.splitlines() if line.startswith("sk-")]
+    assert len(rows) == 2 and all(line.split()[-1] == "Y" for line in rows)
+    assert "- gpt-3.5-turbo: 2/2 keys" in out
+    assert "- 2 cells, 2 probes sent" in out
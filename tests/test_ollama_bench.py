@@ -0,0 +1,94 @@
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from types import SimpleNamespace
+
+import pytest
+
+from openai_api_key_tester.ollama_bench import match_installed, measure_load, run_load_profile
+
+INSTALLED = ["llama2:latest", "mistral:7b", "mistral:latest", "phi3:mini"]
+
+
+class _OllamaHandler(BaseHTTPRequestHandler):
+    """
+    Stand-in for the Ollama endpoints used by ollama-load. Generating with
+    a model makes it resident; keep_alive=0 unloads it.
+    """
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, format, *args):
+        pass
+
+    def _send(self, body):
+        data = json.dumps(body).encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def do_GET(self):
+        if self.path == "/api/tags":
+            self._send({"models": [{"name": name} for name in INSTALLED]})
+        elif self.path == "/api/ps":
+            self._send({"models": [{"name": name, "size": 4 << 30, "size_vram": 4 << 30}
+                                   for name in sorted(self.server.resident)]})
+        else:
+            self.send_error(404)
+
+    def do_POST(self):
+        request = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+        name = request["model"] if ":" in request["model"] else request["model"] + ":latest"
+        if request.get("keep_alive") == 0:
+            self.server.resident.discard(name)
+            self._send({"model": name, "done": True})
+            return
+        cold = name not in self.server.resident
+        self.server.resident.add(name)
+        self._send({
+            "model": name, "response": "ok", "done": True,
+            "total_duration": 900_000_000, "load_duration": 800_000_000 if cold else 1_000_000,
+            "prompt_eval_count": 5, "prompt_eval_duration": 10_000_000,
+            "eval_count": 8, "eval_duration": 80_000_000,
+        })
+
+
+@pytest.fixture
+def ollama(monkeypatch):
+    server = ThreadingHTTPServer(("127.0.0.1", 0), _OllamaHandler)
+    server.resident = {"llama2:latest"}
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    url = f"http://127.0.0.1:{server.server_address[1]}"
+    monkeypatch.setenv("OLLAMA_API_URL", url)
+    yield server, url
+    server.shutdown()
+    server.server_close()
+
+
+def test_match_installed():
+    assert match_installed(["llama2", "mistral", "phi3", "gemma"], INSTALLED) == [
+        "llama2:latest", "mistral:latest", "phi3:mini"
+    ]
+    assert match_installed(["mistral:7b", "gemma"], INSTALLED, keep_missing=True) == ["mistral:7b", "gemma"]
+
+
+def test_measure_load_reports_resident_models_as_warm(ollama):
+    _, url = ollama
+    result = measure_load(url, "llama2:latest")
+    assert result["was_resident"] is True
+    assert result["first"]["load_ms"] == 1.0
+    assert result["warm"]["tokens_per_sec"] == pytest.approx(100.0)
+
+    cold = measure_load(url, "llama2:latest", force_cold=True)
+    assert cold["was_resident"] is False
+    assert cold["first"]["load_ms"] == 800.0
+    assert cold["warm"]["load_ms"] == 1.0
+
+
+def test_load_profile_resolves_untagged_names(ollama, capsys):
+    run_load_profile(SimpleNamespace(model=["llama2", "phi3"], cold=False))
+    report = capsys.readouterr().out
+    rows = {line.split()[0]: line.split()[1] for line in report.splitlines() if line.startswith(("llama2", "phi3"))}
+    assert rows == {"llama2:latest": "warm", "phi3:mini": "cold"}
@@ -0,0 +1,42 @@
+import os
+import subprocess
+import sys
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+PACKAGE = "openai_api_key_tester"
+
+# The package as run from a checkout, and as shipped in the wheel
+TREES = [ROOT, os.path.join(ROOT, "src")]
+
+
+def _sources(tree):
+    directory = os.path.join(tree, PACKAGE)
+    return sorted(name for name in os.listdir(directory) if name.endswith(".py"))
+
+
+def test_src_tree_is_a_copy_of_the_package():
+    assert _sources(TREES[0]) == _sources(TREES[1])
+    for name in _sources(TREES[0]):
+        with open(os.path.join(TREES[0], PACKAGE, name), "rb") as f:
+            checkout = f.read()
+        with open(os.path.join(TREES[1], PACKAGE, name), "rb") as f:
+            shipped = f.read()
+        assert checkout == shipped, f"src/{PACKAGE}/{name} differs from {PACKAGE}/{name}"
+
+
+@pytest.mark.parametrize("tree", TREES)
+def test_importing_the_package_loads_no_subsystem(tree):
+    script = (
+        "import sys\n"
+        f"sys.path.insert(0, {tree!r})\n"
+        f"import {PACKAGE} as package\n"
+        f"assert package.__file__.startswith({tree!r}), package.__file__\n"
+        "assert callable(package.main) and callable(package.gui)\n"
+        f"print(sorted(m for m in sys.modules if m.startswith(({PACKAGE!r}, 'tkinter', 'openai'))))\n"
+    )
+    output = subprocess.run(
+        [sys.executable, "-c", script], capture_output=True, text=True, check=True, cwd=os.path.dirname(ROOT)
+    ).stdout
+    assert output.strip() == f"['{PACKAGE}']"
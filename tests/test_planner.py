@@ -0,0 +1,71 @@
+import pytest
+
+from openai_api_key_tester.budget import Budget
+from openai_api_key_tester.errors import BudgetExceeded, FailFast, ProbeCancelled, TerminalReason
+from openai_api_key_tester.planner import ProbeCache, plan_openai_probes, probe_signature
+
+
+class _StatusError(Exception):
+    def __init__(self, status_code, message="error"):
+        super().__init__(message)
+        self.status_code = status_code
+
+
+def test_probe_cache_sends_each_signature_once():
+    cache = ProbeCache()
+    calls = []
+
+    def send():
+        calls.append(1)
+        return "response"
+
+    assert cache.run(("chat", "gpt-4"), send) == "response"
+    assert cache.run(("chat", "gpt-4"), send) == "response"
+    assert len(calls) == 1
+    assert (cache.sent, cache.reused) == (1, 1)
+    assert cache.outcome(("chat", "gpt-4")).response == "response"
+
+
+def test_probe_cache_reraises_cached_errors():
+    cache = ProbeCache()
+    error = _StatusError(404, "model_not_found")
+    calls = []
+
+    def send():
+        calls.append(1)
+        raise error
+
+    for _ in range(2):
+        with pytest.raises(_StatusError) as raised:
+            cache.run(("chat", "gpt-4"), send)
+        assert raised.value is error
+    assert len(calls) == 1
+    assert not cache.fail_fast.cancelled
+
+
+def test_probe_cache_cancels_after_terminal_error():
+    cache = ProbeCache(FailFast())
+
+    def send():
+        raise _StatusError(401, "Incorrect API key provided")
+
+    with pytest.raises(_StatusError):
+        cache.run(("chat", "gpt-4"), send)
+    with pytest.raises(ProbeCancelled) as raised:
+        cache.run(("chat", "gpt-3.5-turbo"), lambda: pytest.fail("sent after cancellation"))
+    assert raised.value.reason is TerminalReason.INVALID_KEY
+
+
+def test_probe_cache_refuses_probes_over_budget():
+    cache = ProbeCache(budget=Budget(0))
+    with pytest.raises(BudgetExceeded):
+        cache.run(("chat", "gpt-4"), lambda: pytest.fail("sent over budget"), model="gpt-4")
+    assert cache.sent == 0
+    assert cache.budget.dropped == ["gpt-4"]
+
+
+def test_plan_merges_the_status_check_with_its_model_probe():
+    plan = plan_openai_probes(["gpt-3.5-turbo", "gpt-4", "gpt-4"])
+    assert plan[probe_signature("gpt-3.5-turbo")] == ["status", "gpt-3.5-turbo"]
+    assert plan[probe_signature("gpt-4")] == ["gpt-4", "gpt-4"]
+    assert len(plan) == 2
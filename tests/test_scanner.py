@@ -0,0 +1,168 @@
+import gzip
+import io
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from openai_api_key_tester import scanner
+from openai_api_key_tester.api_key_tester import main
+from openai_api_key_tester.scanner import KEY_PATTERN, _matches, _scan_blocks, scan_file
+
+LEGACY = "sk-" + "a1B2" * 12
+PROJECT = "sk-proj-" + "Ab3_-" * 10
+SERVICE = "sk-svcacct-" + "x" * 64
+ADMIN = "sk-admin-" + "Z9" * 30
+
+
+@pytest.mark.parametrize("key, kind", [
+    (LEGACY, "legacy"),
+    (PROJECT, "project"),
+    (SERVICE, "service-account"),
+    (ADMIN, "admin"),
+    ("sk-None-" + "q" * 48, "user"),
+])
+def test_key_kinds(key, kind):
+    assert list(_matches(f"OPENAI_API_KEY={key}\n".encode())) == [{"key": key, "kind": kind, "line": 1}]
+
+
+@pytest.mark.parametrize("text", [
+    "sk-" + "a" * 47,                 # too short for a legacy key
+    "sk-" + "a" * 49,                 # too long for a legacy key
+    "sk-proj-" + "a" * 39,            # too short for a project key
+    "sk-proj-" + "a" * 300,           # longer than any key
+    "sk-" + "a" * 48 + "_",           # runs on into other key characters
+])
+def test_key_pattern_rejects_non_keys(text):
+    assert KEY_PATTERN.search(text.encode()) is None
+
+
+def test_keys_inside_longer_words_are_skipped():
+    data = f"task-{'a' * 48} x{LEGACY} {LEGACY}".encode()
+    assert [match["key"] for match in _matches(data)] == [LEGACY]
+
+
+def test_matches_report_line_numbers():
+    data = f"first\n{LEGACY}\n\nkey: {PROJECT} {ADMIN}\n".encode()
+    assert [(match["key"], match["line"]) for match in _matches(data)] == [
+        (LEGACY, 2), (PROJECT, 4), (ADMIN, 4)
+    ]
+
+
+def _document(block_size):
+    """
+    Keys placed just before, across and just after each block end and each
+    point where a block is cut from its overlap, each on its own line.
+    """
+    keys = [LEGACY, PROJECT, SERVICE, ADMIN]
+    boundaries = sorted(
+        {block * block_size for block in range(1, 6)}
+        | {block * block_size - scanner.OVERLAP for block in range(1, 6)}
+    )
+    data = bytearray()
+    expected = []
+    line = 1
+    for boundary in boundaries:
+        for offset in (-len(SERVICE) - 2, -1, 7):
+            key = keys[len(expected) % len(keys)]
+            target = boundary + offset
+            if target <= len(data):
+                continue
+            data += b"." * (target - len(data) - 1) + b"\n"
+            line += 1
+            data += key.encode()
+            expected.append((key, line))
+    data += b"\n" + b"." * block_size
+    return bytes(data), expected
+
+
+@pytest.mark.parametrize("block_size", [700, 1024, 1500])
+def test_scan_blocks_finds_keys_across_boundaries_once(monkeypatch, block_size):
+    monkeypatch.setattr(scanner, "BLOCK_SIZE", block_size)
+    data, expected = _document(block_size)
+    result = {"bytes": 0}
+    found = [(match["key"], match["line"]) for match in _scan_blocks(io.BytesIO(data), result)]
+    assert found == expected
+    assert found == [(match["key"], match["line"]) for match in _matches(data)]
+    assert result["bytes"] == len(data)
+
+
+def test_scan_blocks_key_ending_the_stream(monkeypatch):
+    monkeypatch.setattr(scanner, "BLOCK_SIZE", 64)
+    data = b"." * 100 + b"\n" + LEGACY.encode()
+    found = list(_scan_blocks(io.BytesIO(data), {"bytes": 0}))
+    assert [(match["key"], match["line"]) for match in found] == [(LEGACY, 2)]
+
+
+def test_scan_file_reads_plain_and_gzipped_files(tmp_path, monkeypatch):
+    monkeypatch.setattr(scanner, "BLOCK_SIZE", 1024)
+    data, expected = _document(1024)
+    plain = tmp_path / "dump.txt"
+    plain.write_bytes(data)
+    packed = tmp_path / "dump.txt.gz"
+    packed.write_bytes(gzip.compress(data))
+
+    for path in (plain, packed):
+        result = scan_file(str(path))
+        assert result["error"] is None
+        assert [(match["key"], match["line"]) for match in result["candidates"]] == expected
+
+
+def test_scan_file_reports_errors(tmp_path):
+    result = scan_file(str(tmp_path / "missing.txt"))
+    assert result["candidates"] == []
+    assert result["error"]
+
+
+class _ModelsHandler(BaseHTTPRequestHandler):
+    """Answers GET /v1/models, rejecting the revoked ADMIN key."""
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, format, *args):
+        pass
+
+    def do_GET(self):
+        if self.headers.get("Authorization") == f"Bearer {ADMIN}":
+            status, body = 401, {"error": {"message": "Incorrect API key provided", "code": "invalid_api_key"}}
+        else:
+            status, body = 200, {"object": "list", "data": []}
+        data = json.dumps(body).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+
+@pytest.fixture
+def models_server(monkeypatch):
+    server = ThreadingHTTPServer(("127.0.0.1", 0), _ModelsHandler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    monkeypatch.setenv("OPENAI_BASE_URL", f"http://127.0.0.1:{server.server_address[1]}/v1")
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+def test_scan_validates_each_distinct_key_over_http2(models_server, tmp_path, capsys):
+    tree = tmp_path / "repo"
+    (tree / ".git").mkdir(parents=True)
+    (tree / ".git" / "config").write_text(f"token = {LEGACY}\n")
+    (tree / "app.env").write_text(f"OPENAI_API_KEY={PROJECT}\nADMIN_KEY={ADMIN}\n")
+    (tree / "logs.txt.gz").write_bytes(gzip.compress(f"retrying with {PROJECT}\n".encode()))
+    index = str(tmp_path / "revoked.idx")
+
+    main(["--http2", "scan", str(tree), "--validate", "--workers", "2", "--index", index])
+    output = capsys.readouterr().out
+    results = [line for line in output.splitlines() if line.startswith("sk-")]
+    assert len(results) == 2
+    assert "✅ Key is valid" in results[0] and results[0].endswith("app.env:1)")
+    assert "❌ API key is invalid or revoked" in results[1] and results[1].endswith("app.env:2)")
+    assert "- 3 matches, 2 distinct keys" in output
+    assert "📊 Transport: 2 requests (streams)" in output
+
+    # The revoked key is remembered and not probed again
+    main(["scan", str(tree), "--validate", "--workers", "1", "--index", index])
+    assert "already known to be revoked" in capsys.readouterr().out
@@ -0,0 +1,174 @@
+import threading
+import time
+
+import pytest
+
+from openai_api_key_tester.daemon import SERVER_ERROR, ProbeEngine, handle_rpc
+from openai_api_key_tester.defaults import BULK, INTERACTIVE, SCHEDULED
+from openai_api_key_tester.scheduler import PriorityScheduler, parse_reservations
+
+
+@pytest.fixture
+def scheduler():
+    schedulers = []
+
+    def make(**kwargs):
+        schedulers.append(PriorityScheduler(**kwargs))
+        return schedulers[-1]
+
+    yield make
+    for created in schedulers:
+        created.shutdown()
+
+
+def _hold(scheduler, cls):
+    """
+    Occupy one slot of a class until the returned event is set.
+    """
+    started = threading.Event()
+    release = threading.Event()
+
+    def job():
+        started.set()
+        release.wait(5)
+
+    future = scheduler.submit(cls, job)
+    assert started.wait(5)
+    return release, future
+
+
+def test_shared_slots_follow_the_weights(scheduler):
+    pool = scheduler(slots=1, reserved={INTERACTIVE: 0, SCHEDULED: 0, BULK: 0})
+    release, _ = _hold(pool, BULK)
+    order = []
+    futures = [
+        pool.submit(cls, lambda cls=cls: order.append(cls))
+        for cls in (BULK, SCHEDULED, INTERACTIVE)
+        for _ in range(24)
+    ]
+    release.set()
+    for future in futures:
+        future.result(5)
+
+    # Over each round of 8 + 3 + 1 starts, every class gets its weight in slots
+    first = order[:24]
+    assert first.count(INTERACTIVE) == 16
+    assert first.count(SCHEDULED) == 6
+    assert first.count(BULK) == 2
+    # Ties go to the more urgent class
+    assert order[0] == INTERACTIVE
+
+
+def test_a_class_returning_from_idle_gets_no_credit(scheduler):
+    pool = scheduler(slots=1, reserved={INTERACTIVE: 0, SCHEDULED: 0, BULK: 0})
+    # Bulk works alone for a while and is still busy when interactive work arrives
+    for _ in range(40):
+        pool.submit(BULK, lambda: None)
+    release, _ = _hold(pool, BULK)
+    order = []
+    futures = [pool.submit(INTERACTIVE, lambda: order.append(INTERACTIVE)) for _ in range(16)]
+    futures += [pool.submit(BULK, lambda: order.append(BULK)) for _ in range(2)]
+    release.set()
+    for future in futures:
+        future.result(5)
+
+    # Interactive starts at bulk's virtual time rather than catching up 40 probes
+    assert order[:2] == [INTERACTIVE, BULK]
+    assert order[2:10] == [INTERACTIVE] * 8
+    assert order[10] == BULK
+
+
+def test_reserved_slots_stay_free_for_their_class(scheduler):
+    pool = scheduler(slots=3, reserved={INTERACTIVE: 1, SCHEDULED: 0, BULK: 0})
+    holds = [_hold(pool, BULK) for _ in range(2)]
+    queued = pool.submit(BULK, lambda: "bulk")
+    assert pool.run(INTERACTIVE, lambda: "interactive") == "interactive"
+    stats = pool.stats()
+    assert (stats[BULK]["running"], stats[BULK]["queued"]) == (2, 1)
+
+    for release, _ in holds:
+        release.set()
+    assert queued.result(5) == "bulk"
+
+
+def test_promote_moves_a_queued_job(scheduler):
+    pool = scheduler(slots=1, reserved={INTERACTIVE: 0, SCHEDULED: 0, BULK: 0})
+    release, _ = _hold(pool, BULK)
+    order = []
+    futures = [pool.submit(BULK, lambda i=i: order.append(i)) for i in range(3)]
+    futures.append(pool.submit(BULK, lambda: order.append("promoted"), key="probe"))
+    assert pool.promote("probe", INTERACTIVE)
+    assert not pool.promote("missing", INTERACTIVE)
+    release.set()
+    for future in futures:
+        future.result(5)
+    assert order[0] == "promoted"
+
+
+def test_errors_reach_the_caller(scheduler):
+    pool = scheduler(slots=1, reserved={INTERACTIVE: 0, SCHEDULED: 0, BULK: 0})
+
+    def fail():
+        raise RuntimeError("probe failed")
+
+    with pytest.raises(RuntimeError):
+        pool.run(SCHEDULED, fail)
+    assert pool.run(SCHEDULED, lambda: "next") == "next"
+
+
+def test_invalid_configuration():
+    with pytest.raises(ValueError):
+        PriorityScheduler(slots=2, reserved={INTERACTIVE: 2, SCHEDULED: 1})
+    pool = PriorityScheduler(slots=1, reserved={INTERACTIVE: 0, SCHEDULED: 0, BULK: 0})
+    try:
+        with pytest.raises(ValueError):
+            pool.submit("urgent", lambda: None)
+    finally:
+        pool.shutdown()
+    assert parse_reservations("interactive=4,bulk=0") == {INTERACTIVE: 4, BULK: 0}
+
+
+def test_daemon_promotes_a_bulk_probe_an_interactive_request_joins():
+    engine = ProbeEngine(scheduler=PriorityScheduler(slots=1, reserved={INTERACTIVE: 0, SCHEDULED: 0, BULK: 0}))
+    try:
+        release, _ = _hold(engine.scheduler, BULK)
+        order = []
+
+        def probe(name):
+            return lambda: order.append(name) or name
+
+        def request(key, priority, answers):
+            answers.append(engine._scheduled(engine.results, key, probe(key), priority))
+
+        answers = []
+        threads = [threading.Thread(target=request, args=(key, BULK, answers)) for key in ("other", "shared")]
+        for thread in threads:
+            thread.start()
+            while engine.scheduler.stats()[BULK]["queued"] < threads.index(thread) + 1:
+                time.sleep(0.001)
+        joined = threading.Thread(target=request, args=("shared", INTERACTIVE, answers))
+        joined.start()
+        while engine.scheduler.stats()[INTERACTIVE]["queued"] < 1:
+            time.sleep(0.001)
+        release.set()
+        for thread in [*threads, joined]:
+            thread.join(5)
+
+        assert order == ["shared", "other"]
+        assert sorted(answers) == [("other", "probe"), ("shared", "coalesced"), ("shared", "probe")]
+    finally:
+        engine.scheduler.shutdown()
+        engine.close()
+
+
+def test_daemon_rejects_unknown_priorities():
+    engine = ProbeEngine(scheduler=PriorityScheduler(slots=1, reserved={INTERACTIVE: 0, SCHEDULED: 0, BULK: 0}))
+    try:
+        response = handle_rpc(engine, {
+            "jsonrpc": "2.0", "id": 1, "method": "validate_key", "params": {"key": "sk-a", "priority": "urgent"}
+        })
+    finally:
+        engine.scheduler.shutdown()
+        engine.close()
+    assert response["error"]["code"] == SERVER_ERROR
+    assert "unknown priority class 'urgent'" in response["error"]["message"]
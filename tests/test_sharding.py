@@ -0,0 +1,66 @@
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from openai_api_key_tester.sharding import chunked, ordered_map, sharded_map
+
+# Set by _init_worker in each process that runs chunks
+_worker_tag = None
+
+
+def _init_worker():
+    global _worker_tag
+    _worker_tag = f"worker-{os.getpid()}"
+
+
+def _square_chunk(items):
+    return [(item * item, _worker_tag) for item in items]
+
+
+def _failing_chunk(items):
+    if 13 in items:
+        raise ValueError("unlucky chunk")
+    return items
+
+
+def test_chunked():
+    assert list(chunked(range(7), 3)) == [[0, 1, 2], [3, 4, 5], [6]]
+    assert list(chunked([], 3)) == []
+
+
+def test_ordered_map_keeps_order_and_bounds_work_in_flight():
+    pulled = []
+
+    def items():
+        for i in range(20):
+            pulled.append(i)
+            yield i
+
+    with ThreadPoolExecutor(max_workers=4) as executor:
+        results = ordered_map(executor, lambda i: i * 2, items(), max_in_flight=3)
+        assert next(results) == 0
+        # Only enough input to fill the window is consumed before the first result
+        assert len(pulled) == 3
+        assert list(results) == [i * 2 for i in range(1, 20)]
+
+
+def test_single_worker_runs_inline():
+    calls = []
+    results = sharded_map(_square_chunk, range(5), workers=1, initializer=lambda: calls.append("init"))
+    assert list(results) == [(i * i, _worker_tag) for i in range(5)]
+    assert calls == ["init"]
+
+
+def test_workers_run_chunks_in_other_processes_in_order():
+    results = list(sharded_map(_square_chunk, range(500), workers=3, chunk_size=16, initializer=_init_worker))
+    assert [value for value, _ in results] == [i * i for i in range(500)]
+    tags = {tag for _, tag in results}
+    assert None not in tags
+    assert f"worker-{os.getpid()}" not in tags
+
+
+def test_worker_errors_reach_the_caller():
+    results = sharded_map(_failing_chunk, range(100), workers=2, chunk_size=8)
+    with pytest.raises(ValueError, match="unlucky chunk"):
+        list(results)
@@ -0,0 +1,117 @@
+import io
+import mmap
+import threading
+import time
+
+import pytest
+
+from openai_api_key_tester import streaming
+from openai_api_key_tester.streaming import iter_file_lines, prefetch
+
+
+@pytest.mark.parametrize("data, lines", [
+    (b"a\nb\nc", ["a", "b", "c"]),
+    (b"a\nb\n", ["a", "b"]),
+    (b"a\n\nb\r\n", ["a", "", "b\r"]),
+    (b"\xff\xfekey\n", ["��key"]),
+    (b"", []),
+])
+def test_iter_file_lines(tmp_path, data, lines):
+    path = tmp_path / "keys.txt"
+    path.write_bytes(data)
+    assert list(iter_file_lines(str(path))) == lines
+
+
+def test_iter_file_lines_reads_stdin(monkeypatch):
+    monkeypatch.setattr("sys.stdin", io.StringIO("sk-a\nsk-b\n"))
+    assert list(iter_file_lines("-")) == ["sk-a", "sk-b"]
+
+
+def test_consumed_pages_are_released(tmp_path, monkeypatch):
+    monkeypatch.setattr(streaming, "RELEASE_EVERY", mmap.PAGESIZE)
+    released = []
+    original = mmap.mmap
+
+    class _Mapped:
+        def __init__(self, *args, **kwargs):
+            self._mapped = original(*args, **kwargs)
+
+        def __getattr__(self, name):
+            return getattr(self._mapped, name)
+
+        def __getitem__(self, item):
+            return self._mapped[item]
+
+        def __enter__(self):
+            return self
+
+        def __exit__(self, *exc):
+            self._mapped.close()
+
+        def madvise(self, option, start=0, length=None):
+            if option == mmap.MADV_DONTNEED:
+                released.append((start, length))
+
+    monkeypatch.setattr(streaming.mmap, "mmap", _Mapped)
+    lines = [f"sk-{i:060d}" for i in range(1000)]
+    path = tmp_path / "keys.txt"
+    path.write_text("\n".join(lines))
+
+    assert list(iter_file_lines(str(path))) == lines
+    # Released ranges are page aligned, contiguous and cover only lines already read
+    assert released
+    position = 0
+    for start, length in released:
+        assert start == position and start % mmap.PAGESIZE == 0 and length % mmap.PAGESIZE == 0
+        position += length
+    assert position <= path.stat().st_size
+
+
+def test_prefetch_keeps_order():
+    assert list(prefetch(iter(range(1000)), maxsize=4)) == list(range(1000))
+
+
+def test_prefetch_bounds_items_read_ahead():
+    produced = []
+
+    def items():
+        for i in range(100):
+            produced.append(i)
+            yield i
+
+    stream = prefetch(items(), maxsize=3)
+    assert next(stream) == 0
+    time.sleep(0.2)
+    # One item handed over, three queued and one waiting for room
+    assert len(produced) <= 5
+    stream.close()
+
+
+def test_prefetch_reraises_errors():
+    def items():
+        yield 1
+        raise ValueError("bad line")
+
+    stream = prefetch(items())
+    assert next(stream) == 1
+    with pytest.raises(ValueError, match="bad line"):
+        next(stream)
+
+
+def test_closing_stops_the_producer_and_closes_its_source():
+    closed = threading.Event()
+
+    def items():
+        try:
+            for i in range(10_000):
+                yield i
+        finally:
+            closed.set()
+
+    before = threading.active_count()
+    inner = prefetch(items(), maxsize=2)
+    outer = prefetch(inner, maxsize=2)
+    assert next(outer) == 0
+    outer.close()
+    assert closed.wait(5)
+    assert threading.active_count() == before
@@ -0,0 +1,142 @@
+import contextvars
+import json
+import threading
+
+import pytest
+
+from openai_api_key_tester import __version__, api_key_tester
+from openai_api_key_tester.tracing import (
+    KIND_CLIENT, SCOPE_NAME, SERVICE_NAME, STATUS_ERROR, STATUS_OK, FileExporter, Tracer, span
+)
+
+
+class _MemoryExporter:
+    def __init__(self):
+        self.payloads = []
+
+    def export(self, payload):
+        self.payloads.append(payload)
+
+    def describe(self):
+        return "memory"
+
+
+def _spans(payload):
+    [resource_spans] = payload["resourceSpans"]
+    [scope_spans] = resource_spans["scopeSpans"]
+    return scope_spans["spans"]
+
+
+def test_payload_shape():
+    exporter = _MemoryExporter()
+    with Tracer(exporter):
+        with span("check_key", provider="openai") as root:
+            root.set_status(True)
+            with span("probe", KIND_CLIENT, model="gpt-4", attempt=2, ratio=0.5, cached=False) as child:
+                child.set_status(True)
+
+    [payload] = exporter.payloads
+    [resource_spans] = payload["resourceSpans"]
+    assert resource_spans["resource"]["attributes"] == [
+        {"key": "service.name", "value": {"stringValue": SERVICE_NAME}}
+    ]
+    [scope_spans] = resource_spans["scopeSpans"]
+    assert scope_spans["scope"] == {"name": SCOPE_NAME, "version": __version__}
+
+    spans = {entry["name"]: entry for entry in _spans(payload)}
+    root, child = spans["check_key"], spans["probe"]
+    assert len(root["traceId"]) == 32 and len(root["spanId"]) == 16
+    assert "parentSpanId" not in root
+    assert child["traceId"] == root["traceId"]
+    assert child["parentSpanId"] == root["spanId"]
+    assert child["kind"] == KIND_CLIENT
+    assert child["status"] == {"code": STATUS_OK}
+    # Timestamps and int64 values are strings in the OTLP/JSON mapping
+    assert isinstance(child["startTimeUnixNano"], str)
+    assert int(child["startTimeUnixNano"]) <= int(child["endTimeUnixNano"])
+    assert child["attributes"] == [
+        {"key": "model", "value": {"stringValue": "gpt-4"}},
+        {"key": "attempt", "value": {"intValue": "2"}},
+        {"key": "ratio", "value": {"doubleValue": 0.5}},
+        {"key": "cached", "value": {"boolValue": False}},
+    ]
+
+
+def test_exceptions_become_error_events():
+    exporter = _MemoryExporter()
+    with Tracer(exporter):
+        with pytest.raises(ValueError):
+            with span("check_key"):
+                raise ValueError("model_not_found")
+
+    [entry] = _spans(exporter.payloads[0])
+    assert entry["status"] == {"code": STATUS_ERROR, "message": "model_not_found"}
+    [event] = entry["events"]
+    assert event["name"] == "exception"
+    assert {"key": "exception.type", "value": {"stringValue": "ValueError"}} in event["attributes"]
+
+
+def test_unsampled_traces_are_dropped_unless_they_failed():
+    exporter = _MemoryExporter()
+    tracer = Tracer(exporter, sample_ratio=0.0)
+    with tracer:
+        with span("ok"):
+            pass
+        with pytest.raises(RuntimeError):
+            with span("failed"):
+                raise RuntimeError("boom")
+
+    assert [_spans(payload)[0]["name"] for payload in exporter.payloads] == ["failed"]
+    assert tracer.dropped == 1
+
+
+def test_spans_outside_a_tracer_do_nothing():
+    with span("untraced") as untraced:
+        untraced.set("model", "gpt-4")
+
+
+def test_file_exporter_writes_one_request_per_line(tmp_path):
+    path = tmp_path / "traces" / "run.jsonl"
+    with Tracer(FileExporter(str(path))):
+        for name in ("first", "second"):
+            with span(name):
+                pass
+
+    lines = path.read_text(encoding="utf-8").splitlines()
+    assert [_spans(json.loads(line))[0]["name"] for line in lines] == ["first", "second"]
+
+
+def test_counters_stay_consistent_across_threads():
+    exporter = _MemoryExporter()
+    tracer = Tracer(exporter, sample_ratio=0.5)
+
+    def trace_many():
+        for _ in range(300):
+            with span("probe"):
+                pass
+
+    with tracer:
+        # Each worker runs in a copy of the context the tracer is active in
+        threads = [threading.Thread(target=contextvars.copy_context().run, args=(trace_many,)) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+    assert len(tracer.exported) + tracer.dropped == 2400
+    assert len(exporter.payloads) == len(tracer.exported)
+    assert 0 < tracer.dropped < 2400
+
+
+def test_trace_summary_is_printed_when_the_run_exits(tmp_path, monkeypatch, capsys):
+    def run_command(args):
+        raise SystemExit(2)
+
+    monkeypatch.setattr(api_key_tester, "run_command", run_command)
+    path = tmp_path / "run.jsonl"
+    with pytest.raises(SystemExit):
+        api_key_tester.main(["--trace", str(path), "providers"])
+
+    assert "written to " + str(path) in capsys.readouterr().out
+    [entry] = _spans(json.loads(path.read_text(encoding="utf-8")))
+    assert entry["name"] == "run"
+    assert entry["status"]["code"] == STATUS_ERROR
@@ -0,0 +1,96 @@
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from types import SimpleNamespace
+
+import pytest
+
+from openai_api_key_tester.bulk import BulkValidator
+from openai_api_key_tester.keyindex import RevokedKeyIndex
+from openai_api_key_tester.transport import TransportStats, make_http_client
+
+
+class _ModelsHandler(BaseHTTPRequestHandler):
+    """Answers GET /v1/models over keep-alive HTTP/1.1 connections."""
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, format, *args):
+        pass
+
+    def do_GET(self):
+        data = json.dumps({"object": "list", "data": [{"id": "gpt-4", "object": "model", "created": 0,
+                                                       "owned_by": "openai"}]}).encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+
+@pytest.fixture
+def server():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), _ModelsHandler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{server.server_address[1]}/v1"
+    server.shutdown()
+    server.server_close()
+
+
+def _response(version, connection):
+    return SimpleNamespace(extensions={"http_version": version, "network_stream": connection})
+
+
+def test_stats_count_streams_per_connection_and_version():
+    stats = TransportStats()
+    assert stats.summary() == "📊 Transport: no requests sent"
+    first, second = object(), object()
+    for response in [_response(b"HTTP/2", first)] * 3 + [_response(b"HTTP/1.1", second)]:
+        stats.on_response(response)
+    assert (stats.streams, stats.connections) == (4, 2)
+    assert stats.versions == {"HTTP/2": 3, "HTTP/1.1": 1}
+    assert stats.summary() == "📊 Transport: 4 requests (streams) over 2 connections (HTTP/1.1: 1, HTTP/2: 3)"
+
+
+def test_stats_are_safe_to_share_between_threads():
+    stats = TransportStats()
+    connection = object()
+
+    def record():
+        for _ in range(1000):
+            stats.on_response(_response("HTTP/2", connection))
+
+    threads = [threading.Thread(target=record) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert (stats.streams, stats.connections) == (8000, 1)
+
+
+def test_http_client_reuses_its_connection(server):
+    stats = TransportStats()
+    client = make_http_client(stats=stats)
+    try:
+        for _ in range(3):
+            client.get(f"{server}/models").raise_for_status()
+    finally:
+        client.close()
+    assert (stats.streams, stats.connections) == (3, 1)
+    assert stats.versions == {"HTTP/1.1": 3}
+
+
+def test_multiplexed_bulk_run_counts_its_transport(server, tmp_path, monkeypatch):
+    monkeypatch.setenv("OPENAI_BASE_URL", server)
+    keys = [f"sk-proj-{i:048d}" for i in range(12)]
+    index = RevokedKeyIndex(str(tmp_path / "revoked.idx"))
+    validator = BulkValidator(index, workers=4, http2=True)
+    try:
+        results = list(validator.run(keys))
+    finally:
+        index.close()
+    assert [result["status"] for result in results] == ["valid"] * 12
+    assert validator.stats.streams == 12
+    # Worker threads share one client, so its pool holds at most one connection per thread
+    assert 1 <= validator.stats.connections <= 4
+    assert "📊 Transport: 12 requests (streams)" in validator.summary()